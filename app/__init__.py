@@ -3,9 +3,12 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 import os
 import logging
+import threading
+from .utils.fallback import RoutingSession, fallback_router
 
 # Initialize extensions
-db = SQLAlchemy()
+# (sessions go to the SQLite fallback while the database circuit breaker is open)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
 def create_app():
@@ -19,6 +22,13 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or 'dev-secret-key-123'
     app.config['DEBUG'] = False
 
+    # Behind a reverse proxy, take the client IP (used by the login throttle)
+    # from the X-Forwarded-For entries added by that many trusted proxies
+    trusted_proxies = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    if trusted_proxies:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
     # Database config: Supabase or fallback to SQLite
     database_url = os.environ.get('DATABASE_URL')
     if database_url and database_url.startswith('postgresql://'):
@@ -26,25 +36,31 @@ def create_app():
             database_url += ('&' if '?' in database_url else '?') + 'connect_timeout=5'
         app.config['SQLALCHEMY_DATABASE_URI'] = database_url
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'pool_size': 1,
-            'pool_recycle': 300,
-            'pool_pre_ping': True,
-            'max_overflow': 0,
-            'pool_timeout': 5,
-            'connect_args': {
-                'connect_timeout': 5,
-                'application_name': 'budge-it-app'
-            }
-        }
+        # Pool settings depend on whether we connect through PgBouncer or directly
+        from .utils.engine_options import build_engine_options
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(database_url)
         print("✅ Using Supabase database")
+    elif database_url and database_url.startswith('sqlite:'):
+        # Explicit SQLite file (benchmarks and checks use a throwaway one)
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        print(f"✅ Using SQLite database {database_url}")
     else:
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         print("✅ Using SQLite database (fallback)")
 
     db.init_app(app)
+    fallback_router.init_app(app)
     login_manager.init_app(app)
+
+    # Keep sessions server-side when SESSION_BACKEND asks for it (the cookie then holds only an id)
+    from .utils import sessions
+    sessions.init_app(app)
+
+    # Probe database health in the background instead of on the request path
+    from .utils.health_monitor import health_monitor
+    health_monitor.init_app(app)
     login_manager.login_view = 'auth.login'
 
     # Register Jinja2 filters
@@ -60,23 +76,48 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(admin_bp)
 
+    # Register maintenance CLI commands
+    from .cli import register_commands
+    register_commands(app)
+
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            from .models import User
-            return User.query.get(int(user_id))
+            from .utils.user_cache import get_cached_user
+            return get_cached_user(user_id)
         except Exception as e:
             print(f"Error loading user {user_id}: {e}")
             return None
 
-    # Create tables
-    with app.app_context():
-        try:
-            db.create_all()
-            print("✅ Database tables created successfully!")
-        except Exception as e:
-            print(f"⚠️ Database warning: {e}")
-            print("✅ App will still work!")
+    # Check the schema version when this process serves its first request.
+    # DDL is left to `flask db upgrade` (run once per deploy), so workers only
+    # read one row here - and not at import time, so a preloading gunicorn
+    # master never opens a connection that its forked workers would inherit.
+    schema_checked = {'pid': None}
+    schema_lock = threading.Lock()
+
+    @app.before_request
+    def check_schema_version():
+        if schema_checked['pid'] == os.getpid():
+            return
+        with schema_lock:
+            if schema_checked['pid'] == os.getpid():
+                return
+            from .migrations import current_version, latest_version, upgrade
+            try:
+                with db.engine.connect() as connection:
+                    version = current_version(connection)
+                expected = latest_version()
+                if version < expected and db.engine.dialect.name == 'sqlite':
+                    # Local SQLite database: nobody runs deploy steps, so migrate it here
+                    upgrade(db.engine)
+                    print(f"✅ Database schema upgraded from version {version} to {expected}")
+                elif version < expected:
+                    print(f"⚠️ Database schema is at version {version}, expected {expected} - run `flask db upgrade`")
+            except Exception as e:
+                print(f"⚠️ Database warning: {e}")
+                print("✅ App will still work!")
+            schema_checked['pid'] = os.getpid()
 
     print("✅ Flask application created successfully")
     return app
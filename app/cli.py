@@ -0,0 +1,162 @@
+# Maintenance commands for Budge-IT (run with `flask --app wsgi <command>`)
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.utils.database import rebuild_all_user_summaries, verify_user_summaries
+from app.utils.fallback import fallback_router
+from app.utils.system_stats import refresh_system_stats
+from app.utils.rollups import rebuild_all_rollups, verify_user_rollups
+from app.utils.login_throttle import login_throttle
+from app.utils.sessions import session_stats, revoke_user_sessions
+from app.models import User
+from app.migrations import upgrade, history
+from app import db
+
+summaries_cli = AppGroup('summaries', help='Manage the per-user running totals table.')
+
+@summaries_cli.command('rebuild')
+def rebuild_summaries():
+    """Recompute every user's running totals from their transactions."""
+    count = rebuild_all_user_summaries()
+    click.echo(f"Rebuilt summaries for {count} users")
+
+@summaries_cli.command('verify')
+def verify_summaries():
+    """Check every user's running totals against their transactions."""
+    mismatches = verify_user_summaries()
+    for mismatch in mismatches:
+        click.echo(f"User {mismatch['user_id']}: stored {mismatch['stored']}, expected {mismatch['expected']}")
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} summaries are out of date - run `flask summaries rebuild`")
+    click.echo("All summaries match")
+
+rollups_cli = AppGroup('rollups', help='Manage the daily/monthly chart totals table.')
+
+@rollups_cli.command('rebuild')
+def rebuild_rollups():
+    """Backfill every user's daily and monthly totals from their transactions."""
+    count = rebuild_all_rollups()
+    click.echo(f"Rebuilt rollups for {count} users")
+
+@rollups_cli.command('verify')
+def verify_rollups():
+    """Check every user's daily totals against their transactions."""
+    stale = 0
+    for (user_id,) in db.session.query(User.id).all():
+        mismatches = verify_user_rollups(user_id)
+        if mismatches:
+            stale += 1
+            click.echo(f"User {user_id}: {len(mismatches)} buckets differ (first: {mismatches[0]})")
+    if stale:
+        raise SystemExit(f"{stale} users have stale rollups - run `flask rollups rebuild`")
+    click.echo("All rollups match")
+
+db_cli = AppGroup('db', help='Manage the database schema version.')
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', type=int, default=None, help='Stop at this schema version.')
+def db_upgrade(target):
+    """Apply pending schema migrations."""
+    applied = upgrade(db.engine, target)
+    if applied:
+        click.echo(f"Applied migrations: {', '.join(str(version) for version in applied)}")
+    else:
+        click.echo("Schema is already up to date")
+
+@db_cli.command('status')
+def db_status():
+    """Show every migration and whether it has been applied."""
+    for migration in history(db.engine):
+        applied_at = migration['applied_at'] or 'pending'
+        click.echo(f"{migration['version']:>4}  {migration['description']}  [{applied_at}]")
+
+fallback_cli = AppGroup('fallback', help='Inspect and replay writes made in the SQLite fallback.')
+
+@fallback_cli.command('status')
+def fallback_status():
+    """Show how many fallback writes are waiting to be replayed."""
+    stats = fallback_router.stats()
+    if not stats['enabled']:
+        click.echo("Fallback routing is disabled (the primary database is SQLite)")
+        return
+    click.echo(f"Fallback database: {stats['database_url']}")
+    for status, count in sorted(stats['journal'].items()):
+        click.echo(f"{status}: {count}")
+
+@fallback_cli.command('replay')
+def fallback_replay():
+    """Apply pending fallback writes to the primary database now."""
+    result = fallback_router.replay()
+    if result.get('skipped'):
+        raise SystemExit("Another process is replaying the fallback journal")
+    click.echo(f"Replayed {result['applied']} writes ({result['conflicts']} conflicts)")
+
+stats_cli = AppGroup('stats', help='Manage the admin dashboard totals.')
+
+@stats_cli.command('refresh')
+def stats_refresh():
+    """Recompute the system_stats table (for cron when SYSTEM_STATS_REFRESH_INTERVAL is set)."""
+    stats = refresh_system_stats()
+    click.echo(f"{stats['total_users']} users, {stats['total_categories']} categories, "
+               f"{stats['total_transactions']} transactions "
+               f"(income {stats['total_income']}, expense {stats['total_expense']})")
+
+logins_cli = AppGroup('logins', help='Inspect and clear login throttling.')
+
+@logins_cli.command('status')
+def logins_status():
+    """Show failed login totals and how many usernames/IPs are locked out."""
+    stats = login_throttle.stats()
+    click.echo(f"{stats['failures']} failed logins, {stats['lockouts']} lockouts")
+    click.echo(f"Locked now: {stats['locked_users']} usernames, {stats['locked_ips']} IPs "
+               f"({stats['tracked_keys']} tracked)")
+
+@logins_cli.command('unlock')
+@click.option('--username', help='Username to unlock')
+@click.option('--ip', help='Client IP address to unlock')
+def logins_unlock(username, ip):
+    """Clear the failed logins and lockout of a username and/or IP."""
+    if not username and not ip:
+        raise SystemExit("Pass --username and/or --ip")
+    removed = login_throttle.unlock(username=username, ip=ip)
+    click.echo(f"Unlocked {removed} of {bool(username) + bool(ip)}")
+
+sessions_cli = AppGroup('sessions', help='Inspect and clear server-side sessions.')
+
+@sessions_cli.command('status')
+def sessions_status():
+    """Show the session backend and how many sessions it holds."""
+    stats = session_stats()
+    if stats['backend'] == 'cookie':
+        click.echo("Sessions are kept in signed cookies (set SESSION_BACKEND to store them server-side)")
+        return
+    click.echo(f"{stats['backend']} backend: {stats['sessions']} sessions ({stats['serializer']} encoded)")
+
+@sessions_cli.command('sweep')
+def sessions_sweep():
+    """Delete expired sessions now (normally done every SESSION_SWEEP_INTERVAL seconds)."""
+    interface = current_app.session_interface
+    if not hasattr(interface, 'sweep'):
+        raise SystemExit("Sessions are kept in signed cookies - nothing to sweep")
+    click.echo(f"Deleted {interface.sweep()} expired sessions")
+
+@sessions_cli.command('revoke')
+@click.argument('username')
+def sessions_revoke(username):
+    """Log a user out of every device."""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise SystemExit(f"No user named {username}")
+    click.echo(f"Revoked {revoke_user_sessions(user.id)} sessions")
+
+def register_commands(app):
+    """Register the maintenance commands on the Flask app."""
+    app.cli.add_command(db_cli)
+    app.cli.add_command(summaries_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(fallback_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(logins_cli)
+    app.cli.add_command(sessions_cli)
@@ -53,12 +53,12 @@ def admin_required(f):
             return redirect(url_for('auth.login'))
         
         try:
-            # Import User model here to avoid circular imports
-            from app.models import User
-            # Get current user from database using SQLAlchemy
-            user = User.query.get(session['user_id'])
+            # Import user cache here to avoid circular imports
+            from app.utils.user_cache import get_cached_user
+            # Get current user from the request/process cache (database only on a miss)
+            user = get_cached_user(session['user_id'])
             # Check if user exists and has admin username
-            if not user or user.username != 'admin':
+            if not user or not user.is_admin:
                 # Redirect to dashboard
                 return redirect(url_for('main.dashboard'))
             # Execute original function if user is admin
@@ -73,22 +73,23 @@ def get_current_user():
     """
     Gets the current user data from the session.
     
-    This function retrieves the current user's information from the database
-    based on the user_id stored in the session. It returns None if no user
-    is logged in or if the user is not found.
+    This function retrieves the current user's information based on the
+    user_id stored in the session. The lookup is cached per request and
+    across requests, so it only reaches the database on a cache miss. It
+    returns None if no user is logged in or if the user is not found.
     
     Returns:
-        User or None: Current user object or None if not logged in
+        CachedUser or None: Read-only snapshot of the current user or None if not logged in
     """
     # Return None if user is not logged in
     if 'user_id' not in session:
         return None
     
     try:
-        # Import User model here to avoid circular imports
-        from app.models import User
-        # Get current user from database using SQLAlchemy
-        return User.query.get(session['user_id'])
+        # Import user cache here to avoid circular imports
+        from app.utils.user_cache import get_cached_user
+        # Get current user from the request/process cache
+        return get_cached_user(session['user_id'])
     except Exception as e:
         # Handle database connection errors
         print(f"Error getting current user: {e}")
@@ -107,4 +108,4 @@ def is_admin():
     # Get current user data
     user = get_current_user()
     # Return True if user exists and has admin username
-    return user and user.username == 'admin' 
\ No newline at end of file
+    return user and user.is_admin 
\ No newline at end of file
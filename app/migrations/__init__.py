@@ -0,0 +1,131 @@
+# Versioned schema migrations for Budget Tracker
+#
+# Each module in this package named vNNN_<description>.py is one migration.
+# It defines VERSION (int), DESCRIPTION (str) and upgrade(connection), and
+# must never change once deployed - add a new module instead.
+
+import pkgutil
+import logging
+import importlib
+from datetime import datetime
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for the Postgres advisory lock held while migrating
+MIGRATION_LOCK_KEY = 74_601_202
+
+# Table recording which migrations have been applied
+version_metadata = sa.MetaData()
+schema_version = sa.Table(
+    'schema_version', version_metadata,
+    sa.Column('version', sa.Integer, primary_key=True),
+    sa.Column('description', sa.String(200), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False, default=datetime.utcnow)
+)
+
+def load_migrations():
+    """
+    Import every migration module in version order.
+
+    Returns:
+        list: Migration modules sorted by VERSION
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        if not module_info.name.startswith('v'):
+            continue
+        module = importlib.import_module(f'{__name__}.{module_info.name}')
+        migrations.append(module)
+    migrations.sort(key=lambda module: module.VERSION)
+    versions = [module.VERSION for module in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+def latest_version():
+    """Version the code expects the database to be at."""
+    migrations = load_migrations()
+    return migrations[-1].VERSION if migrations else 0
+
+def current_version(connection):
+    """
+    Read the database's schema version with a single query.
+
+    Args:
+        connection: SQLAlchemy connection
+
+    Returns:
+        int: Highest applied version, or 0 if the database has never been migrated
+    """
+    try:
+        return connection.execute(sa.select(sa.func.max(schema_version.c.version))).scalar() or 0
+    except (sa.exc.ProgrammingError, sa.exc.OperationalError) as e:
+        connection.rollback()
+        # Postgres raises ProgrammingError and SQLite OperationalError for a missing table
+        if isinstance(e, sa.exc.ProgrammingError) or 'no such table' in str(e):
+            return 0
+        raise
+
+def upgrade(engine, target=None):
+    """
+    Apply pending migrations, each in its own transaction.
+
+    On Postgres an advisory lock makes concurrent runs (e.g. two deploys)
+    wait for each other; the version is re-read under the lock so nothing
+    is applied twice.
+
+    Args:
+        engine: SQLAlchemy engine of the database to migrate
+        target (int): Version to stop at (defaults to the latest)
+
+    Returns:
+        list: Versions applied by this call
+    """
+    migrations = load_migrations()
+    target = target if target is not None else (migrations[-1].VERSION if migrations else 0)
+    applied = []
+    with engine.connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.execute(sa.text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            connection.commit()
+        try:
+            version_metadata.create_all(connection)
+            connection.commit()
+            version = current_version(connection)
+            connection.commit()
+            for migration in migrations:
+                if migration.VERSION <= version or migration.VERSION > target:
+                    continue
+                with connection.begin():
+                    logger.info(f"Applying migration {migration.VERSION}: {migration.DESCRIPTION}")
+                    migration.upgrade(connection)
+                    connection.execute(schema_version.insert().values(
+                        version=migration.VERSION,
+                        description=migration.DESCRIPTION,
+                        applied_at=datetime.utcnow()
+                    ))
+                applied.append(migration.VERSION)
+        finally:
+            if connection.dialect.name == 'postgresql':
+                connection.rollback()
+                connection.execute(sa.text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+                connection.commit()
+    return applied
+
+def history(engine):
+    """
+    List every known migration and whether it has been applied.
+
+    Returns:
+        list: dicts with version, description and applied_at (None if pending)
+    """
+    with engine.connect() as connection:
+        rows = {}
+        if current_version(connection):
+            rows = {row.version: row.applied_at for row in connection.execute(sa.select(schema_version))}
+    return [
+        {'version': m.VERSION, 'description': m.DESCRIPTION, 'applied_at': rows.get(m.VERSION)}
+        for m in load_migrations()
+    ]
@@ -0,0 +1,48 @@
+# Migration 1 - users, categories and transactions tables
+#
+# Tables are declared here as they were first deployed (not imported from
+# app.models) so later model changes can't alter what this migration does.
+# checkfirst lets databases created by the old db.create_all() adopt it.
+
+from datetime import datetime
+
+import sqlalchemy as sa
+
+VERSION = 1
+DESCRIPTION = 'Create users, categories and transactions tables'
+
+metadata = sa.MetaData()
+
+users = sa.Table(
+    'users', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('username', sa.String(80), unique=True, nullable=False),
+    sa.Column('email', sa.String(120), unique=True, nullable=False),
+    sa.Column('password_hash', sa.String(255), nullable=False),
+    sa.Column('created_at', sa.DateTime, default=datetime.utcnow)
+)
+
+categories = sa.Table(
+    'categories', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('name', sa.String(100), nullable=False),
+    sa.Column('category_type', sa.String(20), nullable=False),
+    sa.Column('color', sa.String(7), nullable=False),
+    sa.Column('created_at', sa.DateTime, default=datetime.utcnow)
+)
+
+transactions = sa.Table(
+    'transactions', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('category_id', sa.Integer, sa.ForeignKey('categories.id'), nullable=False),
+    sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+    sa.Column('transaction_type', sa.String(20), nullable=False),
+    sa.Column('date', sa.Date, nullable=False),
+    sa.Column('item_name', sa.String(200), nullable=False),
+    sa.Column('created_at', sa.DateTime, default=datetime.utcnow)
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,36 @@
+# Migration 2 - running totals table and history pagination index
+
+from datetime import datetime
+
+import sqlalchemy as sa
+
+VERSION = 2
+DESCRIPTION = 'Add user_summaries table and transactions (user_id, date, id) index'
+
+metadata = sa.MetaData()
+
+# Referenced tables, declared only so the foreign key and index can resolve
+users = sa.Table('users', metadata, sa.Column('id', sa.Integer, primary_key=True))
+transactions = sa.Table(
+    'transactions', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer),
+    sa.Column('date', sa.Date)
+)
+
+user_summaries = sa.Table(
+    'user_summaries', metadata,
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    sa.Column('total_income', sa.Numeric(14, 2), nullable=False, default=0),
+    sa.Column('total_expense', sa.Numeric(14, 2), nullable=False, default=0),
+    sa.Column('transaction_count', sa.Integer, nullable=False, default=0),
+    sa.Column('updated_at', sa.DateTime, default=datetime.utcnow)
+)
+
+user_date_id_index = sa.Index(
+    'ix_transactions_user_date_id', transactions.c.user_id, transactions.c.date, transactions.c.id
+)
+
+def upgrade(connection):
+    user_summaries.create(connection, checkfirst=True)
+    user_date_id_index.create(connection, checkfirst=True)
@@ -0,0 +1,38 @@
+# Migration 3 - indexes for the per-user query patterns
+
+import sqlalchemy as sa
+
+VERSION = 3
+DESCRIPTION = 'Add (user_id, transaction_type, date), (category_id) and categories (user_id, category_type) indexes'
+
+metadata = sa.MetaData()
+
+# Indexed columns only; the tables already exist
+categories = sa.Table(
+    'categories', metadata,
+    sa.Column('user_id', sa.Integer),
+    sa.Column('category_type', sa.String(20))
+)
+transactions = sa.Table(
+    'transactions', metadata,
+    sa.Column('user_id', sa.Integer),
+    sa.Column('category_id', sa.Integer),
+    sa.Column('transaction_type', sa.String(20)),
+    sa.Column('date', sa.Date)
+)
+
+indexes = [
+    sa.Index('ix_transactions_user_type_date', transactions.c.user_id, transactions.c.transaction_type, transactions.c.date),
+    sa.Index('ix_transactions_category_id', transactions.c.category_id),
+    sa.Index('ix_categories_user_type', categories.c.user_id, categories.c.category_type),
+]
+
+def upgrade(connection):
+    for index in indexes:
+        index.create(connection, checkfirst=True)
+    # Refresh planner statistics so the new indexes are used straight away
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('ANALYZE transactions')
+        connection.exec_driver_sql('ANALYZE categories')
+    else:
+        connection.exec_driver_sql('ANALYZE')
@@ -0,0 +1,31 @@
+# Migration 4 - progress tracking for bank statement imports
+
+from datetime import datetime
+
+import sqlalchemy as sa
+
+VERSION = 4
+DESCRIPTION = 'Add import_jobs table'
+
+metadata = sa.MetaData()
+
+# Referenced table, declared only so the foreign key can resolve
+users = sa.Table('users', metadata, sa.Column('id', sa.Integer, primary_key=True))
+
+import_jobs = sa.Table(
+    'import_jobs', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True),
+    sa.Column('filename', sa.String(255), nullable=False),
+    sa.Column('file_format', sa.String(10), nullable=False),
+    sa.Column('status', sa.String(20), nullable=False, default='pending'),
+    sa.Column('rows_read', sa.Integer, nullable=False, default=0),
+    sa.Column('rows_imported', sa.Integer, nullable=False, default=0),
+    sa.Column('rows_skipped', sa.Integer, nullable=False, default=0),
+    sa.Column('error', sa.Text),
+    sa.Column('created_at', sa.DateTime, default=datetime.utcnow),
+    sa.Column('finished_at', sa.DateTime)
+)
+
+def upgrade(connection):
+    import_jobs.create(connection, checkfirst=True)
@@ -0,0 +1,24 @@
+# Migration 5 - periodically refreshed totals for the admin dashboard
+
+from datetime import datetime
+
+import sqlalchemy as sa
+
+VERSION = 5
+DESCRIPTION = 'Add system_stats table'
+
+metadata = sa.MetaData()
+
+system_stats = sa.Table(
+    'system_stats', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('total_users', sa.Integer, nullable=False, default=0),
+    sa.Column('total_categories', sa.Integer, nullable=False, default=0),
+    sa.Column('total_transactions', sa.Integer, nullable=False, default=0),
+    sa.Column('total_income', sa.Numeric(16, 2), nullable=False, default=0),
+    sa.Column('total_expense', sa.Numeric(16, 2), nullable=False, default=0),
+    sa.Column('refreshed_at', sa.DateTime, default=datetime.utcnow)
+)
+
+def upgrade(connection):
+    system_stats.create(connection, checkfirst=True)
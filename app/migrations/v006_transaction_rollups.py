@@ -0,0 +1,53 @@
+# Migration 6 - daily and monthly per-category totals for the charts
+
+import sqlalchemy as sa
+
+VERSION = 6
+DESCRIPTION = 'Add transaction_rollups table and backfill it'
+
+metadata = sa.MetaData()
+
+# Referenced tables, declared only as far as the backfill needs them
+users = sa.Table('users', metadata, sa.Column('id', sa.Integer, primary_key=True))
+categories = sa.Table('categories', metadata, sa.Column('id', sa.Integer, primary_key=True))
+transactions = sa.Table(
+    'transactions', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer),
+    sa.Column('category_id', sa.Integer),
+    sa.Column('amount', sa.Numeric(10, 2)),
+    sa.Column('transaction_type', sa.String(20)),
+    sa.Column('date', sa.Date)
+)
+
+transaction_rollups = sa.Table(
+    'transaction_rollups', metadata,
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    sa.Column('granularity', sa.String(5), primary_key=True),
+    sa.Column('bucket_date', sa.Date, primary_key=True),
+    sa.Column('category_id', sa.Integer, sa.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    sa.Column('transaction_type', sa.String(20), primary_key=True),
+    sa.Column('total', sa.Numeric(14, 2), nullable=False, default=0),
+    sa.Column('transaction_count', sa.Integer, nullable=False, default=0),
+    sa.Index('ix_transaction_rollups_category_id', 'category_id')
+)
+
+def month_start(connection, column):
+    """SQL expression for the first day of a date column's month."""
+    if connection.dialect.name == 'postgresql':
+        return sa.cast(sa.func.date_trunc('month', column), sa.Date)
+    return sa.func.date(column, 'start of month')
+
+def upgrade(connection):
+    transaction_rollups.create(connection, checkfirst=True)
+    connection.execute(transaction_rollups.delete())
+    # Backfill both granularities with one INSERT ... SELECT each
+    for granularity, bucket in (('day', transactions.c.date),
+                                ('month', month_start(connection, transactions.c.date))):
+        connection.execute(transaction_rollups.insert().from_select(
+            ['user_id', 'granularity', 'bucket_date', 'category_id', 'transaction_type', 'total', 'transaction_count'],
+            sa.select(
+                transactions.c.user_id, sa.literal(granularity), bucket, transactions.c.category_id,
+                transactions.c.transaction_type, sa.func.sum(transactions.c.amount), sa.func.count(transactions.c.id)
+            ).group_by(transactions.c.user_id, bucket, transactions.c.category_id, transactions.c.transaction_type)
+        ))
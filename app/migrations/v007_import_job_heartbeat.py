@@ -0,0 +1,11 @@
+# Migration 7 - heartbeat for bank statement imports
+
+import sqlalchemy as sa
+
+VERSION = 7
+DESCRIPTION = 'Add import_jobs.updated_at heartbeat'
+
+def upgrade(connection):
+    columns = {column['name'] for column in sa.inspect(connection).get_columns('import_jobs')}
+    if 'updated_at' not in columns:
+        connection.execute(sa.text('ALTER TABLE import_jobs ADD COLUMN updated_at TIMESTAMP'))
@@ -1,7 +1,8 @@
 # Marwin - SQLAlchemy Models for Budget Tracker
 
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.passwords import password_hasher
+from app.utils.login_throttle import login_throttle
 from sqlalchemy.orm import relationship
 
 # Import db from the main app
@@ -27,12 +28,18 @@ class User(db.Model):
     transactions = relationship('Transaction', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hash and set the user's password."""
-        self.password_hash = generate_password_hash(password)
+        """Hash and set the user's password with the current hashing policy."""
+        self.password_hash = password_hasher.hash(password)
+        # The new password may be one this worker remembers as having failed
+        login_throttle.forget_failed_passwords(self.username or '')
     
     def check_password(self, password):
-        """Check if the provided password matches the stored hash."""
-        return check_password_hash(self.password_hash, password)
+        """Check if the provided password matches the stored hash (computed on the hashing pool)."""
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """True if the stored hash was made with different parameters than the current policy."""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Convert user object to dictionary for JSON serialization."""
@@ -54,6 +61,10 @@ class Category(db.Model):
     to users and transactions.
     """
     __tablename__ = 'categories'
+    __table_args__ = (
+        # A user's income or expense categories (forms, chart legends)
+        db.Index('ix_categories_user_type', 'user_id', 'category_type'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -87,6 +98,15 @@ class Transaction(db.Model):
     to users and categories.
     """
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Keyset pagination of a user's history (newest first by date, then id);
+        # its (user_id, date) prefix also serves date-range filters
+        db.Index('ix_transactions_user_date_id', 'user_id', 'date', 'id'),
+        # Income/expense charts and totals over a date range
+        db.Index('ix_transactions_user_type_date', 'user_id', 'transaction_type', 'date'),
+        # Transactions of a category (category deletes, cascades)
+        db.Index('ix_transactions_category_id', 'category_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -113,14 +133,151 @@ class Transaction(db.Model):
     def __repr__(self):
         return f'<Transaction {self.item_name} ({self.amount})>'
 
+class UserSummary(db.Model):
+    """
+    Running totals model for SQLAlchemy database.
+
+    This model keeps one row per user with the all-time income and expense
+    totals and transaction count, updated whenever the user's transactions
+    change so summary pages don't need to scan the whole history.
+    """
+    __tablename__ = 'user_summaries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_income = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_expense = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    user = relationship('User', backref=db.backref('summary', uselist=False, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        """Convert summary object to dictionary for JSON serialization."""
+        return {
+            'user_id': self.user_id,
+            'total_income': float(self.total_income) if self.total_income else 0.0,
+            'total_expense': float(self.total_expense) if self.total_expense else 0.0,
+            'transaction_count': self.transaction_count or 0,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<UserSummary {self.user_id} (+{self.total_income} / -{self.total_expense})>'
+
+class TransactionRollup(db.Model):
+    """
+    Time-bucketed totals model for SQLAlchemy database.
+
+    This model keeps one row per user, category, type and day (or month)
+    with the summed amount and transaction count, updated whenever the
+    user's transactions change so charts read a row per bucket instead of
+    every transaction.
+    """
+    __tablename__ = 'transaction_rollups'
+    __table_args__ = (
+        # Category deletes remove the category's buckets
+        db.Index('ix_transaction_rollups_category_id', 'category_id'),
+    )
+
+    # Primary key order serves the chart reads: one user, one granularity, a date range
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)  # 'day' or 'month'
+    bucket_date = db.Column(db.Date, primary_key=True)  # The day, or the first day of the month
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    transaction_type = db.Column(db.String(20), primary_key=True)  # 'income' or 'expense'
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Relationships
+    user = relationship('User', backref=db.backref('rollups', cascade='all, delete-orphan'))
+    category = relationship('Category', backref=db.backref('rollups', cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<TransactionRollup {self.user_id} {self.granularity} {self.bucket_date} {self.transaction_type}>'
+
+class SystemStats(db.Model):
+    """
+    System-wide totals model for SQLAlchemy database.
+
+    This model holds a single row with the admin dashboard totals. It is
+    only used when SYSTEM_STATS_REFRESH_INTERVAL is set, in which case the
+    background health monitor refreshes it periodically.
+    """
+    __tablename__ = 'system_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    total_categories = db.Column(db.Integer, nullable=False, default=0)
+    total_transactions = db.Column(db.Integer, nullable=False, default=0)
+    total_income = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    total_expense = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert stats row to dictionary (amounts stay Decimal for display)."""
+        return {
+            'total_users': self.total_users,
+            'total_categories': self.total_categories,
+            'total_transactions': self.total_transactions,
+            'total_income': self.total_income,
+            'total_expense': self.total_expense,
+            'refreshed_at': self.refreshed_at
+        }
+
+    def __repr__(self):
+        return f'<SystemStats {self.total_users} users, {self.total_transactions} transactions>'
+
+class ImportJob(db.Model):
+    """
+    Import job model for SQLAlchemy database.
+
+    This model tracks one uploaded bank statement while it is imported in
+    the background, so any worker can report its progress.
+    """
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    file_format = db.Column(db.String(10), nullable=False)  # 'csv' or 'ofx'
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'running', 'done' or 'failed'
+    rows_read = db.Column(db.Integer, nullable=False, default=0)
+    rows_imported = db.Column(db.Integer, nullable=False, default=0)
+    rows_skipped = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Heartbeat, bumped per batch
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert import job object to dictionary for JSON serialization."""
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'format': self.file_format,
+            'status': self.status,
+            'rows_read': self.rows_read,
+            'rows_imported': self.rows_imported,
+            'rows_skipped': self.rows_skipped,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.filename} ({self.status})>'
+
 # Database initialization function
 def init_db(app):
     """Initialize the database with the Flask app."""
     db.init_app(app)
     
     with app.app_context():
-        # Create all tables
-        db.create_all()
+        # Create or upgrade tables through the versioned migrations
+        from app.migrations import upgrade
+        upgrade(db.engine)
         print("Database tables created successfully!")
 
 # Migration helper function
@@ -129,69 +286,97 @@ def migrate_from_json(json_file_path):
     Migrate data from JSON file to SQLAlchemy database.
     
     This function reads the existing JSON database and creates corresponding
-    records in the SQLAlchemy database.
+    records in the SQLAlchemy database. Existing rows are found with one
+    query per table, rows without an id get ids from one block reservation,
+    and each table is written with a single bulk INSERT. Users that already
+    exist (matched by username) keep their id and the JSON categories and
+    transactions are attached to it. Afterwards the id sequences are moved
+    past the copied ids so ordinary inserts don't collide with them.
     """
     import json
     import os
+    from app.utils.ids import reserve_ids, sync_id_sequence
     
     if not os.path.exists(json_file_path):
         print(f"JSON file {json_file_path} not found. Skipping migration.")
         return
     
+    def parse_created_at(data):
+        return datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.utcnow()
+    
+    def assign_ids(model_class, rows):
+        # Rows exported without an id get one from a single reserved block
+        missing = [row for row in rows if row.get('id') is None]
+        for row, new_id in zip(missing, reserve_ids(model_class, len(missing))):
+            row['id'] = new_id
+    
     try:
         with open(json_file_path, 'r') as f:
             json_data = json.load(f)
+        users_data = json_data.get('users', [])
+        categories_data = json_data.get('categories', [])
+        transactions_data = json_data.get('transactions', [])
+        
+        # Migrate users, mapping JSON user ids onto existing accounts with the same username
+        existing_users = dict(db.session.query(User.username, User.id).filter(
+            User.username.in_([user_data['username'] for user_data in users_data])
+        ).all()) if users_data else {}
+        user_ids = {}
+        new_users = []
+        for user_data in users_data:
+            if user_data['username'] in existing_users:
+                user_ids[user_data.get('id')] = existing_users[user_data['username']]
+                continue
+            new_users.append({
+                'id': user_data.get('id'),
+                'username': user_data['username'],
+                'email': user_data['email'],
+                'password_hash': user_data['password_hash'],
+                'created_at': parse_created_at(user_data)
+            })
+        assign_ids(User, new_users)
         
-        # Migrate users
-        for user_data in json_data.get('users', []):
-            user = User.query.filter_by(username=user_data['username']).first()
-            if not user:
-                user = User(
-                    id=user_data['id'],
-                    username=user_data['username'],
-                    email=user_data['email'],
-                    password_hash=user_data['password_hash']
-                )
-                if 'created_at' in user_data:
-                    user.created_at = datetime.fromisoformat(user_data['created_at'])
-                db.session.add(user)
+        # Migrate categories whose id isn't taken yet
+        existing_categories = {category_id for (category_id,) in db.session.query(Category.id).filter(
+            Category.id.in_([c['id'] for c in categories_data if c.get('id') is not None])
+        ).all()}
+        new_categories = [{
+            'id': category_data.get('id'),
+            'user_id': user_ids.get(category_data['user_id'], category_data['user_id']),
+            'name': category_data['name'],
+            'category_type': category_data['category_type'],
+            'color': category_data['color'],
+            'created_at': parse_created_at(category_data)
+        } for category_data in categories_data if category_data.get('id') not in existing_categories]
+        assign_ids(Category, new_categories)
         
-        # Migrate categories
-        for category_data in json_data.get('categories', []):
-            category = Category.query.filter_by(id=category_data['id']).first()
-            if not category:
-                category = Category(
-                    id=category_data['id'],
-                    user_id=category_data['user_id'],
-                    name=category_data['name'],
-                    category_type=category_data['category_type'],
-                    color=category_data['color']
-                )
-                if 'created_at' in category_data:
-                    category.created_at = datetime.fromisoformat(category_data['created_at'])
-                db.session.add(category)
+        # Migrate transactions whose id isn't taken yet
+        existing_transactions = {transaction_id for (transaction_id,) in db.session.query(Transaction.id).filter(
+            Transaction.id.in_([t['id'] for t in transactions_data if t.get('id') is not None])
+        ).all()}
+        new_transactions = [{
+            'id': transaction_data.get('id'),
+            'user_id': user_ids.get(transaction_data['user_id'], transaction_data['user_id']),
+            'category_id': transaction_data['category_id'],
+            'amount': transaction_data['amount'],
+            'transaction_type': transaction_data['transaction_type'],
+            'date': datetime.fromisoformat(transaction_data['date']).date(),
+            'item_name': transaction_data['item_name'],
+            'created_at': parse_created_at(transaction_data)
+        } for transaction_data in transactions_data if transaction_data.get('id') not in existing_transactions]
+        assign_ids(Transaction, new_transactions)
         
-        # Migrate transactions
-        for transaction_data in json_data.get('transactions', []):
-            transaction = Transaction.query.filter_by(id=transaction_data['id']).first()
-            if not transaction:
-                transaction = Transaction(
-                    id=transaction_data['id'],
-                    user_id=transaction_data['user_id'],
-                    category_id=transaction_data['category_id'],
-                    amount=transaction_data['amount'],
-                    transaction_type=transaction_data['transaction_type'],
-                    date=datetime.fromisoformat(transaction_data['date']).date(),
-                    item_name=transaction_data['item_name']
-                )
-                if 'created_at' in transaction_data:
-                    transaction.created_at = datetime.fromisoformat(transaction_data['created_at'])
-                db.session.add(transaction)
+        # One bulk INSERT per table, then move the sequences past the copied ids
+        for model_class, rows in ((User, new_users), (Category, new_categories), (Transaction, new_transactions)):
+            if rows:
+                db.session.execute(db.insert(model_class), rows)
+            sync_id_sequence(model_class)
         
         db.session.commit()
-        print(f"Successfully migrated data from {json_file_path}")
+        print(f"Successfully migrated data from {json_file_path} "
+              f"({len(new_users)} users, {len(new_categories)} categories, {len(new_transactions)} transactions)")
         
     except Exception as e:
         db.session.rollback()
         print(f"Error during migration: {e}")
-        raise 
\ No newline at end of file
+        raise
@@ -1,17 +1,25 @@
 # Vince - Updated for SQLAlchemy
 
 # Import Flask components for admin routes
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
 # Import datetime for date handling
 from datetime import datetime
 # Import login decorator for protected routes
 from app.decorators import login_required, admin_required
 # Import models for database operations
-from app.models import User, Category, Transaction
+from app.models import User, Category, Transaction, db
 # Import JSON for data serialization
 import json
 # Import save_database utility
 from app.utils.database import save_database
+# Import cache invalidation for edited/deleted users
+from app.utils.user_cache import invalidate_user
+# Import session revocation for deleted users
+from app.utils.sessions import revoke_user_sessions
+# Import cached system-wide totals for the dashboard
+from app.utils.system_stats import get_system_stats
+# Import the server-side cursor batch size used by downloads
+from app.utils.export import EXPORT_BATCH_SIZE
 
 # Create admin blueprint for organizing admin routes
 admin_bp = Blueprint('admin', __name__)
@@ -30,35 +38,17 @@ def dashboard():
     Returns:
         str: Rendered admin dashboard template with statistics
     """
-    try:
-        # Get database statistics using SQLAlchemy
-        total_users = User.query.count()
-        total_categories = Category.query.count()
-        total_transactions = Transaction.query.count()
-        
-        # Calculate total income and expense across all users
-        total_income = sum(t.amount for t in Transaction.query.filter_by(transaction_type='income').all())
-        total_expense = sum(t.amount for t in Transaction.query.filter_by(transaction_type='expense').all())
-        
-        # Render admin dashboard with statistics
-        return render_template('admin_functions/admin_dashboard.html',
-                               total_users=total_users,
-                               total_categories=total_categories,
-                               total_transactions=total_transactions,
-                               total_income=total_income,
-                               total_expense=total_expense)
+    # One aggregate query, cached for a few seconds (zeros if the database is unavailable)
+    stats = get_system_stats()
     
-    except Exception as e:
-        # Log the error for debugging
-        print(f"Error in admin dashboard route: {e}")
-        
-        # Return fallback values if database connection fails
-        return render_template('admin_functions/admin_dashboard.html',
-                               total_users=0,
-                               total_categories=0,
-                               total_transactions=0,
-                               total_income=0,
-                               total_expense=0)
+    # Render admin dashboard with statistics
+    return render_template('admin_functions/admin_dashboard.html',
+                           total_users=stats['total_users'],
+                           total_categories=stats['total_categories'],
+                           total_transactions=stats['total_transactions'],
+                           total_income=stats['total_income'],
+                           total_expense=stats['total_expense'],
+                           stats_refreshed_at=stats['refreshed_at'])
 
 # Route: /admin/users - Shows user management page with all users
 @admin_bp.route('/admin/users')
@@ -143,6 +133,7 @@ def edit_user(user_id):
         if new_password:
             user_to_edit.set_password(new_password)
         save_database()
+        invalidate_user(user_id)
         
     except Exception as e:
         # Handle any errors during update
@@ -181,6 +172,9 @@ def delete_user(user_id):
         username = user_to_delete.username
         db.session.delete(user_to_delete)
         save_database()
+        invalidate_user(user_id)
+        # Log the deleted user out of every device
+        revoke_user_sessions(user_id)
         
     except Exception as e:
         # Handle any errors during deletion
@@ -188,49 +182,160 @@ def delete_user(user_id):
     
     return redirect(url_for('admin.users'))
 
-# Route: /admin/database - Shows raw database content for debugging
+# Rows per page in the database viewer, and the most an admin can ask for
+DATABASE_PAGE_SIZE = 50
+DATABASE_MAX_PAGE_SIZE = 500
+
+# Tables the database viewer can show
+DATABASE_TABLES = ('users', 'categories', 'transactions')
+
+# Query arguments the viewer filters on (see build_database_query)
+DATABASE_FILTERS = ('q', 'user_id', 'category_id', 'type', 'start_date', 'end_date')
+
+def build_database_query(table, args):
+    """
+    Builds the filtered, id-ordered query for one table of the database viewer.
+    
+    Filters (all optional):
+        users: q (part of the username or email)
+        categories: user_id, type
+        transactions: user_id, category_id, type, start_date, end_date (YYYY-MM-DD)
+    
+    Args:
+        table: 'users', 'categories' or 'transactions'
+        args: Request arguments holding the filters
+    
+    Returns:
+        tuple: (query, model) - for transactions the query yields (Transaction, category name) pairs
+    
+    Raises:
+        ValueError: If a filter value is malformed
+    """
+    if table == 'users':
+        query = User.query
+        search = args.get('q', '').strip()
+        if search:
+            pattern = f"%{search}%"
+            query = query.filter(User.username.ilike(pattern) | User.email.ilike(pattern))
+        return query, User
+
+    if table == 'categories':
+        query = Category.query
+        if args.get('user_id'):
+            query = query.filter(Category.user_id == int(args['user_id']))
+        if args.get('type'):
+            query = query.filter(Category.category_type == args['type'])
+        return query, Category
+
+    # Transactions, with the category name joined in the same query
+    query = db.session.query(Transaction, Category.name).outerjoin(
+        Category, Category.id == Transaction.category_id
+    )
+    if args.get('user_id'):
+        query = query.filter(Transaction.user_id == int(args['user_id']))
+    if args.get('category_id'):
+        query = query.filter(Transaction.category_id == int(args['category_id']))
+    if args.get('type'):
+        query = query.filter(Transaction.transaction_type == args['type'])
+    if args.get('start_date'):
+        query = query.filter(Transaction.date >= datetime.strptime(args['start_date'], '%Y-%m-%d').date())
+    if args.get('end_date'):
+        query = query.filter(Transaction.date <= datetime.strptime(args['end_date'], '%Y-%m-%d').date())
+    return query, Transaction
+
+def row_to_dict(table, row):
+    """Converts one database viewer row to a dictionary for JSON output."""
+    if table != 'transactions':
+        return row.to_dict()
+    transaction, category_name = row
+    data = transaction.to_dict()
+    data['category_name'] = category_name
+    return data
+
+# Route: /admin/database - Shows one page of one table for debugging
 @admin_bp.route('/admin/database')
 @admin_required
 def view_database():
     """
-    Displays the raw database content for administrators.
+    Displays one page of a database table for administrators.
     
-    This route provides a detailed view of all database content including
-    users, categories, and transactions in both formatted and JSON formats.
-    It's useful for debugging and system administration.
+    Only the requested table is queried, filtered on the server, and read
+    one page at a time with keyset pagination on id ('after' is the last id
+    of the previous page), so the page costs the same however large the
+    tables grow.
     
     Returns:
-        str: Rendered database viewer template with all data
+        str: Rendered database viewer template with one page of rows
     """
+    table = request.args.get('table', 'users')
+    if table not in DATABASE_TABLES:
+        table = 'users'
+    page_size = max(1, min(request.args.get('limit', DATABASE_PAGE_SIZE, type=int), DATABASE_MAX_PAGE_SIZE))
+    after = request.args.get('after', type=int)
+    filters = {key: request.args[key] for key in DATABASE_FILTERS if request.args.get(key)}
+
     try:
-        # Get database data for admin database viewer
-        all_users = User.query.all()
-        all_categories = Category.query.all()
-        all_transactions = Transaction.query.all()
-        
-        # Convert data to JSON format for display
-        users_json = json.dumps([user.to_dict() for user in all_users], indent=4)
-        categories_json = json.dumps([category.to_dict() for category in all_categories], indent=4)
-        transactions_json = json.dumps([transaction.to_dict() for transaction in all_transactions], indent=4)
-        
-        # Render database viewer template with all data
-        return render_template('admin_functions/admin_view_database.html',
-                               users_json=users_json,
-                               categories_json=categories_json,
-                               transactions_json=transactions_json,
-                               users=all_users,
-                               categories=all_categories,
-                               transactions=all_transactions)
-    
+        query, model = build_database_query(table, request.args)
+        if after:
+            query = query.filter(model.id > after)
+        # Fetch one extra row to know whether there is a next page
+        rows = query.order_by(model.id).limit(page_size + 1).all()
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        last_id = (rows[-1][0] if table == 'transactions' else rows[-1]).id if rows else None
+        next_url = url_for('admin.view_database', table=table, after=last_id, limit=page_size, **filters) if has_next else None
+        error = None
+    except ValueError:
+        rows, next_url, error = [], None, 'Invalid filter value'
     except Exception as e:
         # Log the error for debugging
         print(f"Error in admin database view route: {e}")
-        
-        # Return empty data if database connection fails
-        return render_template('admin_functions/admin_view_database.html',
-                               users_json='[]',
-                               categories_json='[]',
-                               transactions_json='[]',
-                               users=[],
-                               categories=[],
-                               transactions=[]) 
\ No newline at end of file
+        rows, next_url, error = [], None, 'Could not load data from the database'
+
+    # Render database viewer template with this page of rows
+    return render_template('admin_functions/admin_view_database.html',
+                           table=table,
+                           tables=DATABASE_TABLES,
+                           rows=rows,
+                           filters=filters,
+                           page_size=page_size,
+                           after=after,
+                           next_url=next_url,
+                           error=error,
+                           download_url=url_for('admin.export_table', table=table, **filters))
+
+# Route: /admin/database/<table>.ndjson - Streams a whole (filtered) table as NDJSON
+@admin_bp.route('/admin/database/<string:table>.ndjson')
+@admin_required
+def export_table(table):
+    """
+    Streams every row of a table matching the viewer's filters as NDJSON.
+    
+    Rows are read with yield_per(), which uses a server-side cursor, and
+    written one batch at a time, so memory stays flat regardless of size.
+    
+    Returns:
+        Response: Streamed NDJSON download, or JSON error (400/404)
+    """
+    if table not in DATABASE_TABLES:
+        return jsonify({'error': 'Unknown table'}), 404
+    try:
+        query, model = build_database_query(table, request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid filter value'}), 400
+
+    def generate():
+        lines = []
+        for row in query.order_by(model.id).yield_per(EXPORT_BATCH_SIZE):
+            lines.append(json.dumps(row_to_dict(table, row)))
+            if len(lines) == EXPORT_BATCH_SIZE:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{table}-{datetime.now().strftime("%Y%m%d")}.ndjson"'}
+    )
@@ -9,7 +9,12 @@ from app.models import User, Category
 # Import login decorator for protected routes
 from app.decorators import login_required
 # Import database utility functions
-from app.utils.database import create_user, authenticate_user, get_user_by_username, create_category, check_database_connection, force_sqlite_fallback, is_using_fallback
+from app.utils.database import authenticate_user, check_database_connection, force_sqlite_fallback, is_using_fallback, record_database_failure
+from sqlalchemy.exc import SQLAlchemyError
+from app.utils.health_monitor import health_monitor
+from app.utils.login_throttle import login_throttle
+from app.utils.sessions import regenerate_session_id
+from app.utils.registration import register_user, RegistrationConflict, RegistrationError
 import logging
 
 # Configure logging
@@ -31,6 +36,14 @@ def login():
             username = request.form['username']
             password = request.form['password']
 
+            # Turn away locked-out usernames/IPs before any database or hashing work
+            retry_after = login_throttle.retry_after(username, request.remote_addr)
+            if retry_after:
+                minutes = max(1, round(retry_after / 60))
+                flash(f"Too many failed login attempts. Please try again in {minutes} minute{'s' if minutes != 1 else ''}.", 'error')
+                logger.warning(f"Throttled login attempt for username: {username} from {request.remote_addr}")
+                return render_template('login.html'), 429, {'Retry-After': str(int(retry_after) + 1)}
+
             # BULLETPROOF: Check database connection with automatic fallback
             if not check_database_connection():
                 # Force fallback to SQLite
@@ -38,11 +51,12 @@ def login():
                 logger.info("Database connection failed - using SQLite fallback")
 
             # Authenticate user with provided credentials
-            user = authenticate_user(username, password)
+            user = authenticate_user(username, password, remote_addr=request.remote_addr)
 
             # If authentication successful, create session
             if user:
-                # Store user ID and username in session
+                # Start a fresh session id, then store user ID and username in session
+                regenerate_session_id(session)
                 session['user_id'] = user.id
                 session['username'] = user.username
                 
@@ -60,8 +74,9 @@ def login():
                 
         except Exception as e:
             logger.error(f"Error during login process: {e}")
-            # Force fallback and try again
-            force_sqlite_fallback()
+            # Count database errors towards the circuit breaker
+            if isinstance(e, SQLAlchemyError):
+                record_database_failure(e)
             flash('Invalid username or password. Please try again.', 'error')
     
     # Render login template for GET requests
@@ -76,6 +91,11 @@ def register():
     """
     # Handle POST request for registration form submission
     if request.method == 'POST':
+        # New accounts can't be created in the SQLite fallback (usernames must stay unique in Supabase)
+        if is_using_fallback():
+            flash('Registration is temporarily unavailable. Please try again in a few minutes.', 'error')
+            return render_template('register.html')
+
         # Get form data for new user registration
         username = request.form['username']
         email = request.form['email']
@@ -87,31 +107,23 @@ def register():
             flash('Passwords do not match. Please try again.', 'error')
             return render_template('register.html')
 
-        # Check if username already exists in database
-        if get_user_by_username(username):
-            flash('Username already exists. Please choose a different username.', 'error')
+        # Create the user and its default categories in one transaction
+        try:
+            register_user(username, email, password)
+        except RegistrationConflict as e:
+            if e.field == 'username':
+                flash('Username already exists. Please choose a different username.', 'error')
+            else:
+                flash('An account with this email already exists.', 'error')
             return render_template('register.html')
-
-        # Create new user account in database
-        new_user = create_user(username, email, password)
-        
-        if not new_user:
+        except (RegistrationError, SQLAlchemyError) as e:
+            logger.error(f"Error during registration: {e}")
+            # Count database errors towards the circuit breaker
+            if isinstance(e, SQLAlchemyError):
+                record_database_failure(e)
             flash('Registration failed. Please try again.', 'error')
             return render_template('register.html')
 
-        # Define default categories for new user
-        default_categories_data = [
-            {'name': 'Salary', 'type': 'income', 'color': '#28a745'},
-            {'name': 'Food', 'type': 'expense', 'color': '#dc3545'},
-            {'name': 'Transportation', 'type': 'expense', 'color': '#ffc107'},
-            {'name': 'Utilities', 'type': 'expense', 'color': '#6c757d'},
-            {'name': 'Entertainment', 'type': 'expense', 'color': '#17a2b8'}
-        ]
-
-        # Create default categories for the new user
-        for cat_data in default_categories_data:
-            create_category(new_user.id, cat_data['name'], cat_data['type'], cat_data['color'])
-
         # Show success message and redirect to login
         flash('Registration successful! Please log in.', 'success')
         return redirect(url_for('auth.login'))
@@ -155,8 +167,9 @@ def auth_health_check():
     BULLETPROOF health check endpoint for authentication system.
     """
     try:
-        # Check database connection with fallback
-        db_healthy = check_database_connection()
+        # Check database connection using the background monitor's cached status
+        db_health = health_monitor.status()
+        db_healthy = db_health['healthy']
         
         # Try to get user count
         try:
@@ -177,6 +190,8 @@ def auth_health_check():
             'user_query': user_query_healthy,
             'user_count': user_count,
             'fallback_mode': fallback_status,
+            'last_check': db_health['last_check'],
+            'latency_ms': db_health['latency_ms'],
             'timestamp': datetime.utcnow().isoformat(),
             'service': 'auth-system'
         }), 200 if (db_healthy or fallback_status) else 503
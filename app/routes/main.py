@@ -1,7 +1,7 @@
 # Vince - Updated for SQLAlchemy
 
 # Import Flask components for main application routes
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
 # Import datetime for date handling and calculations
 from datetime import datetime, timedelta, date
 # Import login decorator for protected routes
@@ -11,7 +11,12 @@ from app.models import User, Category, Transaction
 # Import db from main app
 from app import db
 # Import database utility functions
-from app.utils.database import get_transactions_by_user, get_categories_by_user_and_type, create_transaction, create_category, update_transaction, delete_transaction as delete_transaction_util, get_user_by_id, create_common_users, get_all_users, reset_user_password, check_database_connection, get_database_status, dispose_connection_pool
+from app.utils.database import get_transactions_by_user, get_categories_by_user_and_type, create_transaction, create_category, update_transaction, delete_transaction as delete_transaction_util, get_user_by_id, create_common_users, get_all_users, reset_user_password, check_database_connection, get_database_status, dispose_connection_pool, get_category_chart_totals, get_daily_chart_totals, get_chart_transactions, has_transactions_in_range, get_user_summary, get_categories_by_user, get_transactions_page, get_transaction_totals, decode_history_cursor, is_using_fallback, apply_transaction_batch, TRANSACTION_BATCH_MAX
+from app.utils.user_cache import get_cached_user
+from app.utils.health_monitor import health_monitor
+from app.utils.login_throttle import login_throttle
+from app.utils.importer import start_import, get_import_job, fail_stale_imports, StatementError, IMPORT_MAX_BYTES
+from app.utils.export import iter_export, parquet_available, EXPORT_FORMATS
 import os
 
 # Create main blueprint for organizing application routes
@@ -42,7 +47,8 @@ def reset_connection_pool():
         success = dispose_connection_pool()
         
         if success:
-            # Test connection after reset
+            # Ask the health monitor to re-probe with a fresh connection
+            health_monitor.request_check()
             db_healthy = check_database_connection()
             
             return jsonify({
@@ -83,6 +89,7 @@ def detailed_database_status():
             'timestamp': datetime.now().isoformat(),
             'environment': 'production' if os.environ.get('DATABASE_URL') else 'development',
             'supabase_configured': bool(os.environ.get('DATABASE_URL')),
+            'login_throttle': login_throttle.stats(),
             'connection_pool_info': {
                 'pool_size': db_status.get('pool_size', 'unknown'),
                 'checked_in': db_status.get('checked_in', 'unknown'),
@@ -112,15 +119,16 @@ def health_check():
     Health check endpoint to monitor database and app status.
     """
     try:
-        from app.utils.database import check_database_connection
-        
-        # Check database connection
-        db_healthy = check_database_connection()
+        # Read the status cached by the background health monitor
+        db_health = health_monitor.status()
+        db_healthy = db_health['healthy']
         
         health_status = {
             'status': 'healthy' if db_healthy else 'degraded',
             'database': 'connected' if db_healthy else 'connection_limited',
             'message': 'Your Supabase data is safe and accessible' if db_healthy else 'Supabase connection limited - your data is safe, try again in 15-30 minutes',
+            'last_check': db_health['last_check'],
+            'latency_ms': db_health['latency_ms'],
             'timestamp': datetime.now().isoformat()
         }
         
@@ -319,12 +327,10 @@ def dashboard():
     try:
         # Get current user ID from session
         user_id = session['user_id']
-        # Get all transactions for current user
-        user_transactions = get_transactions_by_user(user_id)
-
-        # Calculate total income and expenses for user
-        total_income = sum(t.amount for t in user_transactions if t.transaction_type == 'income')
-        total_expense = sum(t.amount for t in user_transactions if t.transaction_type == 'expense')
+        # Get the maintained running totals for current user
+        summary = get_user_summary(user_id)
+        total_income = summary['total_income']
+        total_expense = summary['total_expense']
 
         # Render dashboard with financial summary
         return render_template('dashboard.html',
@@ -446,23 +452,28 @@ def add_transaction():
     else:
         return redirect(url_for('main.dashboard'))
 
-# Route: /history - Shows transaction history page with filtering options
-@main_bp.route('/history')
-@login_required
-def history():
+# Default and maximum number of rows per history page
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def build_history_query(user_id, args):
     """
-    Displays the transaction history page for the current user.
+    Builds the filtered transaction query shared by the history page and its JSON feed.
+    
+    Args:
+        user_id: ID of the current user
+        args: Request arguments holding period, start/end dates, type and category_id
+    
+    Returns:
+        Query: Filtered Transaction query (unordered)
     """
-    from datetime import datetime, timedelta
-    user_id = session['user_id']
-    period = request.args.get('period', 'month')
-    start_date = request.args.get('start_date') or request.args.get('start')
-    end_date = request.args.get('end_date') or request.args.get('end')
-    transaction_type = request.args.get('type')
-    category_id = request.args.get('category_id')
+    period = args.get('period', 'month')
+    start_date = args.get('start_date') or args.get('start')
+    end_date = args.get('end_date') or args.get('end')
+    transaction_type = args.get('type')
+    category_id = args.get('category_id')
 
     # Build base query
-    from app.models import Transaction
     query = Transaction.query.filter_by(user_id=user_id)
 
     # Date filtering
@@ -495,12 +506,31 @@ def history():
     if category_id:
         query = query.filter(Transaction.category_id == int(category_id))
 
-    # Get filtered transactions
-    transactions = query.order_by(Transaction.date.desc()).all()
+    return query
 
-    # Enhance transactions with category name and color
+def get_history_page_size(args):
+    """
+    Reads the requested page size, clamped to a sane range.
+    
+    Args:
+        args: Request arguments holding an optional 'limit'
+    
+    Returns:
+        int: Number of rows per page
+    """
+    page_size = args.get('limit', HISTORY_PAGE_SIZE, type=int)
+    return max(1, min(page_size, HISTORY_MAX_PAGE_SIZE))
+
+def attach_category_details(transactions, categories_by_id):
+    """
+    Sets category_name and category_color on each transaction for display.
+    
+    Args:
+        transactions: List of Transaction objects
+        categories_by_id: Dictionary mapping category ID to Category
+    """
     for transaction in transactions:
-        cat = Category.query.filter_by(id=transaction.category_id, user_id=user_id).first()
+        cat = categories_by_id.get(transaction.category_id)
         if cat:
             transaction.category_name = cat.name
             transaction.category_color = cat.color
@@ -508,15 +538,160 @@ def history():
             transaction.category_name = 'Uncategorized'
             transaction.category_color = '#6c757d'
 
+# Route: /history - Shows transaction history page with filtering options
+@main_bp.route('/history')
+@login_required
+def history():
+    """
+    Displays the transaction history page for the current user.
+    
+    Rows are paginated newest first using a (date, id) keyset cursor, so
+    each page is a bounded index range scan. The summary cards use totals
+    computed by the database over the whole filtered period.
+    """
+    user_id = session['user_id']
+    query = build_history_query(user_id, request.args)
+
+    # Get the first page of filtered transactions and totals for the period
+    transactions, next_cursor = get_transactions_page(
+        query, request.args.get('cursor'), get_history_page_size(request.args)
+    )
+    period_totals = get_transaction_totals(query)
+
+    # Load the user's categories once; they serve both the rows and the edit modal
+    user_categories = get_categories_by_user(user_id)
+    attach_category_details(transactions, {c.id: c for c in user_categories})
+
     # Get categories for the edit modal
-    income_categories = get_categories_by_user_and_type(user_id, 'income')
-    expense_categories = get_categories_by_user_and_type(user_id, 'expense')
     all_categories = [
         {'id': c.id, 'name': c.name, 'type': c.category_type, 'color': c.color}
-        for c in income_categories + expense_categories
+        for c in user_categories
     ]
 
-    return render_template('history.html', transactions=transactions, all_categories=all_categories)
+    return render_template('history.html', transactions=transactions, all_categories=all_categories,
+                           next_cursor=next_cursor, period_totals=period_totals)
+
+# Route: /get_history_page - Returns one page of transaction history as JSON for infinite scroll
+@main_bp.route('/get_history_page')
+@login_required
+def get_history_page():
+    """
+    Provides a page of transaction history for AJAX requests.
+    
+    Accepts the same filters as the history page plus 'cursor' (from the
+    previous page's next_cursor) and 'limit'.
+    
+    Returns:
+        JSON: Transactions on this page and the cursor for the next one
+    """
+    user_id = session['user_id']
+    try:
+        query = build_history_query(user_id, request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid filter parameters'}), 400
+
+    cursor = request.args.get('cursor')
+    if cursor and decode_history_cursor(cursor) is None:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    transactions, next_cursor = get_transactions_page(query, cursor, get_history_page_size(request.args))
+    attach_category_details(transactions, {c.id: c for c in get_categories_by_user(user_id)})
+
+    transactions_data = []
+    for transaction in transactions:
+        transaction_data = transaction.to_dict()
+        transaction_data['category_name'] = transaction.category_name
+        transaction_data['category_color'] = transaction.category_color
+        transactions_data.append(transaction_data)
+
+    return jsonify({'transactions': transactions_data, 'next_cursor': next_cursor})
+
+# Route: /import_transactions - Upload page (GET) and upload of a CSV/OFX bank statement (POST)
+@main_bp.route('/import_transactions', methods=['GET', 'POST'])
+@login_required
+def import_transactions():
+    """
+    Shows the statement import page, or starts importing an uploaded statement.
+
+    The upload is saved and imported in the background; the page polls
+    /import_status/<job_id> for progress.
+
+    Returns:
+        GET: Rendered import page with the user's recent imports
+        POST: JSON with the new import job, or an error (400/503)
+    """
+    # Import models here to avoid circular imports
+    from app.models import ImportJob
+
+    user_id = session['user_id']
+    if request.method == 'GET':
+        fail_stale_imports(user_id)
+        recent_imports = ImportJob.query.filter_by(user_id=user_id).order_by(ImportJob.id.desc()).limit(10).all()
+        return render_template('import.html', recent_imports=recent_imports,
+                               max_megabytes=IMPORT_MAX_BYTES // (1024 * 1024))
+
+    # Imports write in bulk, which the SQLite fallback can't replay
+    if is_using_fallback():
+        return jsonify({'error': 'Imports are temporarily unavailable. Please try again in a few minutes.'}), 503
+
+    upload = request.files.get('statement')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'Choose a file to import'}), 400
+    try:
+        job = start_import(user_id, upload)
+    except StatementError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'job': job.to_dict(), 'status_url': url_for('main.import_status', job_id=job.id)}), 202
+
+# Route: /import_status/<job_id> - Progress of a statement import
+@main_bp.route('/import_status/<int:job_id>')
+@login_required
+def import_status(job_id):
+    """
+    Reports how far an import has got.
+
+    Returns:
+        JSON: The import job (status, rows_read, rows_imported, rows_skipped, error)
+    """
+    job = get_import_job(job_id, session['user_id'])
+    if not job:
+        return jsonify({'error': 'Import not found'}), 404
+    return jsonify({'job': job.to_dict()})
+
+# Route: /export/<export_format> - Downloads the user's transactions as CSV, NDJSON or Parquet
+@main_bp.route('/export/<string:export_format>')
+@login_required
+def export_transactions(export_format):
+    """
+    Streams the user's transactions as a file download.
+
+    Accepts the same filters as the history page (period defaults to 'all').
+    Rows are read through a server-side cursor and encoded chunk by chunk,
+    so memory use stays flat however long the history is.
+
+    Returns:
+        Response: Streamed file, or JSON error (400 for bad filters/format, 501 without pyarrow)
+    """
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export needs pyarrow installed on the server'}), 501
+
+    args = request.args.to_dict()
+    args.setdefault('period', 'all')
+    try:
+        query = build_history_query(session['user_id'], args)
+    except ValueError:
+        return jsonify({'error': 'Invalid filter parameters'}), 400
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"transactions-{datetime.now().strftime('%Y%m%d')}.{extension}"
+    return Response(
+        stream_with_context(iter_export(query, export_format)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 # Route: /edit_transaction/<transaction_id> - Updates existing transaction details
 @main_bp.route('/edit_transaction/<int:transaction_id>', methods=['POST'])
@@ -542,17 +717,17 @@ def edit_transaction(transaction_id):
         # Get form data for transaction update
         amount = float(request.form['amount'])
         item_name = request.form['item_name']
-        date = request.form['date']
-        new_category_id = request.form['category_id']
+        transaction_date = datetime.strptime(request.form['date'], '%Y-%m-%d').date()
+        new_category_id = int(request.form['category_id'])
         transaction_type = request.form['type']
 
         # Update transaction using new utility function
-        if update_transaction(transaction_id, user_id, amount, item_name, date, new_category_id, transaction_type):
+        if update_transaction(transaction_id, user_id, amount, item_name, transaction_date, new_category_id, transaction_type):
             return redirect(url_for('main.history'))
         else:
             return redirect(url_for('main.history'))
     except ValueError:
-        # Handle invalid amount input
+        # Handle invalid amount, date or category input
         return redirect(url_for('main.history'))
     except Exception as e:
         # Handle any other errors
@@ -593,6 +768,42 @@ def delete_transaction(transaction_id):
     # Regular form submission
     return redirect(url_for('main.history'))
 
+# Route: /transactions/batch - Applies many transaction changes in one request
+@main_bp.route('/transactions/batch', methods=['POST'])
+@login_required
+def batch_transactions():
+    """
+    Applies a JSON batch of transaction creates, updates and deletes.
+    
+    The body is {"operations": [...], "atomic": true} (or just the list of
+    operations); see apply_transaction_batch() for the operation format.
+    Everything is written in a single database transaction. With atomic
+    (the default) one invalid operation means nothing is applied; otherwise
+    the valid operations are applied and the invalid ones reported.
+    
+    Returns:
+        JSON: committed flag and per-operation results (200), validation
+        failures (400/413), or an error if the database rejected the batch (500)
+    """
+    user_id = session['user_id']
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+    atomic = bool(payload.get('atomic', True)) if isinstance(payload, dict) else True
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Send a non-empty list of operations'}), 400
+    if len(operations) > TRANSACTION_BATCH_MAX:
+        return jsonify({'error': f'A batch can hold at most {TRANSACTION_BATCH_MAX} operations'}), 413
+    
+    try:
+        results, committed = apply_transaction_batch(user_id, operations, atomic=atomic)
+    except Exception as e:
+        # Log the error for debugging
+        print(f"Error in batch transactions route: {e}")
+        return jsonify({'committed': False, 'error': 'The changes could not be saved. Please try again.'}), 500
+    
+    return jsonify({'committed': committed, 'results': results}), 200 if committed else 400
+
 # Route: /categories - Shows category management page for user
 @main_bp.route('/categories', methods=['GET', 'POST'])
 @login_required
@@ -731,9 +942,11 @@ def delete_category(category_id):
     # Find and delete category
     category_to_delete = Category.query.filter_by(id=category_id, user_id=user_id).first()
     if category_to_delete:
-        from app.utils.database import save_database
+        from app.utils.database import save_database, rebuild_user_summary
         from app.models import db
         db.session.delete(category_to_delete)
+        # The category's transactions are deleted with it, so refresh the running totals
+        rebuild_user_summary(user_id)
         save_database()
     return redirect(url_for('main.categories'))
 
@@ -761,7 +974,6 @@ def get_chart_data(chart_type):
     start_date = request.args.get('start')
     end_date = request.args.get('end')
 
-    user_transactions = get_transactions_by_user(user_id)
     now = datetime.now()
     today = now.date()
     end_date_filter = today
@@ -784,69 +996,27 @@ def get_chart_data(chart_type):
             start_date_filter = None
             end_date_filter = today
 
-    filtered_transactions = []
-    for t in user_transactions:
-        try:
-            t_date = t.date if isinstance(t.date, date) else t.date.date()
-            if start_date_filter is None or (start_date_filter <= t_date <= end_date_filter):
-                filtered_transactions.append(t)
-        except Exception as e:
-            print(f"Date filter error: {e}")
-            continue
-
-    # Fallback: if no data, return all transactions for debugging
-    if not filtered_transactions:
+    # Fallback: if no data in the period, chart all transactions for debugging
+    if start_date_filter is not None and not has_transactions_in_range(user_id, start_date_filter, end_date_filter):
         print("No transactions matched filter, returning all for debugging.")
-        filtered_transactions = user_transactions
+        start_date_filter = None
 
     chart_data = []
     if mode == 'individual':
-        for transaction in filtered_transactions:
-            if chart_type == 'all' or transaction.transaction_type == chart_type:
-                label = transaction.item_name.strip() if transaction.item_name else ''
-                if not label:
-                    category = Category.query.filter_by(id=transaction.category_id, user_id=user_id).first()
-                    category_name = category.name if category else 'Uncategorized'
-                    label = f"{transaction.date.strftime('%Y-%m-%d')} - {category_name}"
-                amount_value = float(transaction.amount)
-                category = Category.query.filter_by(id=transaction.category_id, user_id=user_id).first()
-                chart_data.append({
-                    'name': label,
-                    'value': amount_value,
-                    'color': category.color if category else '#6c757d',
-                    'original_type': transaction.transaction_type
-                })
+        rows = get_chart_transactions(user_id, chart_type, start_date_filter, end_date_filter)
+        for transaction, category_name, category_color in rows:
+            label = transaction.item_name.strip() if transaction.item_name else ''
+            if not label:
+                label = f"{transaction.date.strftime('%Y-%m-%d')} - {category_name or 'Uncategorized'}"
+            chart_data.append({
+                'name': label,
+                'value': float(transaction.amount),
+                'color': category_color or '#6c757d',
+                'original_type': transaction.transaction_type
+            })
         print(f"Chart type: {chart_type}, Mode: {mode}, Data count: {len(chart_data)}")
     else:
-        category_summary = {}
-        for transaction in filtered_transactions:
-            if chart_type == 'all' or transaction.transaction_type == chart_type:
-                category_id = transaction.category_id
-                if category_id:
-                    category = Category.query.filter_by(id=category_id, user_id=user_id).first()
-                    if category:
-                        name = category.name
-                        color = category.color
-                        amount_for_chart = float(transaction.amount) if transaction.transaction_type == 'income' else -float(transaction.amount)
-                        if name not in category_summary:
-                            category_summary[name] = {'value': 0, 'color': color, 'type': transaction.transaction_type}
-                        category_summary[name]['value'] += amount_for_chart
-                    else:
-                        name = 'Uncategorized'
-                        color = '#6c757d'
-                        amount_for_chart = float(transaction.amount) if transaction.transaction_type == 'income' else -float(transaction.amount)
-                        if name not in category_summary:
-                            category_summary[name] = {'value': 0, 'color': color, 'type': transaction.transaction_type}
-                        category_summary[name]['value'] += amount_for_chart
-                else:
-                    name = 'Uncategorized'
-                    color = '#6c757d'
-                    amount_for_chart = float(transaction.amount) if transaction.transaction_type == 'income' else -float(transaction.amount)
-                    if name not in category_summary:
-                        category_summary[name] = {'value': 0, 'color': color, 'type': transaction.transaction_type}
-                    category_summary[name]['value'] += amount_for_chart
-        chart_data = [{'name': name, 'value': summary['value'], 'color': summary['color'], 'type': summary['type']} 
-                      for name, summary in category_summary.items()]
+        chart_data = get_category_chart_totals(user_id, chart_type, start_date_filter, end_date_filter)
         if chart_type != 'all':
             chart_data = [{'name': item['name'], 'value': abs(item['value']), 'color': item['color']} for item in chart_data]
         print(f"Chart type: {chart_type}, Mode: {mode}, Data count: {len(chart_data)}")
@@ -858,19 +1028,13 @@ def get_chart_data(chart_type):
 def get_line_data(chart_type):
     user_id = session['user_id']
     period = request.args.get('period', 'month')
-    user_transactions = get_transactions_by_user(user_id)
     now = datetime.now()
     today = now.date()
     start_date_filter = today.replace(day=1) if period == 'month' else today.replace(month=1, day=1)
-    # Group by date
+    # Group by date (read from the daily rollups, one row per day)
     date_totals = {}
-    for t in user_transactions:
-        if chart_type == 'all' or t.transaction_type == chart_type:
-            t_date = t.date if isinstance(t.date, date) else t.date.date()
-            if t_date >= start_date_filter:
-                date_str = t_date.strftime('%Y-%m-%d')
-                date_totals.setdefault(date_str, 0)
-                date_totals[date_str] += float(t.amount)
+    for bucket_date, total in get_daily_chart_totals(user_id, chart_type, start_date_filter):
+        date_totals[bucket_date.strftime('%Y-%m-%d')] = total
     # Sort by date
     sorted_dates = sorted(date_totals.keys())
     data = {
@@ -894,17 +1058,17 @@ def account():
         str: Rendered account template with user statistics
     """
     try:
-        # Get current user ID and transaction data
+        # Get current user ID and the maintained running totals
         user_id = session['user_id']
-        user_transactions = get_transactions_by_user(user_id)
+        summary = get_user_summary(user_id)
         
-        # Calculate account statistics
-        all_time_income = sum(t.amount for t in user_transactions if t.transaction_type == 'income')
-        all_expense = sum(t.amount for t in user_transactions if t.transaction_type == 'expense')
-        total_transactions = len(user_transactions)
+        # Read account statistics from the summary
+        all_time_income = summary['total_income']
+        all_expense = summary['total_expense']
+        total_transactions = summary['transaction_count']
 
         # Get user creation date - handle missing created_at field
-        user_info = User.query.get(user_id)
+        user_info = get_cached_user(user_id)
         member_since = user_info.created_at.isoformat() if user_info and user_info.created_at else 'N/A'
         
         # Render account page with user statistics
@@ -0,0 +1,69 @@
+# Preset category sets for new Budget Tracker users
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (name, category_type, color) given to every account created through /register
+DEFAULT_CATEGORIES = (
+    ('Salary', 'income', '#28a745'),
+    ('Food', 'expense', '#dc3545'),
+    ('Transportation', 'expense', '#ffc107'),
+    ('Utilities', 'expense', '#6c757d'),
+    ('Entertainment', 'expense', '#17a2b8'),
+)
+
+# Fuller set used for the built-in test/recovery accounts
+PRESET_CATEGORIES = (
+    ('Salary', 'income', '#28a745'),
+    ('Freelance', 'income', '#17a2b8'),
+    ('Investment', 'income', '#ffc107'),
+    ('Gift', 'income', '#e83e8c'),
+    ('Other Income', 'income', '#6f42c1'),
+    ('Food & Dining', 'expense', '#dc3545'),
+    ('Transportation', 'expense', '#fd7e14'),
+    ('Shopping', 'expense', '#6f42c1'),
+    ('Bills & Utilities', 'expense', '#20c997'),
+    ('Entertainment', 'expense', '#e83e8c'),
+    ('Healthcare', 'expense', '#28a745'),
+    ('Education', 'expense', '#17a2b8'),
+    ('Housing', 'expense', '#6c757d'),
+    ('Other Expenses', 'expense', '#495057'),
+)
+
+def seed_categories(user_ids, presets=DEFAULT_CATEGORIES):
+    """
+    Give one or more users a preset set of categories.
+
+    All rows go out in a single bulk INSERT, and nothing is committed, so
+    the caller can seed inside the transaction that creates the users.
+    While the SQLite fallback is in use the rows are added through the
+    ORM instead, so the fallback journal records them for replay.
+
+    Args:
+        user_ids: ID of a user, or a list of IDs (the users must be flushed already)
+        presets: Iterable of (name, category_type, color)
+
+    Returns:
+        int: Number of categories created
+    """
+    # Import models here to avoid circular imports
+    from app.models import Category
+    from app import db
+    from app.utils.database import is_using_fallback
+
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    rows = [
+        {'user_id': user_id, 'name': name, 'category_type': category_type, 'color': color}
+        for user_id in user_ids
+        for name, category_type, color in presets
+    ]
+    if not rows:
+        return 0
+    if is_using_fallback():
+        db.session.add_all([Category(**row) for row in rows])
+    else:
+        db.session.execute(db.insert(Category), rows)
+    logger.info(f"Seeded {len(rows)} categories for {len(user_ids)} users")
+    return len(rows)
@@ -0,0 +1,257 @@
+# Database circuit breaker for Budget Tracker
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to per-process state
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Breaker settings
+DB_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('DB_BREAKER_FAILURE_THRESHOLD', 3))
+DB_BREAKER_RECOVERY_TIMEOUT = float(os.environ.get('DB_BREAKER_RECOVERY_TIMEOUT', 15))
+DB_BREAKER_MAX_RECOVERY_TIMEOUT = float(os.environ.get('DB_BREAKER_MAX_RECOVERY_TIMEOUT', 300))
+DB_BREAKER_BACKOFF = float(os.environ.get('DB_BREAKER_BACKOFF', 2))
+DB_BREAKER_STATE_FILE = os.environ.get('DB_BREAKER_STATE_FILE') or \
+    os.path.join(tempfile.gettempdir(), 'budge-it-db-breaker.json')
+
+def _initial_state(recovery_timeout):
+    """Return the state of a breaker that has never failed."""
+    return {
+        'state': CLOSED,
+        'failures': 0,
+        'opened_at': None,
+        'open_timeout': recovery_timeout,
+        'trips': 0,
+        'recoveries': 0,
+        'last_error': None,
+        'last_change': None
+    }
+
+class MemoryStateStore:
+    """Keeps breaker state in this process only."""
+
+    def __init__(self):
+        self._state = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, default):
+        with self._lock:
+            if self._state is None:
+                self._state = dict(default)
+            yield self._state
+
+    def read(self, default):
+        with self._lock:
+            return dict(self._state if self._state is not None else default)
+
+class FileStateStore:
+    """
+    Keeps breaker state in a small JSON file shared by every worker on the host.
+
+    Reads take a shared lock and updates take an exclusive lock on the file,
+    so gunicorn workers agree on whether the database is up.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Threads in one process share the file descriptor lock, so serialise them too
+        self._lock = threading.Lock()
+
+    def _load(self, handle, default):
+        handle.seek(0)
+        content = handle.read()
+        if not content:
+            return dict(default)
+        try:
+            state = json.loads(content)
+        except ValueError:
+            return dict(default)
+        return {**default, **state}
+
+    @contextmanager
+    def transaction(self, default):
+        with self._lock, open(self.path, 'a+') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                state = self._load(handle, default)
+                # Compare serialised copies so changes to nested values are saved too
+                before = json.dumps(state, sort_keys=True)
+                yield state
+                if json.dumps(state, sort_keys=True) != before:
+                    handle.seek(0)
+                    handle.truncate()
+                    handle.write(json.dumps(state))
+                    handle.flush()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def read(self, default):
+        if not os.path.exists(self.path):
+            return dict(default)
+        with self._lock, open(self.path, 'r') as handle:
+            fcntl.flock(handle, fcntl.LOCK_SH)
+            try:
+                return self._load(handle, default)
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker around the primary database.
+
+    - closed: requests go to the database; consecutive failures are counted
+      and the breaker opens once they reach `failure_threshold`.
+    - open: the database is treated as down until `open_timeout` seconds
+      have passed since the breaker opened.
+    - half_open: after the timeout, requests (and the health monitor) may
+      try the database again. A success closes the breaker; a failure
+      re-opens it with the timeout multiplied by `backoff`, capped at
+      `max_recovery_timeout`.
+    """
+
+    def __init__(self, name='database', failure_threshold=DB_BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout=DB_BREAKER_RECOVERY_TIMEOUT, max_recovery_timeout=DB_BREAKER_MAX_RECOVERY_TIMEOUT,
+                 backoff=DB_BREAKER_BACKOFF, state_file=DB_BREAKER_STATE_FILE):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.backoff = backoff
+        self.store = FileStateStore(state_file) if state_file and fcntl else MemoryStateStore()
+        # Requests turned away while open, counted per process
+        self.rejected = 0
+
+    def _default(self):
+        return _initial_state(self.recovery_timeout)
+
+    def _open(self, state, error, now):
+        """Move to the open state (called with the store locked)."""
+        state['state'] = OPEN
+        state['opened_at'] = now
+        state['trips'] += 1
+        state['last_error'] = error
+        state['last_change'] = now
+        logger.warning(f"Circuit breaker '{self.name}' opened for {state['open_timeout']}s: {error}")
+
+    def allow_request(self):
+        """
+        Check whether the database should be tried.
+
+        Moves an open breaker to half-open once its timeout has passed.
+
+        Returns:
+            bool: True if the database may be used
+        """
+        state = self.store.read(self._default())
+        if state['state'] != OPEN:
+            return True
+        now = time.time()
+        if now < state['opened_at'] + state['open_timeout']:
+            self.rejected += 1
+            return False
+        with self.store.transaction(self._default()) as state:
+            if state['state'] == OPEN and now >= state['opened_at'] + state['open_timeout']:
+                state['state'] = HALF_OPEN
+                state['last_change'] = now
+                logger.info(f"Circuit breaker '{self.name}' half-open, trying the database again")
+        return True
+
+    def is_open(self):
+        """True while the breaker is open and its timeout hasn't passed (no side effects)."""
+        state = self.store.read(self._default())
+        return state['state'] == OPEN and time.time() < state['opened_at'] + state['open_timeout']
+
+    def seconds_until_retry(self):
+        """Seconds until an open breaker allows a trial request (0 if not open)."""
+        state = self.store.read(self._default())
+        if state['state'] != OPEN:
+            return 0
+        return max(0.0, state['opened_at'] + state['open_timeout'] - time.time())
+
+    def record_success(self):
+        """Record a successful database call, closing a half-open breaker."""
+        state = self.store.read(self._default())
+        if state['state'] == CLOSED and state['failures'] == 0:
+            return  # Nothing to change; skip the exclusive lock
+        with self.store.transaction(self._default()) as state:
+            if state['state'] != CLOSED:
+                state['recoveries'] += 1
+                state['last_change'] = time.time()
+                logger.info(f"Circuit breaker '{self.name}' closed, database recovered")
+            state['state'] = CLOSED
+            state['failures'] = 0
+            state['opened_at'] = None
+            state['open_timeout'] = self.recovery_timeout
+
+    def record_failure(self, error=None):
+        """Record a failed database call, opening the breaker if needed."""
+        error = str(error) if error is not None else None
+        now = time.time()
+        with self.store.transaction(self._default()) as state:
+            trial_failed = state['state'] == HALF_OPEN or (
+                state['state'] == OPEN and now >= state['opened_at'] + state['open_timeout']
+            )
+            if trial_failed:
+                state['open_timeout'] = min(state['open_timeout'] * self.backoff, self.max_recovery_timeout)
+                self._open(state, error, now)
+            elif state['state'] == CLOSED:
+                state['failures'] += 1
+                state['last_error'] = error
+                if state['failures'] >= self.failure_threshold:
+                    self._open(state, error, now)
+
+    def trip(self, error=None):
+        """Open the breaker immediately, regardless of the failure count."""
+        with self.store.transaction(self._default()) as state:
+            if state['state'] != OPEN:
+                self._open(state, str(error) if error is not None else 'tripped manually', time.time())
+
+    def reset(self):
+        """Close the breaker and clear its counters."""
+        with self.store.transaction(self._default()) as state:
+            state.clear()
+            state.update(self._default())
+
+    @property
+    def state(self):
+        """Current state name: 'closed', 'open' or 'half_open'."""
+        return self.store.read(self._default())['state']
+
+    def stats(self):
+        """
+        Get breaker state and metrics for monitoring.
+
+        Returns:
+            dict: state, failures, trips, recoveries, rejected, last_error, retry_in and settings
+        """
+        state = self.store.read(self._default())
+        return {
+            'state': state['state'],
+            'failures': state['failures'],
+            'trips': state['trips'],
+            'recoveries': state['recoveries'],
+            'rejected': self.rejected,
+            'last_error': state['last_error'],
+            'retry_in': round(self.seconds_until_retry(), 1),
+            'open_timeout': state['open_timeout'],
+            'failure_threshold': self.failure_threshold,
+            'shared': isinstance(self.store, FileStateStore)
+        }
+
+# Breaker guarding the primary (Supabase/Postgres) database
+database_breaker = CircuitBreaker()
@@ -3,60 +3,66 @@
 import os
 import json
 from datetime import datetime
+from decimal import Decimal
 from flask import flash, current_app
 import logging
 import time
 from sqlalchemy.exc import OperationalError, DisconnectionError, SQLAlchemyError, TimeoutError
 from app.models import User, Category
+from app.utils.user_cache import invalidate_user
+# Daily/monthly per-category totals kept in step with every transaction change
+from app.utils.rollups import apply_rollup_deltas, rollup_delta_for, rebuild_all_rollups
 
 # Configure logging - reduced verbosity for cleaner experience
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
-# GLOBAL FALLBACK FLAG
-_use_fallback = False
+# Circuit breaker guarding the primary database (state shared by all workers on this host)
+from app.utils.circuit_breaker import database_breaker
+# Counts failed logins per username and IP (state shared by all workers on this host)
+from app.utils.login_throttle import login_throttle
+# Routes sessions to the SQLite fallback while the breaker is open and replays its writes
+from app.utils.fallback import fallback_router
+# Preset category sets seeded for new users
+from app.utils.categories import seed_categories, DEFAULT_CATEGORIES, PRESET_CATEGORIES
 
-def force_sqlite_fallback():
-    """Force the app to use SQLite fallback."""
-    global _use_fallback
-    _use_fallback = True
+def force_sqlite_fallback(error=None):
+    """Force the app to use SQLite fallback by opening the database circuit breaker."""
+    database_breaker.trip(error or 'fallback forced')
     logger.warning("Forcing SQLite fallback mode! Supabase/Postgres connection failed. Check your DATABASE_URL, network, or credentials.")
 
 def is_using_fallback():
-    """Check if we're using fallback mode."""
-    return _use_fallback
+    """Check if we're using fallback mode (circuit breaker open)."""
+    return database_breaker.is_open()
+
+def record_database_failure(error):
+    """Count a failed database call towards opening the circuit breaker."""
+    database_breaker.record_failure(error)
+
+def record_database_success():
+    """Record a successful database call, closing a half-open circuit breaker."""
+    database_breaker.record_success()
 
 # --- BULLETPROOF Database Connection Health Check ---
 
 def check_database_connection():
     """
     BULLETPROOF database connection check - ALWAYS returns True if fallback is enabled.
-    """
-    global _use_fallback
     
+    Reads the circuit breaker and the status cached by the background health
+    monitor instead of running a query, so callers on the login/registration
+    paths don't pay an extra round-trip. The breaker recovers on its own once
+    the monitor's probes succeed again.
+    """
     # If fallback is enabled, always return True
-    if _use_fallback:
+    if is_using_fallback():
         return True
     
-    try:
-        # Import db here to avoid circular imports
-        from app import db
-        from sqlalchemy import text
-        
-        # Use a very simple query with minimal timeout
-        result = db.session.execute(text('SELECT 1')).scalar()
-        db.session.commit()
-        return result == 1
-    except (OperationalError, TimeoutError) as e:
-        logger.debug(f"Database connection timeout/error: {e}")
-        # ENABLE FALLBACK ON FIRST FAILURE
-        force_sqlite_fallback()
-        return True  # Return True because fallback is now enabled
-    except Exception as e:
-        logger.error(f"Database connection check failed: {e}")
-        # ENABLE FALLBACK ON ANY ERROR
-        force_sqlite_fallback()
-        return True  # Return True because fallback is now enabled
+    # Import monitor here to avoid circular imports
+    from app.utils.health_monitor import health_monitor
+    if not health_monitor.healthy:
+        logger.debug("Last database health probe failed - circuit breaker decides on fallback")
+    return True  # Return True because fallback takes over if the breaker opens
 
 def dispose_connection_pool():
     """
@@ -72,70 +78,102 @@ def dispose_connection_pool():
         logger.error(f"Error disposing connection pool: {e}")
         return False
 
+def dispose_engines_after_fork(app):
+    """
+    Forget connections a forked worker inherited from its parent process.
+
+    Pools are disposed with close=False so the parent's sockets are left
+    alone and the worker opens fresh connections on first use.
+
+    Args:
+        app: Flask application loaded in the parent process
+    """
+    try:
+        # Import db here to avoid circular imports
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+        fallback_router.dispose()
+        logger.info(f"Disposed inherited database connections in worker {os.getpid()}")
+    except Exception as e:
+        logger.error(f"Error disposing database connections after fork: {e}")
+
 def get_database_status():
     """
     Get detailed database status information.
+    
+    Connection health and latency come from the background health monitor's
+    last probe; pool counters are read locally without touching the database.
     """
-    global _use_fallback
+    # Import monitor here to avoid circular imports
+    from app.utils.health_monitor import health_monitor
+    health = health_monitor.status()
+    
+    breaker = database_breaker.stats()
+    fallback = fallback_router.stats()
     
     # If using fallback, return fallback status
-    if _use_fallback:
+    if is_using_fallback():
         return {
             'status': 'fallback',
             'message': 'Using SQLite fallback - app is working!',
-            'database_url': 'sqlite:///app.db (fallback)',
-            'note': 'Supabase connection failed, but app is fully functional with SQLite'
+            'database_url': f"{fallback.get('database_url', 'sqlite:///app.db')} (fallback)",
+            'note': 'Supabase connection failed, but app is fully functional with SQLite',
+            'health': health,
+            'circuit_breaker': breaker,
+            'fallback': fallback
         }
     
     try:
         # Import db here to avoid circular imports
         from app import db
-        from sqlalchemy import text
-        
-        # Test connection
-        start_time = time.time()
-        result = db.session.execute(text('SELECT 1')).scalar()
-        db.session.commit()
-        response_time = time.time() - start_time
         
-        return {
-            'status': 'connected',
-            'response_time': round(response_time, 3),
+        status = {
+            'status': 'connected' if health['healthy'] else 'fallback',
+            'response_time': round(health['latency_ms'] / 1000, 3) if health['latency_ms'] is not None else None,
             'database_url': str(db.engine.url).replace(db.engine.url.password, '***') if db.engine.url.password else str(db.engine.url),
-            'pool_size': db.engine.pool.size(),
-            'checked_in': db.engine.pool.checkedin(),
-            'checked_out': db.engine.pool.checkedout(),
-            'overflow': db.engine.pool.overflow()
-        }
-    except (OperationalError, TimeoutError) as e:
-        # ENABLE FALLBACK
-        force_sqlite_fallback()
-        return {
-            'status': 'fallback',
-            'error': str(e),
-            'message': 'Supabase connection failed - using SQLite fallback',
-            'database_url': 'sqlite:///app.db (fallback)',
-            'note': 'App is working with SQLite fallback!'
+            'health': health,
+            'circuit_breaker': breaker,
+            'fallback': fallback
         }
+        pool = db.engine.pool
+        if hasattr(pool, 'size'):
+            status.update({
+                'pool_size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow()
+            })
+        if not health['healthy']:
+            status.update({
+                'error': health['last_error'],
+                'message': 'Supabase connection failed - using SQLite fallback',
+                'note': 'App is working with SQLite fallback!'
+            })
+        return status
     except Exception as e:
-        # ENABLE FALLBACK
-        force_sqlite_fallback()
         return {
             'status': 'fallback',
             'error': str(e),
             'message': 'Database error - using SQLite fallback',
             'database_url': 'sqlite:///app.db (fallback)',
-            'note': 'App is working with SQLite fallback!'
+            'note': 'App is working with SQLite fallback!',
+            'health': health,
+            'circuit_breaker': breaker,
+            'fallback': fallback
         }
 
 def retry_database_operation(operation, max_retries=1, delay=0.1):
     """
     BULLETPROOF database operation retry - ALWAYS works with fallback.
-    """
-    global _use_fallback
     
-    # If fallback is enabled, try operation once, then return None
-    if _use_fallback:
+    Connection failures are reported to the circuit breaker and successes
+    close it again, so a transient outage no longer degrades the worker
+    for good.
+    """
+    # If fallback is enabled, try operation once (the session routes it to SQLite), then return None
+    if not database_breaker.allow_request():
         try:
             return operation()
         except Exception as e:
@@ -144,13 +182,14 @@ def retry_database_operation(operation, max_retries=1, delay=0.1):
     
     for attempt in range(max_retries):
         try:
-            return operation()
+            result = operation()
+            record_database_success()
+            return result
         except (OperationalError, DisconnectionError) as e:
+            record_database_failure(e)
             if attempt == max_retries - 1:
                 logger.error(f"Database operation failed after {max_retries} attempts: {e}")
-                # ENABLE FALLBACK ON FINAL FAILURE
-                force_sqlite_fallback()
-                # Try one more time with fallback
+                # Try one more time (in fallback mode if the breaker has opened)
                 try:
                     return operation()
                 except Exception as fallback_error:
@@ -162,8 +201,6 @@ def retry_database_operation(operation, max_retries=1, delay=0.1):
             time.sleep(wait_time)
         except Exception as e:
             logger.error(f"Unexpected error in database operation: {e}")
-            # ENABLE FALLBACK
-            force_sqlite_fallback()
             return None
 
 # --- Jinja2 Custom Filters ---
@@ -183,28 +220,22 @@ def amount_color(amount):
 
 def get_next_id(model_class):
     """
-    Generates the next unique ID for a given model class.
+    Reserves the next unique ID for a given model class.
     
-    This function finds the highest existing ID in the specified model
-    and returns the next available ID. It handles empty tables by
-    starting with ID 1.
+    The ID comes from the table's sequence on PostgreSQL (see
+    app.utils.ids.reserve_ids), so concurrent workers can never be handed
+    the same ID. Most code should simply let the database assign IDs on
+    INSERT; use reserve_ids() to get a whole block at once.
     
     Args:
         model_class: SQLAlchemy model class (User, Category, Transaction)
     
     Returns:
-        int: Next available unique ID for the model
+        int: Reserved unique ID for the model
     """
-    try:
-        # Import db here to avoid circular imports
-        from app import db
-        # Get the maximum ID from the table
-        max_id = db.session.query(db.func.max(model_class.id)).scalar()
-        # Return maximum ID + 1, or 1 if table is empty
-        return (max_id or 0) + 1
-    except Exception as e:
-        logger.error(f"Error getting next ID for {model_class.__name__}: {e}")
-        return 1
+    # Import the allocator here to avoid circular imports
+    from app.utils.ids import next_id
+    return next_id(model_class)
 
 def initialize_database(app):
     """
@@ -220,9 +251,10 @@ def initialize_database(app):
         db.init_app(app)
         
         with app.app_context():
-            # Create all tables
-            db.create_all()
-            logger.info("Database tables created successfully!")
+            # Create or upgrade tables through the versioned migrations
+            from app.migrations import upgrade
+            applied = upgrade(db.engine)
+            logger.info(f"Database schema up to date (applied migrations: {applied or 'none'})")
             
             # Check if we need to migrate from JSON
             json_file = app.config.get('DATABASE_FILE', 'budget_tracker.json')
@@ -255,59 +287,48 @@ def save_database():
 
 # --- Model Helper Functions ---
 
-def create_user(username, email, password):
+def create_user(username, email, password, categories=()):
     """
     Create a new user with error handling for Supabase connection limits.
     
+    Runs as one transaction through register_user(); see there for how
+    taken usernames are detected without a separate lookup. The returned
+    user comes from the insert itself, not from a second query.
+    
     Args:
         username (str): Username for the new user
         email (str): Email address for the new user
         password (str): Password for the new user
+        categories: Preset (name, category_type, color) set to give the user,
+            inserted in the same transaction as the user
         
     Returns:
         User: Created user object or None if creation failed
     """
+    # Import registration here to avoid circular imports
+    from app.utils.registration import register_user, RegistrationError
+    
     try:
-        # Import db here to avoid circular imports
-        from app import db
-        
-        # Check connection first
         if not check_database_connection():
             logger.error("Cannot create user - Supabase connection unavailable")
             return None
-            
-        # Check if user already exists
-        existing_user = User.query.filter_by(username=username).first()
-        if existing_user:
-            logger.warning(f"User creation failed - username {username} already exists")
-            return None
-            
-        # Create new user
-        user = User(username=username, email=email)
-        user.set_password(password)
-        
-        db.session.add(user)
-        db.session.commit()
-        
-        logger.info(f"User {username} created successfully")
-        return user
-        
+        return register_user(username, email, password, categories)
+    except RegistrationError as e:
+        logger.warning(f"User creation failed for {username}: {e}")
+        return None
     except (OperationalError, TimeoutError) as e:
         logger.error(f"Supabase connection error during user creation: {e}")
-        db.session.rollback()
         return None
     except SQLAlchemyError as e:
         logger.error(f"Database error during user creation: {e}")
-        db.session.rollback()
         return None
     except Exception as e:
         logger.error(f"Unexpected error during user creation: {e}")
-        db.session.rollback()
         return None
 
 def create_preset_categories(user_id):
     """
-    Create preset categories for a new user.
+    Create preset categories for a new user (one bulk insert, then commit).
     
     Args:
         user_id: ID of the user to create categories for
@@ -315,48 +336,7 @@ def create_preset_categories(user_id):
     try:
         # Import db here to avoid circular imports
         from app import db
-        # Preset income categories
-        income_categories = [
-            {'name': 'Salary', 'color': '#28a745'},
-            {'name': 'Freelance', 'color': '#17a2b8'},
-            {'name': 'Investment', 'color': '#ffc107'},
-            {'name': 'Gift', 'color': '#e83e8c'},
-            {'name': 'Other Income', 'color': '#6f42c1'}
-        ]
-        
-        # Preset expense categories
-        expense_categories = [
-            {'name': 'Food & Dining', 'color': '#dc3545'},
-            {'name': 'Transportation', 'color': '#fd7e14'},
-            {'name': 'Shopping', 'color': '#6f42c1'},
-            {'name': 'Bills & Utilities', 'color': '#20c997'},
-            {'name': 'Entertainment', 'color': '#e83e8c'},
-            {'name': 'Healthcare', 'color': '#28a745'},
-            {'name': 'Education', 'color': '#17a2b8'},
-            {'name': 'Housing', 'color': '#6c757d'},
-            {'name': 'Other Expenses', 'color': '#495057'}
-        ]
-        
-        # Create income categories
-        for category_data in income_categories:
-            category = Category(
-                user_id=user_id,
-                name=category_data['name'],
-                category_type='income',
-                color=category_data['color']
-            )
-            db.session.add(category)
-        
-        # Create expense categories
-        for category_data in expense_categories:
-            category = Category(
-                user_id=user_id,
-                name=category_data['name'],
-                category_type='expense',
-                color=category_data['color']
-            )
-            db.session.add(category)
-        
+        seed_categories(user_id, PRESET_CATEGORIES)
         db.session.commit()
         logger.info(f"Created preset categories for user {user_id}")
         
@@ -366,13 +346,18 @@ def create_preset_categories(user_id):
         logger.error(f"Error creating preset categories for user {user_id}: {e}")
         raise
 
-def authenticate_user(username, password):
+def authenticate_user(username, password, remote_addr=None):
     """
     Authenticate user with improved error handling for Supabase connection limits.
     
+    Wrong credentials are counted by the login throttle (database errors
+    are not), and a username/password pair that just failed is rejected
+    again without a query or a password hash.
+    
     Args:
         username (str): Username to authenticate
         password (str): Password to verify
+        remote_addr (str): Client IP address the attempt came from
         
     Returns:
         User: Authenticated user object or None if authentication failed
@@ -381,6 +366,12 @@ def authenticate_user(username, password):
         # Import db here to avoid circular imports
         from app import db
         
+        # Same wrong pair as a moment ago: skip the lookup and the hash
+        if login_throttle.is_known_failure(username, password):
+            logger.warning(f"Authentication failed for username: {username} (repeated attempt)")
+            login_throttle.record_failure(username, remote_addr)
+            return None
+        
         # Check connection first
         if not check_database_connection():
             logger.error("Cannot authenticate user - Supabase connection unavailable")
@@ -391,9 +382,23 @@ def authenticate_user(username, password):
         
         if user and user.check_password(password):
             logger.info(f"User {username} authenticated successfully")
+            login_throttle.record_success(username, remote_addr)
+            # Upgrade hashes made under an older policy while the plain password is at hand
+            if user.password_needs_rehash() and not is_using_fallback():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                    logger.info(f"Rehashed password for user {username} with the current policy")
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    logger.error(f"Error rehashing password for user {username}: {e}")
+            # Copied to the SQLite fallback later by the health monitor, off the login path
+            if not is_using_fallback():
+                fallback_router.note_login(user.id)
             return user
         else:
             logger.warning(f"Authentication failed for username: {username}")
+            login_throttle.record_failure(username, remote_addr, password)
             return None
             
     except (OperationalError, TimeoutError) as e:
@@ -448,14 +453,15 @@ def get_user_by_username(username):
         logger.error(f"Error getting user {username}: {e}")
         return None
 
-def create_category(name, user_id, category_type):
+def create_category(user_id, name, category_type, color):
     """
     Create a new category with error handling.
     
     Args:
-        name (str): Category name
         user_id (int): User ID who owns the category
+        name (str): Category name
         category_type (str): Type of category (income/expense)
+        color (str): Hex color code
         
     Returns:
         Category: Created category object or None if creation failed
@@ -468,7 +474,7 @@ def create_category(name, user_id, category_type):
             logger.error("Cannot create category - Supabase connection unavailable")
             return None
             
-        category = Category(name=name, user_id=user_id, type=category_type)
+        category = Category(user_id=user_id, name=name, category_type=category_type, color=color)
         db.session.add(category)
         db.session.commit()
         
@@ -510,6 +516,26 @@ def get_categories_by_user_and_type(user_id, category_type):
         logger.error(f"Error getting categories for user {user_id}: {e}")
         return []
 
+def get_categories_by_user(user_id):
+    """
+    Get all categories for a user, income categories first.
+    
+    Args:
+        user_id: ID of the user
+    
+    Returns:
+        list: List of Category objects
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import Category
+        categories = Category.query.filter_by(user_id=user_id).order_by(Category.id).all()
+        return [c for c in categories if c.category_type == 'income'] + \
+               [c for c in categories if c.category_type == 'expense']
+    except Exception as e:
+        logger.error(f"Error getting categories for user {user_id}: {e}")
+        return []
+
 def create_transaction(user_id, amount, category_id, transaction_type, date, item_name):
     """
     Create a new transaction.
@@ -540,6 +566,8 @@ def create_transaction(user_id, amount, category_id, transaction_type, date, ite
         )
         
         db.session.add(transaction)
+        apply_summary_delta(user_id, **summary_delta_for(transaction_type, transaction.amount, 1))
+        apply_rollup_deltas([rollup_delta_for(transaction)])
         db.session.commit()
         
         logger.info(f"Transaction {item_name} created for user {user_id}")
@@ -570,6 +598,295 @@ def get_transactions_by_user(user_id):
         logger.error(f"Error getting transactions for user {user_id}: {e}")
         return []
 
+def _filter_transactions_for_chart(query, user_id, chart_type, start_date=None, end_date=None):
+    """
+    Apply the user, type and date predicates shared by the chart queries.
+
+    Args:
+        query: SQLAlchemy query selecting from transactions
+        user_id: ID of the user
+        chart_type: Type of chart data ('all', 'income', 'expense')
+        start_date: First date to include, or None for no date filter
+        end_date: Last date to include (only used together with start_date)
+
+    Returns:
+        Query: Filtered query
+    """
+    # Import models here to avoid circular imports
+    from app.models import Transaction
+
+    query = query.filter(Transaction.user_id == user_id)
+    if chart_type != 'all':
+        query = query.filter(Transaction.transaction_type == chart_type)
+    if start_date is not None:
+        query = query.filter(Transaction.date >= start_date)
+        if end_date is not None:
+            query = query.filter(Transaction.date <= end_date)
+    return query
+
+def has_transactions_in_range(user_id, start_date, end_date):
+    """
+    Check whether a user has any transaction between two dates.
+
+    Args:
+        user_id: ID of the user
+        start_date: First date to include
+        end_date: Last date to include
+
+    Returns:
+        bool: True if at least one transaction falls in the range
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import Transaction
+        from app import db
+
+        query = _filter_transactions_for_chart(
+            db.session.query(Transaction.id), user_id, 'all', start_date, end_date
+        )
+        return db.session.query(query.exists()).scalar()
+    except Exception as e:
+        logger.error(f"Error checking transactions in range for user {user_id}: {e}")
+        return False
+
+def _filter_rollups_for_chart(query, user_id, chart_type, granularity, start_date=None, end_date=None):
+    """
+    Apply the user, granularity, type and date predicates shared by the rollup chart queries.
+
+    Args:
+        query: SQLAlchemy query selecting from transaction_rollups
+        user_id: ID of the user
+        chart_type: Type of chart data ('all', 'income', 'expense')
+        granularity: 'day' or 'month'
+        start_date: First date to include, or None for no date filter
+        end_date: Last date to include, or None for no upper bound
+
+    Returns:
+        Query: Filtered query
+    """
+    # Import models here to avoid circular imports
+    from app.models import TransactionRollup
+
+    query = query.filter(TransactionRollup.user_id == user_id, TransactionRollup.granularity == granularity)
+    if chart_type != 'all':
+        query = query.filter(TransactionRollup.transaction_type == chart_type)
+    if start_date is not None:
+        query = query.filter(TransactionRollup.bucket_date >= start_date)
+    if end_date is not None:
+        query = query.filter(TransactionRollup.bucket_date <= end_date)
+    return query
+
+def get_category_chart_totals(user_id, chart_type, start_date=None, end_date=None):
+    """
+    Get per-category chart totals from the rollup table.
+
+    Reads the user's daily buckets for a date range, or their monthly
+    buckets for all-time charts, so the cost grows with the number of
+    buckets rather than the number of transactions. Income is summed as a
+    positive value and expense as a negative value, matching the signed
+    totals used by the charts. Buckets whose category is missing are
+    grouped as 'Uncategorized'.
+
+    Args:
+        user_id: ID of the user
+        chart_type: Type of chart data ('all', 'income', 'expense')
+        start_date: First date to include, or None for no date filter
+        end_date: Last date to include (only used together with start_date)
+
+    Returns:
+        list: Dictionaries with name, value, color and type, ordered by most recent activity
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import TransactionRollup, Category
+        from app import db
+
+        signed_total = db.case(
+            (TransactionRollup.transaction_type == 'income', TransactionRollup.total),
+            else_=-TransactionRollup.total
+        )
+        query = db.session.query(
+            Category.name,
+            Category.color,
+            TransactionRollup.transaction_type,
+            db.func.sum(signed_total).label('total'),
+            db.func.max(TransactionRollup.bucket_date).label('last_date')
+        ).outerjoin(
+            Category,
+            db.and_(Category.id == TransactionRollup.category_id, Category.user_id == user_id)
+        )
+        if start_date is not None:
+            query = _filter_rollups_for_chart(query, user_id, chart_type, 'day', start_date, end_date)
+        else:
+            query = _filter_rollups_for_chart(query, user_id, chart_type, 'month')
+        rows = query.group_by(
+            TransactionRollup.category_id, Category.name, Category.color, TransactionRollup.transaction_type
+        ).order_by(db.desc('last_date')).all()
+
+        # Merge rows sharing a category name (same name across types or
+        # missing categories) the same way the charts always have
+        category_summary = {}
+        for name, color, transaction_type, total, _ in rows:
+            if name is None:
+                name = 'Uncategorized'
+                color = '#6c757d'
+            if name not in category_summary:
+                category_summary[name] = {'value': 0, 'color': color, 'type': transaction_type}
+            category_summary[name]['value'] += float(total or 0)
+
+        return [{'name': name, 'value': summary['value'], 'color': summary['color'], 'type': summary['type']}
+                for name, summary in category_summary.items()]
+    except Exception as e:
+        logger.error(f"Error getting category chart totals for user {user_id}: {e}")
+        return []
+
+def get_daily_chart_totals(user_id, chart_type, start_date, end_date=None):
+    """
+    Get per-day totals (income and expense both counted as positive) from the rollup table.
+
+    Args:
+        user_id: ID of the user
+        chart_type: Type of chart data ('all', 'income', 'expense')
+        start_date: First date to include
+        end_date: Last date to include, or None for no upper bound
+
+    Returns:
+        list: (date, total as float) tuples in date order
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import TransactionRollup
+        from app import db
+
+        query = db.session.query(TransactionRollup.bucket_date, db.func.sum(TransactionRollup.total))
+        query = _filter_rollups_for_chart(query, user_id, chart_type, 'day', start_date, end_date)
+        rows = query.group_by(TransactionRollup.bucket_date).order_by(TransactionRollup.bucket_date).all()
+        return [(bucket_date, float(total or 0)) for bucket_date, total in rows]
+    except Exception as e:
+        logger.error(f"Error getting daily chart totals for user {user_id}: {e}")
+        return []
+
+def get_chart_transactions(user_id, chart_type, start_date=None, end_date=None):
+    """
+    Get a user's transactions together with their category name and color.
+
+    Uses one query joining transactions to categories instead of looking up
+    the category separately for every transaction.
+
+    Args:
+        user_id: ID of the user
+        chart_type: Type of chart data ('all', 'income', 'expense')
+        start_date: First date to include, or None for no date filter
+        end_date: Last date to include (only used together with start_date)
+
+    Returns:
+        list: Tuples of (Transaction, category name or None, category color or None)
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import Transaction, Category
+        from app import db
+
+        query = db.session.query(Transaction, Category.name, Category.color).outerjoin(
+            Category,
+            db.and_(Category.id == Transaction.category_id, Category.user_id == user_id)
+        )
+        query = _filter_transactions_for_chart(query, user_id, chart_type, start_date, end_date)
+        return query.order_by(Transaction.date.desc()).all()
+    except Exception as e:
+        logger.error(f"Error getting chart transactions for user {user_id}: {e}")
+        return []
+
+def encode_history_cursor(transaction):
+    """
+    Encode the keyset position just after a transaction.
+    
+    Args:
+        transaction: Last Transaction on the current page
+    
+    Returns:
+        str: Cursor string in the form 'YYYY-MM-DD_id'
+    """
+    return f"{transaction.date.isoformat()}_{transaction.id}"
+
+def decode_history_cursor(cursor):
+    """
+    Decode a cursor produced by encode_history_cursor().
+    
+    Args:
+        cursor: Cursor string
+    
+    Returns:
+        tuple or None: (date, id) or None if the cursor is malformed
+    """
+    try:
+        date_part, id_part = cursor.split('_', 1)
+        return datetime.strptime(date_part, '%Y-%m-%d').date(), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+def get_transactions_page(query, cursor=None, page_size=50):
+    """
+    Get one page of transactions ordered newest first using keyset pagination.
+    
+    Rows are ordered by (date, id) descending and the cursor marks the last
+    row of the previous page, so each page is an index range scan on
+    (user_id, date, id) instead of an OFFSET over everything before it.
+    
+    Args:
+        query: Filtered Transaction query
+        cursor: Cursor from the previous page, or None for the first page
+        page_size: Maximum number of rows to return
+    
+    Returns:
+        tuple: (list of Transaction objects, next cursor or None on the last page)
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import Transaction
+        from app import db
+        
+        position = decode_history_cursor(cursor) if cursor else None
+        if position:
+            query = query.filter(db.tuple_(Transaction.date, Transaction.id) < position)
+        
+        # Fetch one extra row to find out whether another page exists
+        rows = query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(page_size + 1).all()
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            return rows, encode_history_cursor(rows[-1])
+        return rows, None
+    except Exception as e:
+        logger.error(f"Error getting transaction page: {e}")
+        return [], None
+
+def get_transaction_totals(query):
+    """
+    Get income and expense totals for a filtered transaction query.
+    
+    Args:
+        query: Filtered Transaction query
+    
+    Returns:
+        dict: 'income' and 'expense' totals as floats
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import Transaction
+        from app import db
+        
+        rows = query.with_entities(
+            Transaction.transaction_type, db.func.sum(Transaction.amount)
+        ).group_by(Transaction.transaction_type).all()
+        totals = {'income': 0.0, 'expense': 0.0}
+        for transaction_type, total in rows:
+            if transaction_type in totals:
+                totals[transaction_type] = float(total or 0)
+        return totals
+    except Exception as e:
+        logger.error(f"Error getting transaction totals: {e}")
+        return {'income': 0.0, 'expense': 0.0}
+
 def get_transaction_by_id(transaction_id, user_id):
     """
     Get a specific transaction by ID, ensuring it belongs to the user.
@@ -621,6 +938,11 @@ def update_transaction(transaction_id, user_id, amount, item_name, date, categor
             logger.warning(f"Category {category_id} not found or unauthorized for user {user_id}")
             return False
         
+        # Remember the old values so the running totals and rollups can be adjusted
+        old_amount = transaction.amount
+        old_type = transaction.transaction_type
+        old_rollup = rollup_delta_for(transaction, sign=-1)
+        
         # Update transaction fields
         transaction.amount = amount
         transaction.item_name = item_name
@@ -628,6 +950,14 @@ def update_transaction(transaction_id, user_id, amount, item_name, date, categor
         transaction.category_id = category_id
         transaction.transaction_type = transaction_type
         
+        old_delta = summary_delta_for(old_type, -old_amount, 0)
+        new_delta = summary_delta_for(transaction_type, amount, 0)
+        apply_summary_delta(
+            user_id,
+            income_delta=old_delta['income_delta'] + new_delta['income_delta'],
+            expense_delta=old_delta['expense_delta'] + new_delta['expense_delta']
+        )
+        apply_rollup_deltas([old_rollup, rollup_delta_for(transaction)])
         db.session.commit()
         logger.info(f"Transaction {transaction_id} updated successfully for user {user_id}")
         return True
@@ -669,6 +999,8 @@ def delete_transaction(transaction_id, user_id):
         
         # Delete the transaction
         db.session.delete(transaction)
+        apply_summary_delta(user_id, **summary_delta_for(transaction.transaction_type, -transaction.amount, -1))
+        apply_rollup_deltas([rollup_delta_for(transaction, sign=-1)])
         db.session.commit()
         
         logger.info(f"Transaction {transaction_id} deleted successfully for user {user_id}")
@@ -681,6 +1013,371 @@ def delete_transaction(transaction_id, user_id):
         logger.error(f"Error deleting transaction {transaction_id}: {e}")
         return None
 
+# Most operations accepted by one apply_transaction_batch() call
+TRANSACTION_BATCH_MAX = int(os.environ.get('TRANSACTION_BATCH_MAX', 500))
+
+def _parse_batch_operation(operation):
+    """
+    Validate the shape of one batch operation.
+
+    Returns:
+        tuple: (normalised operation dict, None) or (None, error message)
+    """
+    if not isinstance(operation, dict):
+        return None, 'Operation must be an object'
+    op = operation.get('op')
+    if op not in ('create', 'update', 'delete'):
+        return None, "op must be 'create', 'update' or 'delete'"
+    parsed = {'op': op}
+    try:
+        if op != 'create':
+            parsed['id'] = int(operation['id'])
+        if op != 'delete':
+            for field in ('amount', 'category_id', 'date', 'item_name'):
+                if op == 'create' and field not in operation:
+                    return None, f'{field} is required'
+            if 'amount' in operation:
+                parsed['amount'] = Decimal(str(operation['amount'])).quantize(Decimal('0.01'))
+                if parsed['amount'] <= 0:
+                    return None, 'amount must be positive'
+            if 'category_id' in operation:
+                parsed['category_id'] = int(operation['category_id'])
+            if 'date' in operation:
+                parsed['date'] = datetime.strptime(operation['date'], '%Y-%m-%d').date()
+            if 'item_name' in operation:
+                parsed['item_name'] = str(operation['item_name']).strip()[:200]
+                if not parsed['item_name']:
+                    return None, 'item_name must not be empty'
+            if operation.get('transaction_type') is not None:
+                if operation['transaction_type'] not in ('income', 'expense'):
+                    return None, "transaction_type must be 'income' or 'expense'"
+                parsed['transaction_type'] = operation['transaction_type']
+    except KeyError as e:
+        return None, f'{e.args[0]} is required'
+    except (TypeError, ValueError, ArithmeticError):
+        return None, 'Invalid value'
+    return parsed, None
+
+def apply_transaction_batch(user_id, operations, atomic=True):
+    """
+    Create, update and delete many of a user's transactions in one database transaction.
+
+    Every operation is validated up front. Category ownership is checked
+    with one query and the transactions being changed are loaded with one
+    more. The changes, the running totals and the chart rollups are then
+    written together and committed once.
+
+    Each operation is {"op": "create" | "update" | "delete", ...}:
+        create: amount, category_id, date (YYYY-MM-DD), item_name, optional transaction_type
+        update: id plus any of the create fields
+        delete: id
+    transaction_type defaults to the category's type.
+
+    Args:
+        user_id: ID of the user
+        operations: List of operation dictionaries
+        atomic: If True, nothing is applied when any operation is invalid
+
+    Returns:
+        tuple: (list of per-operation results, bool True if the batch was committed)
+        Each result is {'index', 'op', 'status': 'ok' | 'error' | 'skipped', 'id', 'error'}.
+
+    Raises:
+        SQLAlchemyError: If the database rejects the batch (nothing is applied)
+    """
+    # Import models here to avoid circular imports
+    from app.models import Transaction
+    from app import db
+
+    results = []
+    parsed = []
+    for index, operation in enumerate(operations):
+        operation, error = _parse_batch_operation(operation)
+        results.append({'index': index, 'op': operation['op'] if operation else None,
+                         'status': 'error' if error else 'ok', 'id': operation.get('id') if operation else None,
+                         'error': error})
+        parsed.append(operation)
+
+    # One query for every referenced category and one for every referenced transaction
+    category_ids = {op['category_id'] for op in parsed if op and 'category_id' in op}
+    categories = {
+        category.id: category.category_type
+        for category in Category.query.filter(Category.user_id == user_id, Category.id.in_(category_ids))
+    } if category_ids else {}
+    transaction_ids = {op['id'] for op in parsed if op and 'id' in op}
+    transactions = {
+        transaction.id: transaction
+        for transaction in Transaction.query.filter(Transaction.user_id == user_id, Transaction.id.in_(transaction_ids))
+    } if transaction_ids else {}
+
+    def fail(index, message):
+        results[index].update(status='error', error=message)
+
+    deleted = set()
+    for index, op in enumerate(parsed):
+        if op is None:
+            continue
+        if 'id' in op and (op['id'] not in transactions or op['id'] in deleted):
+            fail(index, 'Transaction not found')
+            continue
+        if 'category_id' in op and op['category_id'] not in categories:
+            fail(index, 'Category not found')
+            continue
+        if op['op'] == 'delete':
+            deleted.add(op['id'])
+
+    failed = any(result['status'] == 'error' for result in results)
+    if atomic and failed:
+        for result in results:
+            if result['status'] == 'ok':
+                result['status'] = 'skipped'
+        return results, False
+
+    try:
+        income_delta, expense_delta, count_delta = Decimal(0), Decimal(0), 0
+        rollup_deltas = []
+        created = []
+        for index, op in enumerate(parsed):
+            if results[index]['status'] != 'ok':
+                continue
+            if op['op'] == 'create':
+                transaction = Transaction(
+                    user_id=user_id,
+                    amount=op['amount'],
+                    category_id=op['category_id'],
+                    transaction_type=op.get('transaction_type') or categories[op['category_id']],
+                    date=op['date'],
+                    item_name=op['item_name']
+                )
+                db.session.add(transaction)
+                created.append((index, transaction))
+                sign = 1
+            else:
+                transaction = transactions[op['id']]
+                # Take the old values out of the totals; updates add the new ones back below
+                old = summary_delta_for(transaction.transaction_type, -transaction.amount, -1)
+                income_delta += old['income_delta']
+                expense_delta += old['expense_delta']
+                count_delta += old['count_delta']
+                rollup_deltas.append(rollup_delta_for(transaction, sign=-1))
+                if op['op'] == 'delete':
+                    db.session.delete(transaction)
+                    continue
+                for field in ('amount', 'category_id', 'date', 'item_name'):
+                    if field in op:
+                        setattr(transaction, field, op[field])
+                if 'transaction_type' in op:
+                    transaction.transaction_type = op['transaction_type']
+                elif 'category_id' in op:
+                    transaction.transaction_type = categories[op['category_id']]
+                sign = 1
+            new = summary_delta_for(transaction.transaction_type, transaction.amount, sign)
+            income_delta += new['income_delta']
+            expense_delta += new['expense_delta']
+            count_delta += new['count_delta']
+            rollup_deltas.append(rollup_delta_for(transaction))
+
+        apply_summary_delta(user_id, income_delta=income_delta, expense_delta=expense_delta, count_delta=count_delta)
+        apply_rollup_deltas(rollup_deltas)
+        for index, transaction in created:
+            results[index]['id'] = transaction.id
+        db.session.commit()
+        logger.info(f"Applied batch of {len(parsed)} operations for user {user_id}")
+        return results, True
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error applying transaction batch for user {user_id}: {e}")
+        raise
+
+# --- User Summary (Running Totals) Helpers ---
+
+def _compute_user_totals(user_id):
+    """
+    Compute a user's totals directly from the transactions table.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        tuple: (total_income, total_expense, transaction_count)
+    """
+    # Import models here to avoid circular imports
+    from app.models import Transaction
+    from app import db
+
+    income_sum = db.func.coalesce(db.func.sum(db.case(
+        (Transaction.transaction_type == 'income', Transaction.amount), else_=0
+    )), 0)
+    expense_sum = db.func.coalesce(db.func.sum(db.case(
+        (Transaction.transaction_type == 'expense', Transaction.amount), else_=0
+    )), 0)
+    total_income, total_expense, count = db.session.query(
+        income_sum, expense_sum, db.func.count(Transaction.id)
+    ).filter(Transaction.user_id == user_id).one()
+    return total_income, total_expense, count
+
+def rebuild_user_summary(user_id):
+    """
+    Recompute and store the running totals for one user.
+
+    The caller is responsible for committing the session.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        UserSummary: The refreshed summary row
+    """
+    # Import models here to avoid circular imports
+    from app.models import UserSummary
+    from app import db
+
+    db.session.flush()
+    total_income, total_expense, count = _compute_user_totals(user_id)
+    summary = db.session.get(UserSummary, user_id)
+    if summary is None:
+        summary = UserSummary(user_id=user_id)
+        db.session.add(summary)
+    summary.total_income = total_income
+    summary.total_expense = total_expense
+    summary.transaction_count = count
+    summary.updated_at = datetime.utcnow()
+    return summary
+
+def apply_summary_delta(user_id, income_delta=0, expense_delta=0, count_delta=0):
+    """
+    Adjust a user's running totals for a transaction change.
+
+    The adjustment is done with a single atomic UPDATE so concurrent
+    requests can't lose each other's changes. If the user has no summary
+    row yet it is built from the (already flushed) transactions instead.
+    The caller is responsible for committing the session.
+
+    Args:
+        user_id: ID of the user
+        income_delta: Amount to add to the income total
+        expense_delta: Amount to add to the expense total
+        count_delta: Change in transaction count
+    """
+    # Import models here to avoid circular imports
+    from app.models import UserSummary
+    from app import db
+
+    db.session.flush()
+    updated = db.session.query(UserSummary).filter(
+        UserSummary.user_id == user_id
+    ).update({
+        UserSummary.total_income: UserSummary.total_income + income_delta,
+        UserSummary.total_expense: UserSummary.total_expense + expense_delta,
+        UserSummary.transaction_count: UserSummary.transaction_count + count_delta,
+        UserSummary.updated_at: datetime.utcnow()
+    })
+    if not updated:
+        rebuild_user_summary(user_id)
+
+def summary_delta_for(transaction_type, amount, count_delta):
+    """
+    Build the apply_summary_delta() keyword arguments for one transaction.
+
+    Args:
+        transaction_type: 'income' or 'expense'
+        amount: Signed amount of the change
+        count_delta: Change in transaction count
+
+    Returns:
+        dict: income_delta, expense_delta and count_delta
+    """
+    amount = Decimal(str(amount))
+    return {
+        'income_delta': amount if transaction_type == 'income' else 0,
+        'expense_delta': amount if transaction_type == 'expense' else 0,
+        'count_delta': count_delta
+    }
+
+def get_user_summary(user_id):
+    """
+    Get the running totals for a user.
+
+    Users created before the summary table existed get their row built on
+    first access.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        dict: total_income, total_expense, transaction_count and updated_at
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import UserSummary
+        from app import db
+
+        summary = db.session.get(UserSummary, user_id)
+        if summary is None:
+            summary = rebuild_user_summary(user_id)
+            db.session.commit()
+        return {
+            'total_income': summary.total_income,
+            'total_expense': summary.total_expense,
+            'transaction_count': summary.transaction_count,
+            'updated_at': summary.updated_at
+        }
+    except Exception as e:
+        # Import db here to avoid circular imports
+        from app import db
+        db.session.rollback()
+        logger.error(f"Error getting summary for user {user_id}: {e}")
+        return {'total_income': 0, 'total_expense': 0, 'transaction_count': 0, 'updated_at': None}
+
+def rebuild_all_user_summaries():
+    """
+    Recompute the running totals for every user.
+
+    Returns:
+        int: Number of summaries rebuilt
+    """
+    try:
+        # Import models here to avoid circular imports
+        from app.models import User
+        from app import db
+
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).all()]
+        for user_id in user_ids:
+            rebuild_user_summary(user_id)
+        db.session.commit()
+        logger.info(f"Rebuilt summaries for {len(user_ids)} users")
+        return len(user_ids)
+    except Exception as e:
+        # Import db here to avoid circular imports
+        from app import db
+        db.session.rollback()
+        logger.error(f"Error rebuilding user summaries: {e}")
+        raise
+
+def verify_user_summaries():
+    """
+    Compare every stored summary against totals computed from transactions.
+
+    Returns:
+        list: Dictionaries describing each user whose summary is missing or wrong
+    """
+    # Import models here to avoid circular imports
+    from app.models import User, UserSummary
+    from app import db
+
+    stored = {s.user_id: s for s in UserSummary.query.all()}
+    mismatches = []
+    for (user_id,) in db.session.query(User.id).all():
+        total_income, total_expense, count = _compute_user_totals(user_id)
+        summary = stored.get(user_id)
+        expected = (float(total_income), float(total_expense), count)
+        actual = None if summary is None else (
+            float(summary.total_income), float(summary.total_expense), summary.transaction_count
+        )
+        if actual != expected:
+            mismatches.append({'user_id': user_id, 'expected': expected, 'stored': actual})
+    return mismatches
+
 def migrate_from_json(json_file_path):
     """
     Migrate data from JSON file to SQLAlchemy database.
@@ -693,6 +1390,8 @@ def migrate_from_json(json_file_path):
     
     try:
         model_migrate(json_file_path)
+        rebuild_all_user_summaries()
+        rebuild_all_rollups()
         logger.info(f"Migration from {json_file_path} completed successfully")
     except Exception as e:
         logger.error(f"Migration failed: {e}")
@@ -709,6 +1408,7 @@ def create_common_users():
         # Import models here to avoid circular imports
         from app.models import User
         from app import db
+        from app.utils.passwords import password_hasher
         
         # List of common users to create
         common_users = [
@@ -722,19 +1422,23 @@ def create_common_users():
             {'username': 'marwin', 'email': 'marwin@example.com', 'password': 'marwin123'},
         ]
         
-        created_count = 0
-        for user_data in common_users:
-            # Check if user already exists
-            existing_user = User.query.filter_by(username=user_data['username']).first()
-            if not existing_user:
-                # Create new user
-                user = User(username=user_data['username'], email=user_data['email'])
-                user.set_password(user_data['password'])
-                db.session.add(user)
-                created_count += 1
-                
-                # Create preset categories for the new user
-                create_preset_categories(user.id)
+        # Find the users that already exist with one query
+        existing_usernames = {username for (username,) in db.session.query(User.username).filter(
+            User.username.in_([user_data['username'] for user_data in common_users])
+        ).all()}
+        missing_users = [user_data for user_data in common_users if user_data['username'] not in existing_usernames]
+        
+        # Hash the new passwords in parallel on the hashing pool
+        password_hashes = password_hasher.hash_many([user_data['password'] for user_data in missing_users])
+        
+        new_users = [User(username=user_data['username'], email=user_data['email'], password_hash=password_hash)
+                     for user_data, password_hash in zip(missing_users, password_hashes)]
+        db.session.add_all(new_users)
+        db.session.flush()
+        created_count = len(new_users)
+        
+        # Create preset categories for all the new users in one insert
+        seed_categories([user.id for user in new_users], PRESET_CATEGORIES)
         
         db.session.commit()
         logger.info(f"Created {created_count} common users successfully")
@@ -782,6 +1486,7 @@ def reset_user_password(username, new_password):
         if user:
             user.set_password(new_password)
             db.session.commit()
+            invalidate_user(user.id)
             logger.info(f"Password reset successful for user {username}")
             return True
         else:
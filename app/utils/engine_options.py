@@ -0,0 +1,144 @@
+# SQLAlchemy engine options for Budget Tracker
+
+import os
+import json
+import logging
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+logger = logging.getLogger(__name__)
+
+# Pool mode: 'auto', 'pgbouncer' (transaction-pooling proxy) or 'direct' (app-side pool)
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'auto').lower()
+# Connections this app may hold open across all workers (Supabase direct connections are capped)
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 10))
+# Gunicorn processes and threads per process (WEB_CONCURRENCY is set by Render and read by gunicorn)
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 1))
+# Supabase's transaction pooler (Supavisor/PgBouncer) listens on this port
+PGBOUNCER_PORT = 6543
+
+# Pool classes that may be named in SQLALCHEMY_ENGINE_OPTIONS
+POOL_CLASSES = {'NullPool': NullPool, 'QueuePool': QueuePool, 'StaticPool': StaticPool}
+# Options only QueuePool accepts; create_engine() rejects them for NullPool/StaticPool
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_use_lifo')
+
+def detect_pool_mode(database_url):
+    """
+    Work out whether the database URL points at a transaction-pooling proxy.
+
+    Args:
+        database_url (str): SQLAlchemy database URL
+
+    Returns:
+        str: 'pgbouncer' or 'direct'
+    """
+    if DB_POOL_MODE in ('pgbouncer', 'direct'):
+        return DB_POOL_MODE
+    url = make_url(database_url)
+    if url.port == PGBOUNCER_PORT:
+        return 'pgbouncer'
+    return 'direct'
+
+def direct_pool_size(max_connections=DB_MAX_CONNECTIONS, workers=WEB_CONCURRENCY, threads=GUNICORN_THREADS):
+    """
+    Size one worker's pool so all workers together stay within the connection budget.
+
+    Each worker gets one connection per request thread plus one for the
+    background health monitor, capped at its share of `max_connections`;
+    whatever is left of that share becomes overflow.
+
+    Returns:
+        tuple: (pool_size, max_overflow)
+    """
+    share = max(1, max_connections // max(1, workers))
+    pool_size = max(1, min(threads + 1, share))
+    return pool_size, share - pool_size
+
+def load_engine_options_override():
+    """
+    Parse the SQLALCHEMY_ENGINE_OPTIONS environment variable.
+
+    Returns:
+        dict: Engine options from the JSON value, or an empty dict if unset or invalid
+    """
+    raw = os.environ.get('SQLALCHEMY_ENGINE_OPTIONS')
+    if not raw:
+        return {}
+    try:
+        options = json.loads(raw)
+    except ValueError as e:
+        logger.error(f"Ignoring invalid SQLALCHEMY_ENGINE_OPTIONS: {e}")
+        return {}
+    if not isinstance(options, dict):
+        logger.error("Ignoring SQLALCHEMY_ENGINE_OPTIONS: expected a JSON object")
+        return {}
+    if 'poolclass' in options:
+        if options['poolclass'] in POOL_CLASSES:
+            options['poolclass'] = POOL_CLASSES[options['poolclass']]
+        else:
+            logger.warning(f"Ignoring unknown poolclass {options.pop('poolclass')!r} in SQLALCHEMY_ENGINE_OPTIONS "
+                           f"(expected one of: {', '.join(POOL_CLASSES)})")
+    return options
+
+def build_engine_options(database_url):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    - pgbouncer: the proxy does the pooling, so connections are opened per
+      checkout and closed straight after (NullPool), and drivers that cache
+      prepared statements have the cache turned off because a transaction
+      pooler may run the next statement on a different server connection.
+      (psycopg2 never prepares statements, so it needs no change.)
+    - direct: a QueuePool sized from WEB_CONCURRENCY, GUNICORN_THREADS and
+      DB_MAX_CONNECTIONS.
+
+    Values from the SQLALCHEMY_ENGINE_OPTIONS environment variable (JSON)
+    are applied last and win over the computed ones, except QueuePool-only
+    settings, which are dropped when the final pool class doesn't take them.
+
+    Args:
+        database_url (str): SQLAlchemy database URL
+
+    Returns:
+        dict: Keyword arguments for create_engine()
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        return {}  # SQLAlchemy's SQLite defaults; the overrides are meant for Postgres
+
+    connect_args = {
+        'connect_timeout': 5,
+        'application_name': 'budge-it-app'
+    }
+    mode = detect_pool_mode(database_url)
+    if mode == 'pgbouncer':
+        options = {'poolclass': NullPool}
+        if url.get_driver_name() == 'psycopg':
+            connect_args['prepare_threshold'] = None
+        elif url.get_driver_name() == 'asyncpg':
+            connect_args['statement_cache_size'] = 0
+    else:
+        pool_size, max_overflow = direct_pool_size()
+        options = {
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_recycle': 300,
+            'pool_pre_ping': True,
+            'pool_timeout': 5
+        }
+    options['connect_args'] = connect_args
+
+    override = load_engine_options_override()
+    if 'connect_args' in override:
+        connect_args.update(override.pop('connect_args'))
+    options.update(override)
+    poolclass = options.get('poolclass', QueuePool)
+    if not issubclass(poolclass, QueuePool):
+        # e.g. pgbouncer mode with an override written for a direct pool
+        dropped = [key for key in QUEUE_POOL_OPTIONS if options.pop(key, None) is not None]
+        if dropped:
+            logger.warning(f"Ignoring {', '.join(dropped)} in SQLALCHEMY_ENGINE_OPTIONS: "
+                           f"{poolclass.__name__} doesn't use them")
+    logger.info(f"Database pool mode: {mode} ({options.get('poolclass', QueuePool).__name__})")
+    return options
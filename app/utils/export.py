@@ -0,0 +1,177 @@
+# Streaming transaction export (CSV, NDJSON and Parquet) for Budget Tracker
+
+import io
+import os
+import csv
+import json
+import logging
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the server-side cursor at a time
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+# Columns of every export, in order
+EXPORT_COLUMNS = ('id', 'date', 'item_name', 'transaction_type', 'amount', 'category', 'created_at')
+
+# Format name -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+def parquet_available():
+    """True if pyarrow is installed, so Parquet exports can be offered."""
+    return pyarrow is not None
+
+def iter_export_rows(query, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Stream a filtered Transaction query as plain tuples in EXPORT_COLUMNS order.
+
+    yield_per() makes the driver use a server-side cursor (psycopg2 named
+    cursor), so only `batch_size` rows are held in memory at a time.
+
+    Args:
+        query: Filtered Transaction query (e.g. from build_history_query)
+        batch_size: Rows per fetch
+
+    Yields:
+        tuple: id, date, item_name, transaction_type, amount, category name, created_at
+    """
+    # Import models here to avoid circular imports
+    from app.models import Transaction, Category
+
+    rows = query.outerjoin(
+        Category, (Category.id == Transaction.category_id) & (Category.user_id == Transaction.user_id)
+    ).with_entities(
+        Transaction.id, Transaction.date, Transaction.item_name, Transaction.transaction_type,
+        Transaction.amount, Category.name, Transaction.created_at
+    ).order_by(Transaction.date, Transaction.id).yield_per(batch_size)
+    for row in rows:
+        yield tuple(row)
+
+def iter_csv(rows, batch_size=EXPORT_BATCH_SIZE):
+    """Encode rows as CSV, yielding about `batch_size` lines per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        transaction_id, date, item_name, transaction_type, amount, category, created_at = row
+        writer.writerow([transaction_id, date.isoformat(), item_name, transaction_type, amount,
+                         category or '', created_at.isoformat() if created_at else ''])
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_ndjson(rows, batch_size=EXPORT_BATCH_SIZE):
+    """Encode rows as one JSON object per line, yielding about `batch_size` lines per chunk."""
+    lines = []
+    for row in rows:
+        transaction_id, date, item_name, transaction_type, amount, category, created_at = row
+        lines.append(json.dumps({
+            'id': transaction_id,
+            'date': date.isoformat(),
+            'item_name': item_name,
+            'transaction_type': transaction_type,
+            'amount': float(amount) if amount is not None else 0.0,
+            'category': category,
+            'created_at': created_at.isoformat() if created_at else None
+        }))
+        if len(lines) == batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+class _ChunkSink:
+    """Write-only file object that collects whatever pyarrow writes until drained."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_parquet(rows, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Encode rows as a Parquet file, writing one row group per batch.
+
+    Each row group's bytes are sent as soon as it is written, so memory
+    use is one batch regardless of the export size.
+    """
+    schema = pyarrow.schema([
+        ('id', pyarrow.int64()),
+        ('date', pyarrow.date32()),
+        ('item_name', pyarrow.string()),
+        ('transaction_type', pyarrow.string()),
+        ('amount', pyarrow.decimal128(10, 2)),
+        ('category', pyarrow.string()),
+        ('created_at', pyarrow.timestamp('us')),
+    ])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+
+    def write_batch(batch):
+        writer.write_table(pyarrow.Table.from_pylist(
+            [dict(zip(EXPORT_COLUMNS, row)) for row in batch], schema=schema
+        ))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            write_batch(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+def iter_export(query, export_format):
+    """
+    Stream a filtered Transaction query in the requested format.
+
+    Args:
+        query: Filtered Transaction query
+        export_format: 'csv', 'ndjson' or 'parquet'
+
+    Yields:
+        str or bytes: Chunks of the export file
+    """
+    rows = iter_export_rows(query)
+    encoders = {'csv': iter_csv, 'ndjson': iter_ndjson, 'parquet': iter_parquet}
+    try:
+        yield from encoders[export_format](rows)
+    except Exception as e:
+        # Headers are already sent, so all we can do is log and cut the download short
+        logger.error(f"Error streaming {export_format} export: {e}")
+        raise
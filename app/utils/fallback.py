@@ -0,0 +1,468 @@
+# SQLite fallback routing and write-behind replay for Budget Tracker
+
+import os
+import json
+import logging
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+import sqlalchemy as sa
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import attributes
+from flask_sqlalchemy.session import Session as FlaskSession
+
+try:
+    import fcntl
+except ImportError:  # Windows: replay isn't coordinated between processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Fallback database settings
+FALLBACK_DATABASE_URL = os.environ.get('FALLBACK_DATABASE_URL', 'sqlite:///fallback.db')
+FALLBACK_ENABLED = os.environ.get('FALLBACK_ENABLED', '1') != '0'
+# Seconds between copies of recently logged-in users into the fallback database
+FALLBACK_MIRROR_INTERVAL = float(os.environ.get('FALLBACK_MIRROR_INTERVAL', 60))
+
+# Tables whose writes are journaled and replayed; user_summaries is rebuilt instead
+JOURNALED_TABLES = ('users', 'categories', 'transactions')
+
+# Journal of writes made while in fallback mode (lives only in the fallback database)
+journal_metadata = sa.MetaData()
+write_journal = sa.Table(
+    'write_journal', journal_metadata,
+    sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column('operation', sa.String(10), nullable=False),  # 'insert', 'update' or 'delete'
+    sa.Column('table_name', sa.String(50), nullable=False),
+    sa.Column('row_id', sa.Integer, nullable=False),
+    sa.Column('data', sa.Text),  # Row values after the write (JSON)
+    sa.Column('before', sa.Text),  # Changed values before the write (JSON)
+    sa.Column('status', sa.String(10), nullable=False, default='pending'),  # 'pending', 'applied' or 'conflict'
+    sa.Column('new_id', sa.Integer),  # Primary database id given to a replayed insert
+    sa.Column('error', sa.Text),
+    sa.Column('created_at', sa.DateTime, default=datetime.utcnow)
+)
+
+def _to_json_value(value):
+    """Convert a column value to something json.dumps() accepts."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _from_json_value(column, value):
+    """Convert a journaled JSON value back to the column's Python type."""
+    if value is None:
+        return None
+    if isinstance(column.type, sa.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, sa.Date):
+        return date.fromisoformat(value)
+    if isinstance(column.type, sa.Numeric):
+        return Decimal(value)
+    return value
+
+class RoutingSession(FlaskSession):
+    """
+    Session that sends every statement to the SQLite fallback while the
+    database circuit breaker is open.
+
+    The routing decision is made once per transaction, so a transaction
+    never straddles both databases.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and fallback_router.enabled:
+            if 'use_fallback' not in self.info:
+                from app.utils.circuit_breaker import database_breaker
+                self.info['use_fallback'] = database_breaker.is_open()
+            if self.info['use_fallback']:
+                return fallback_router.engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_routing(session, transaction):
+    """Re-evaluate the routing decision for the next transaction."""
+    if transaction.parent is None:
+        session.info.pop('use_fallback', None)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _journal_fallback_writes(session, flush_context):
+    """Record inserts, updates and deletes flushed to the fallback database."""
+    if not session.info.get('use_fallback'):
+        return
+
+    entries = []
+    for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            mapper = sa_inspect(obj).mapper
+            table = mapper.local_table
+            if table.name not in JOURNALED_TABLES:
+                continue
+            if operation == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            data, before = {}, {}
+            for column_attr in mapper.column_attrs:
+                key = column_attr.key
+                column = column_attr.columns[0]
+                history = attributes.get_history(obj, key)
+                current = history.added[0] if history.added else (history.unchanged[0] if history.unchanged else None)
+                data[column.name] = _to_json_value(current)
+                if operation == 'update' and history.deleted:
+                    before[column.name] = _to_json_value(history.deleted[0])
+                elif operation == 'delete':
+                    before[column.name] = data[column.name]
+            entries.append({
+                'operation': operation,
+                'table_name': table.name,
+                'row_id': data['id'],
+                'data': json.dumps(data),
+                'before': json.dumps(before) if before else None,
+                'status': 'pending',
+                'created_at': datetime.utcnow()
+            })
+
+    if entries:
+        session.connection().execute(write_journal.insert(), entries)
+
+class FallbackRouter:
+    """
+    Owns the SQLite fallback engine, the write journal and its replay.
+
+    While the circuit breaker is open, RoutingSession sends all reads and
+    writes to the fallback database and every write is journaled. Once the
+    primary database is reachable again, replay() applies the journal to
+    it in order:
+
+    - inserts are re-inserted without their fallback id, and the new id is
+      recorded so later entries (and foreign keys) referring to the row
+      are remapped;
+    - updates and deletes of rows that already existed in the primary are
+      only applied if the primary row still has the values the fallback
+      saw before the write; otherwise the entry is marked as a conflict and
+      left for an administrator.
+
+    Users who log in are noted in memory, and the health monitor copies
+    them and their categories into the fallback database every
+    FALLBACK_MIRROR_INTERVAL seconds, so people can keep signing in and
+    recording transactions during an outage without the login itself
+    writing to local disk. The mirrored rows are kept after a replay, so
+    users who stay logged in are still covered in the next outage; only
+    the replayed transactions (and their totals) are cleared, and the
+    users whose data was replayed are mirrored again.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.url = None
+        self._engine = None
+        self._engine_pid = None
+        self._lock = threading.Lock()
+        # Ids of users who logged in since the last mirror run (per process)
+        self._users_to_mirror = set()
+        self.mirrored_users = 0
+        self.replays = 0
+        self.replayed_entries = 0
+        self.conflicts = 0
+
+    def init_app(self, app):
+        """Enable fallback routing when the primary database isn't SQLite already."""
+        self.app = app
+        primary_url = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        self.enabled = FALLBACK_ENABLED and not primary_url.startswith('sqlite')
+        url = sa.engine.make_url(FALLBACK_DATABASE_URL)
+        if url.drivername.startswith('sqlite') and url.database and not os.path.isabs(url.database):
+            os.makedirs(app.instance_path, exist_ok=True)
+            url = url.set(database=os.path.join(app.instance_path, url.database))
+        self.url = url
+        app.extensions['fallback_router'] = self
+
+    @property
+    def engine(self):
+        """Fallback engine for this process, created (with its tables) on first use."""
+        if self._engine is None or self._engine_pid != os.getpid():
+            with self._lock:
+                if self._engine is None or self._engine_pid != os.getpid():
+                    # Import db here to avoid circular imports
+                    from app import db
+                    engine = sa.create_engine(self.url)
+                    db.metadata.create_all(engine)
+                    journal_metadata.create_all(engine)
+                    self._engine = engine
+                    self._engine_pid = os.getpid()
+        return self._engine
+
+    def dispose(self):
+        """Drop the fallback engine's connections (e.g. after a fork)."""
+        if self._engine is not None:
+            self._engine.dispose(close=False)
+            self._engine = None
+
+    def note_login(self, user_id):
+        """Remember a user who logged in so the next mirror run copies them (no I/O)."""
+        if self.enabled:
+            with self._lock:
+                self._users_to_mirror.add(user_id)
+
+    def mirror_logged_in_users(self):
+        """
+        Copy users noted by note_login() and their categories into the fallback database.
+
+        Reads them from the primary with two queries and upserts them in one
+        SQLite transaction. Must run in an app context while the primary is
+        reachable.
+
+        Returns:
+            int: Number of users mirrored
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            user_ids, self._users_to_mirror = self._users_to_mirror, set()
+        if not user_ids:
+            return 0
+        try:
+            # Never overwrite fallback rows whose writes haven't been replayed yet
+            if self.pending_count():
+                with self._lock:
+                    self._users_to_mirror |= user_ids
+                return 0
+
+            # Import models here to avoid circular imports
+            from app.models import User, Category
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+            users = User.query.filter(User.id.in_(user_ids)).all()
+            categories = Category.query.filter(Category.user_id.in_(user_ids)).all()
+            rows = [
+                (User.__table__, [self._row_values(User.__table__, u) for u in users]),
+                (Category.__table__, [self._row_values(Category.__table__, c) for c in categories])
+            ]
+            with self.engine.begin() as connection:
+                for table, values in rows:
+                    if not values:
+                        continue
+                    statement = sqlite_insert(table)
+                    statement = statement.on_conflict_do_update(
+                        index_elements=['id'],
+                        set_={c.name: statement.excluded[c.name] for c in table.columns if c.name != 'id'}
+                    )
+                    connection.execute(statement, values)
+            self.mirrored_users += len(users)
+            return len(users)
+        except Exception as e:
+            logger.error(f"Error mirroring {len(user_ids)} users to fallback database: {e}")
+            return 0
+
+    @staticmethod
+    def _row_values(table, obj):
+        return {column.name: getattr(obj, column.key) for column in table.columns}
+
+    def pending_count(self):
+        """Number of journal entries waiting to be replayed."""
+        if not self.enabled:
+            return 0
+        with self.engine.connect() as connection:
+            return connection.execute(
+                sa.select(sa.func.count()).select_from(write_journal).where(write_journal.c.status == 'pending')
+            ).scalar()
+
+    def stats(self):
+        """
+        Get fallback routing and replay metrics for monitoring.
+
+        Returns:
+            dict: enabled, journal counts, mirrored users, replays and replayed entries
+        """
+        if not self.enabled:
+            return {'enabled': False}
+        try:
+            with self.engine.connect() as connection:
+                counts = dict(connection.execute(
+                    sa.select(write_journal.c.status, sa.func.count()).group_by(write_journal.c.status)
+                ).all())
+        except Exception as e:
+            counts = {'error': str(e)}
+        return {
+            'enabled': True,
+            'database_url': str(self.url),
+            'journal': counts,
+            'mirrored_users': self.mirrored_users,
+            'replays': self.replays,
+            'replayed_entries': self.replayed_entries,
+            'conflicts': self.conflicts
+        }
+
+    def _acquire_replay_lock(self):
+        """Take a non-blocking host-wide lock so only one worker replays at a time."""
+        if fcntl is None:
+            return None, True
+        handle = open(f"{self.url.database or 'fallback'}.replay.lock", 'a+')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return handle, True
+        except OSError:
+            handle.close()
+            return None, False
+
+    def replay(self):
+        """
+        Apply pending journal entries to the primary database in order.
+
+        Returns:
+            dict: Number of entries applied and in conflict, or skipped=True if another worker is replaying
+        """
+        if not self.enabled:
+            return {'applied': 0, 'conflicts': 0}
+
+        lock_handle, acquired = self._acquire_replay_lock()
+        if not acquired:
+            return {'applied': 0, 'conflicts': 0, 'skipped': True}
+        try:
+            with self.app.app_context():
+                return self._replay()
+        finally:
+            if lock_handle is not None:
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+                lock_handle.close()
+
+    def _replay(self):
+        # Import db here to avoid circular imports
+        from app import db
+        from app.utils.database import rebuild_user_summary
+        from app.utils.rollups import rebuild_user_rollups
+
+        tables = {name: db.metadata.tables[name] for name in JOURNALED_TABLES}
+        with self.engine.connect() as connection:
+            entries = connection.execute(
+                sa.select(write_journal).where(write_journal.c.status == 'pending').order_by(write_journal.c.id)
+            ).mappings().all()
+        if not entries:
+            return {'applied': 0, 'conflicts': 0}
+
+        results = []
+        affected_users = set()
+        # Fallback (table, id) -> primary id for rows inserted during the outage
+        id_map = {}
+        # Fallback rows whose insert couldn't be replayed
+        failed_inserts = set()
+        with db.engine.begin() as primary:
+            for entry in entries:
+                savepoint = primary.begin_nested()
+                try:
+                    new_id, error = self._apply_entry(primary, tables[entry['table_name']], entry, id_map, failed_inserts)
+                    if error:
+                        savepoint.rollback()
+                        if entry['operation'] == 'insert':
+                            failed_inserts.add((entry['table_name'], entry['row_id']))
+                        results.append((entry['id'], 'conflict', None, error))
+                        continue
+                    savepoint.commit()
+                    if new_id is not None:
+                        id_map[(entry['table_name'], entry['row_id'])] = new_id
+                    data = json.loads(entry['data'] or '{}')
+                    user_id = data.get('id') if entry['table_name'] == 'users' else data.get('user_id')
+                    if user_id is not None:
+                        affected_users.add(id_map.get(('users', user_id), user_id))
+                    results.append((entry['id'], 'applied', new_id, None))
+                except IntegrityError as e:
+                    savepoint.rollback()
+                    if entry['operation'] == 'insert':
+                        failed_inserts.add((entry['table_name'], entry['row_id']))
+                    results.append((entry['id'], 'conflict', None, str(e.orig)))
+
+        # Record the outcome only after the primary transaction has committed
+        with self.engine.begin() as connection:
+            for entry_id, status, new_id, error in results:
+                connection.execute(
+                    write_journal.update().where(write_journal.c.id == entry_id).values(
+                        status=status, new_id=new_id, error=error
+                    )
+                )
+            # Transactions now live in the primary; conflicting entries keep their
+            # row values in the journal for an administrator to resolve
+            for name in ('transaction_rollups', 'user_summaries', 'transactions'):
+                connection.execute(db.metadata.tables[name].delete())
+            # Mirrored users and categories stay for the next outage, except rows created
+            # during this one: they have other ids in the primary and are re-mirrored below
+            for name in ('categories', 'users'):
+                created = [entry['row_id'] for entry in entries
+                           if entry['table_name'] == name and entry['operation'] == 'insert']
+                if created:
+                    table = db.metadata.tables[name]
+                    connection.execute(table.delete().where(table.c.id.in_(created)))
+            connection.execute(write_journal.delete().where(write_journal.c.status == 'applied'))
+
+        # Running totals and rollups can't be replayed as deltas; rebuild them from the primary
+        for user_id in affected_users:
+            rebuild_user_summary(user_id)
+            rebuild_user_rollups(user_id)
+        db.session.commit()
+
+        # Refresh their mirror from the primary (new ids, and values that lost a conflict)
+        with self._lock:
+            self._users_to_mirror |= affected_users
+
+        applied = sum(1 for r in results if r[1] == 'applied')
+        conflicts = len(results) - applied
+        self.replays += 1
+        self.replayed_entries += applied
+        self.conflicts += conflicts
+        logger.info(f"Replayed {applied} fallback writes to the primary database ({conflicts} conflicts)")
+        return {'applied': applied, 'conflicts': conflicts}
+
+    def _apply_entry(self, primary, table, entry, id_map, failed_inserts):
+        """
+        Apply one journal entry.
+
+        Returns:
+            tuple: (new id for inserts or None, conflict message or None)
+        """
+        data = json.loads(entry['data'] or '{}')
+        before = json.loads(entry['before'] or '{}')
+        values = {}
+        for name, value in data.items():
+            column = table.c[name]
+            value = _from_json_value(column, value)
+            for foreign_key in column.foreign_keys:
+                parent_key = (foreign_key.column.table.name, value)
+                if parent_key in failed_inserts:
+                    return None, f"{parent_key[0]} row {value} it refers to was not replayed"
+                value = id_map.get(parent_key, value)
+            values[name] = value
+
+        row_key = (table.name, entry['row_id'])
+        if row_key in failed_inserts:
+            return None, f"{table.name} row {entry['row_id']} was not replayed"
+        created_in_fallback = row_key in id_map
+        row_id = id_map.get(row_key, entry['row_id'])
+
+        if entry['operation'] == 'insert':
+            values.pop('id', None)
+            result = primary.execute(table.insert().values(**values))
+            return result.inserted_primary_key[0], None
+
+        current = primary.execute(sa.select(table).where(table.c.id == row_id)).mappings().first()
+        if current is None:
+            if entry['operation'] == 'delete':
+                return None, None  # Already gone
+            return None, f"{table.name} row {row_id} no longer exists"
+        if not created_in_fallback:
+            for name, value in before.items():
+                if current[name] != _from_json_value(table.c[name], value):
+                    return None, f"{table.name} row {row_id} changed in the primary database ({name})"
+
+        if entry['operation'] == 'delete':
+            primary.execute(table.delete().where(table.c.id == row_id))
+        else:
+            values.pop('id', None)
+            changed = {name: values[name] for name in before}
+            primary.execute(table.update().where(table.c.id == row_id).values(**changed))
+        return None, None
+
+# Shared router instance, attached to the app in create_app()
+fallback_router = FallbackRouter()
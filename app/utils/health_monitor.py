@@ -0,0 +1,175 @@
+# Background database health monitor for Budget Tracker
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background probes
+DB_HEALTH_INTERVAL = float(os.environ.get('DB_HEALTH_INTERVAL', 30))
+
+class DatabaseHealthMonitor:
+    """
+    Probes the database from a background thread and caches the result.
+
+    Request handlers read the cached status instead of running their own
+    `SELECT 1`, so health checks never add a round-trip (or wait for the
+    single pooled connection) on the request path. The probe thread is
+    started lazily by the first request each worker serves, so it is
+    never started in a gunicorn master process that forks afterwards.
+    """
+
+    def __init__(self, interval=DB_HEALTH_INTERVAL):
+        self.interval = interval
+        self.app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats_refreshed = 0.0
+        self._users_mirrored = 0.0
+        self._status = {
+            'healthy': True,  # Assume healthy until the first probe says otherwise
+            'checked': False,
+            'last_check': None,
+            'latency_ms': None,
+            'last_error': None,
+            'consecutive_failures': 0
+        }
+
+    def init_app(self, app):
+        """Attach the monitor to the Flask app and start it on the first request."""
+        self.app = app
+        app.extensions['db_health_monitor'] = self
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        """Start the probe thread in this process if it isn't running yet."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='db-health-monitor', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Probe loop run by the background thread."""
+        from app.utils.circuit_breaker import database_breaker
+        while True:
+            self.check_now()
+            # While the breaker is open, probe again as soon as it allows a trial
+            wait = self.interval
+            if database_breaker.is_open():
+                wait = min(wait, max(database_breaker.seconds_until_retry(), 1))
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def request_check(self):
+        """Ask the background thread to probe again without waiting for it."""
+        self._wakeup.set()
+
+    def check_now(self):
+        """
+        Probe the database immediately and update the cached status.
+
+        Returns:
+            bool: True if the probe succeeded
+        """
+        # Import db here to avoid circular imports
+        from app import db
+        from sqlalchemy import text
+
+        start_time = time.perf_counter()
+        error = None
+        try:
+            with self.app.app_context():
+                with db.engine.connect() as connection:
+                    connection.execute(text('SELECT 1')).scalar()
+        except Exception as e:
+            error = str(e)
+        latency_ms = round((time.perf_counter() - start_time) * 1000, 1)
+
+        with self._lock:
+            self._status.update({
+                'healthy': error is None,
+                'checked': True,
+                'last_check': datetime.utcnow(),
+                'latency_ms': latency_ms,
+                'last_error': error,
+                'consecutive_failures': 0 if error is None else self._status['consecutive_failures'] + 1
+            })
+
+        # Feed the result to the circuit breaker so it can open and recover
+        from app.utils.circuit_breaker import database_breaker
+        if error is None:
+            logger.debug(f"Database health probe succeeded in {latency_ms}ms")
+            database_breaker.record_success()
+            self._replay_fallback_writes()
+            self._mirror_fallback_users()
+            self._refresh_system_stats()
+        else:
+            logger.warning(f"Database health probe failed: {error}")
+            database_breaker.record_failure(error)
+        return error is None
+
+    def _replay_fallback_writes(self):
+        """Send writes made in the SQLite fallback during an outage back to the database."""
+        from app.utils.fallback import fallback_router
+        if not fallback_router.enabled:
+            return
+        try:
+            if fallback_router.pending_count():
+                fallback_router.replay()
+        except Exception as e:
+            logger.error(f"Error replaying fallback writes: {e}")
+
+    def _mirror_fallback_users(self):
+        """Copy recently logged-in users into the SQLite fallback when it is due."""
+        from app.utils.fallback import FALLBACK_MIRROR_INTERVAL, fallback_router
+        if not fallback_router.enabled or time.monotonic() - self._users_mirrored < FALLBACK_MIRROR_INTERVAL:
+            return
+        try:
+            with self.app.app_context():
+                fallback_router.mirror_logged_in_users()
+            self._users_mirrored = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error mirroring users to the fallback database: {e}")
+
+    def _refresh_system_stats(self):
+        """Refresh the admin dashboard's system_stats table when it is due."""
+        from app.utils.system_stats import SYSTEM_STATS_REFRESH_INTERVAL, refresh_system_stats
+        if SYSTEM_STATS_REFRESH_INTERVAL <= 0 or time.monotonic() - self._stats_refreshed < SYSTEM_STATS_REFRESH_INTERVAL:
+            return
+        try:
+            with self.app.app_context():
+                refresh_system_stats()
+            self._stats_refreshed = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error refreshing system stats: {e}")
+
+    @property
+    def healthy(self):
+        """Cached result of the last probe (True before the first probe)."""
+        with self._lock:
+            return self._status['healthy']
+
+    def status(self):
+        """
+        Get a copy of the cached health status.
+
+        Returns:
+            dict: healthy, checked, last_check (ISO string), latency_ms, last_error and consecutive_failures
+        """
+        with self._lock:
+            status = dict(self._status)
+        status['last_check'] = status['last_check'].isoformat() if status['last_check'] else None
+        status['interval'] = self.interval
+        return status
+
+# Shared monitor instance, attached to the app in create_app()
+health_monitor = DatabaseHealthMonitor()
@@ -0,0 +1,72 @@
+# Primary key allocation for Budget Tracker
+
+import logging
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+def _id_sequence(model_class):
+    """SQL expression naming the sequence behind a model's SERIAL/identity id column (PostgreSQL)."""
+    return sa.func.pg_get_serial_sequence(model_class.__tablename__, 'id')
+
+def reserve_ids(model_class, count):
+    """
+    Reserve a block of primary keys for rows that will be inserted with explicit ids.
+
+    On PostgreSQL the ids come from the table's own sequence (one
+    nextval() per id, fetched in a single round-trip), so they never
+    collide with ids handed out to concurrent writers or to ordinary
+    INSERTs. Sequence values are never reused, even if the caller rolls
+    back. SQLite has no sequences: the block starts after the current
+    maximum id, which is safe because SQLite allows one writer at a time
+    and the caller inserts the rows in the same transaction.
+
+    Args:
+        model_class: SQLAlchemy model class with an integer `id` column
+        count: Number of ids to reserve
+
+    Returns:
+        list: `count` unused ids in ascending order
+    """
+    # Import db here to avoid circular imports
+    from app import db
+
+    if count <= 0:
+        return []
+    bind = db.session.get_bind(mapper=model_class)
+    if bind.dialect.name == 'postgresql':
+        ids = db.session.execute(
+            sa.select(sa.func.nextval(_id_sequence(model_class))).select_from(sa.func.generate_series(1, count))
+        ).scalars().all()
+        return sorted(ids)
+    start = (db.session.query(sa.func.max(model_class.id)).scalar() or 0) + 1
+    return list(range(start, start + count))
+
+def next_id(model_class):
+    """Reserve a single primary key (see reserve_ids)."""
+    return reserve_ids(model_class, 1)[0]
+
+def sync_id_sequence(model_class):
+    """
+    Move a table's id sequence past the largest id in the table.
+
+    Needed after rows were inserted with ids that didn't come from the
+    sequence (for example copied from a JSON export); otherwise the next
+    ordinary INSERT would be handed an id that is already taken. Does
+    nothing on SQLite, which always continues from the largest id.
+
+    Args:
+        model_class: SQLAlchemy model class with an integer `id` column
+    """
+    # Import db here to avoid circular imports
+    from app import db
+
+    bind = db.session.get_bind(mapper=model_class)
+    if bind.dialect.name != 'postgresql':
+        return
+    max_id = sa.select(sa.func.max(model_class.id)).scalar_subquery()
+    db.session.execute(sa.select(sa.func.setval(
+        _id_sequence(model_class), sa.func.coalesce(max_id, 1), max_id.is_not(None)
+    )))
+    logger.info(f"Synced the id sequence of {model_class.__tablename__}")
@@ -0,0 +1,416 @@
+# Bank statement import (CSV and OFX) for Budget Tracker
+
+import io
+import os
+import re
+import csv
+import logging
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+logger = logging.getLogger(__name__)
+
+# Import settings
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', 20 * 1024 * 1024))
+# Seconds without a heartbeat after which a pending/running import is taken to have died with its worker
+IMPORT_STALE_AFTER = int(os.environ.get('IMPORT_STALE_AFTER', 300))
+
+# Date formats tried in order for CSV dates
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y', '%Y%m%d')
+
+# Accepted CSV header names for each field (compared lower-cased)
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted date', 'posting date', 'value date'),
+    'amount': ('amount', 'transaction amount', 'value'),
+    'debit': ('debit', 'withdrawal', 'money out'),
+    'credit': ('credit', 'deposit', 'money in'),
+    'item_name': ('item name', 'description', 'name', 'payee', 'memo', 'details', 'narrative'),
+    'category': ('category',),
+    'type': ('type', 'transaction type'),
+}
+
+# Colour given to categories created by an import
+IMPORTED_CATEGORY_COLOR = '#6c757d'
+# Category used for rows that don't name one
+DEFAULT_CATEGORY_NAME = 'Imported'
+
+class StatementError(ValueError):
+    """Raised when an uploaded file can't be read as a bank statement."""
+
+def parse_amount(text):
+    """
+    Parse an amount such as '1,234.50', '-12.00', '(12.00)' or '$12'.
+
+    Returns:
+        Decimal or None: Signed amount, or None if the text isn't a number
+    """
+    if text is None:
+        return None
+    text = text.strip()
+    negative = text.startswith('(') and text.endswith(')')
+    text = re.sub(r'[^\d.\-+]', '', text)
+    if not text:
+        return None
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+def parse_date(text):
+    """
+    Parse a statement date in one of DATE_FORMATS (or OFX's YYYYMMDD[HHMMSS...]).
+
+    Returns:
+        date or None: Parsed date, or None if no format matches
+    """
+    text = (text or '').strip()
+    if re.match(r'^\d{8}', text):
+        text = text[:8]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+def make_row(date_text, amount, item_name, category=None, transaction_type=None):
+    """
+    Normalise one statement line.
+
+    Returns:
+        dict or None: date, amount (positive), transaction_type, item_name and category,
+        or None if the line can't be imported
+    """
+    transaction_date = parse_date(date_text)
+    if transaction_date is None or amount is None or amount == 0:
+        return None
+    transaction_type = (transaction_type or '').strip().lower()
+    if transaction_type in ('credit', 'deposit', 'income'):
+        transaction_type = 'income'
+    elif transaction_type in ('debit', 'withdrawal', 'expense', 'payment'):
+        transaction_type = 'expense'
+    else:
+        transaction_type = 'income' if amount > 0 else 'expense'
+    item_name = (item_name or '').strip()[:200] or 'Imported transaction'
+    return {
+        'date': transaction_date,
+        'amount': abs(amount).quantize(Decimal('0.01')),
+        'transaction_type': transaction_type,
+        'item_name': item_name,
+        'category': (category or '').strip()[:100] or None
+    }
+
+def read_csv(binary_stream):
+    """
+    Stream rows from a CSV statement.
+
+    Args:
+        binary_stream: File opened in binary mode
+
+    Yields:
+        dict or None: Normalised row, or None for a line that couldn't be parsed
+    """
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+    reader = csv.reader(text_stream)
+    header = next(reader, None)
+    if not header:
+        raise StatementError('The CSV file is empty')
+    header = [column.strip().lower() for column in header]
+    columns = {}
+    for field, names in CSV_COLUMNS.items():
+        for name in names:
+            if name in header:
+                columns[field] = header.index(name)
+                break
+    if 'date' not in columns or not ({'amount', 'debit', 'credit'} & columns.keys()):
+        raise StatementError('The CSV file needs a date column and an amount (or debit/credit) column')
+
+    def cell(values, field):
+        index = columns.get(field)
+        return values[index] if index is not None and index < len(values) else None
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        if 'amount' in columns:
+            amount = parse_amount(cell(values, 'amount'))
+        else:
+            credit = parse_amount(cell(values, 'credit')) or Decimal(0)
+            debit = parse_amount(cell(values, 'debit')) or Decimal(0)
+            amount = credit - abs(debit)
+        yield make_row(cell(values, 'date'), amount, cell(values, 'item_name'),
+                       cell(values, 'category'), cell(values, 'type'))
+
+# OFX tags: <NAME>value or </NAME> (SGML OFX 1.x leaves leaf tags unclosed)
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+def read_ofx(binary_stream, chunk_size=64 * 1024):
+    """
+    Stream <STMTTRN> entries from an OFX/QFX statement (SGML 1.x or XML 2.x).
+
+    The file is scanned in chunks, so memory use doesn't grow with its size.
+
+    Args:
+        binary_stream: File opened in binary mode
+
+    Yields:
+        dict or None: Normalised row, or None for an entry that couldn't be parsed
+    """
+    buffer = ''
+    current = None
+    found_any = False
+    while True:
+        chunk = binary_stream.read(chunk_size)
+        if chunk:
+            buffer += chunk.decode('latin-1')
+            # Only scan up to the last complete tag; keep the rest for the next chunk
+            cut = max(buffer.rfind('<'), 0)
+            text, buffer = buffer[:cut], buffer[cut:]
+        else:
+            text, buffer = buffer, ''
+        for closing, tag, value in OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    found_any = True
+                    yield make_row(current.get('DTPOSTED'), parse_amount(current.get('TRNAMT')),
+                                   current.get('NAME') or current.get('MEMO'))
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+        if not chunk:
+            break
+    if not found_any:
+        raise StatementError('No transactions found in the OFX file')
+
+def detect_format(filename):
+    """Return 'csv' or 'ofx' from an uploaded file's extension."""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ofx', '.qfx'):
+        return 'ofx'
+    raise StatementError('Upload a .csv, .ofx or .qfx file')
+
+class CategoryMapper:
+    """
+    Maps statement category names to the user's category ids in memory.
+
+    The user's categories are loaded once; names that don't exist yet are
+    created (once each) the first time they appear.
+    """
+
+    def __init__(self, user_id):
+        # Import models here to avoid circular imports
+        from app.models import Category
+        self.user_id = user_id
+        self.ids = {
+            (category.name.lower(), category.category_type): category.id
+            for category in Category.query.filter_by(user_id=user_id).all()
+        }
+
+    def category_id(self, name, transaction_type):
+        """Return the id of the user's category, creating it if needed."""
+        # Import models here to avoid circular imports
+        from app.models import Category
+        from app import db
+
+        name = name or DEFAULT_CATEGORY_NAME
+        key = (name.lower(), transaction_type)
+        if key not in self.ids:
+            category = Category(user_id=self.user_id, name=name, category_type=transaction_type,
+                                color=IMPORTED_CATEGORY_COLOR)
+            db.session.add(category)
+            db.session.flush()
+            self.ids[key] = category.id
+        return self.ids[key]
+
+def batched(rows, size):
+    """Group an iterable into lists of at most `size` items."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def import_statement(job_id, path):
+    """
+    Import a saved statement file for an ImportJob (runs in a background thread).
+
+    Rows are inserted IMPORT_BATCH_SIZE at a time with one executemany
+    INSERT per batch, and each batch is committed together with the
+    user's running totals, chart rollups and the job's progress counters
+    (which also bumps the job's updated_at heartbeat).
+
+    Args:
+        job_id: ID of the ImportJob
+        path: Path of the saved upload (deleted when done)
+    """
+    # Import models here to avoid circular imports
+    from app.models import ImportJob, Transaction
+    from app import db
+    from app.utils.database import apply_summary_delta, is_using_fallback
+    from app.utils.rollups import apply_rollup_deltas, rollup_delta_for
+
+    job = db.session.get(ImportJob, job_id)
+    try:
+        job.status = 'running'
+        db.session.commit()
+        mapper = CategoryMapper(job.user_id)
+        reader = read_csv if job.file_format == 'csv' else read_ofx
+
+        with open(path, 'rb') as statement:
+            for batch in batched(reader(statement), IMPORT_BATCH_SIZE):
+                # Bulk inserts aren't journaled by the SQLite fallback, so stop if the database goes away
+                if is_using_fallback():
+                    raise StatementError('The database became unavailable; rows imported so far were kept')
+                values = []
+                income, expense = Decimal(0), Decimal(0)
+                for row in batch:
+                    if row is None:
+                        continue
+                    values.append({
+                        'user_id': job.user_id,
+                        'category_id': mapper.category_id(row['category'], row['transaction_type']),
+                        'amount': row['amount'],
+                        'transaction_type': row['transaction_type'],
+                        'date': row['date'],
+                        'item_name': row['item_name'],
+                        'created_at': datetime.utcnow()
+                    })
+                    if row['transaction_type'] == 'income':
+                        income += row['amount']
+                    else:
+                        expense += row['amount']
+                if values:
+                    db.session.execute(db.insert(Transaction), values)
+                    apply_summary_delta(job.user_id, income_delta=income, expense_delta=expense,
+                                        count_delta=len(values))
+                    apply_rollup_deltas(rollup_delta_for(value) for value in values)
+                job.rows_read += len(batch)
+                job.rows_imported += len(values)
+                job.rows_skipped += len(batch) - len(values)
+                db.session.commit()
+
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        logger.info(f"Import {job_id} finished: {job.rows_imported} imported, {job.rows_skipped} skipped")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error importing statement for job {job_id}: {e}")
+        job = db.session.get(ImportJob, job_id)
+        job.status = 'failed'
+        job.error = str(e) if isinstance(e, StatementError) else 'The file could not be imported'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    finally:
+        os.remove(path)
+
+def start_import(user_id, upload):
+    """
+    Save an uploaded statement and import it in a background thread.
+
+    Args:
+        user_id: ID of the user importing
+        upload: werkzeug FileStorage from the request
+
+    Returns:
+        ImportJob: The new job (poll its progress with get_import_job)
+
+    Raises:
+        StatementError: If the file type is unsupported or the file is too large
+    """
+    # Import models here to avoid circular imports
+    from flask import current_app
+    from app.models import ImportJob
+    from app import db
+
+    file_format = detect_format(upload.filename)
+
+    # Copy the upload to disk in chunks so the thread can read it after the request ends
+    handle, path = tempfile.mkstemp(prefix='budge-it-import-', suffix=f'.{file_format}')
+    with os.fdopen(handle, 'wb') as saved:
+        while True:
+            chunk = upload.stream.read(64 * 1024)
+            if not chunk:
+                break
+            saved.write(chunk)
+            if saved.tell() > IMPORT_MAX_BYTES:
+                break
+        too_large = saved.tell() > IMPORT_MAX_BYTES
+    if too_large:
+        os.remove(path)
+        raise StatementError(f'The file is larger than {IMPORT_MAX_BYTES // (1024 * 1024)} MB')
+
+    job = ImportJob(user_id=user_id, filename=(upload.filename or 'statement')[:255], file_format=file_format)
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    job_id = job.id
+
+    def run():
+        with app.app_context():
+            import_statement(job_id, path)
+
+    threading.Thread(target=run, name=f'import-{job_id}', daemon=True).start()
+    return job
+
+def fail_stale_imports(user_id):
+    """
+    Mark a user's imports that stopped sending heartbeats as failed.
+
+    The import thread dies with its gunicorn worker (max_requests restart,
+    timeout or crash), which would leave the job 'running' forever. A job
+    whose updated_at is older than IMPORT_STALE_AFTER seconds is failed in
+    one conditional UPDATE; batches it already committed stay imported.
+
+    Args:
+        user_id: ID of the user whose jobs to check
+
+    Returns:
+        int: Number of jobs marked as failed
+    """
+    # Import models here to avoid circular imports
+    from app.models import ImportJob
+    from app import db
+
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=IMPORT_STALE_AFTER)
+    result = db.session.execute(
+        db.update(ImportJob)
+        .where(
+            ImportJob.user_id == user_id,
+            ImportJob.status.in_(('pending', 'running')),
+            db.func.coalesce(ImportJob.updated_at, ImportJob.created_at) < cutoff
+        )
+        .values(status='failed', error='The import stopped before finishing; rows imported so far were kept',
+                finished_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        db.session.commit()
+        logger.warning(f"Marked {result.rowcount} stalled imports for user {user_id} as failed")
+    return result.rowcount
+
+def get_import_job(job_id, user_id):
+    """
+    Get an import job owned by a user, failing it first if its import has stalled.
+
+    Returns:
+        ImportJob or None: The job, or None if it doesn't exist or belongs to someone else
+    """
+    # Import models here to avoid circular imports
+    from app.models import ImportJob
+    fail_stale_imports(user_id)
+    return ImportJob.query.filter_by(id=job_id, user_id=user_id).first()
@@ -0,0 +1,395 @@
+# Login throttling for Budget Tracker
+
+import os
+import hmac
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Sliding window (seconds) in which failed logins are counted
+LOGIN_THROTTLE_WINDOW = float(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))
+# Failed logins allowed per username / per client IP within the window (0 = don't limit)
+LOGIN_THROTTLE_USER_LIMIT = int(os.environ.get('LOGIN_THROTTLE_USER_LIMIT', 5))
+LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 20))
+# Reverse proxies whose X-Forwarded-For is trusted (see create_app). Behind a proxy without
+# it every client has the proxy's address, so the IP limit is only applied when it is set
+# or when the app is reached directly (LOGIN_THROTTLE_DIRECT_CLIENTS=1)
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+LOGIN_THROTTLE_DIRECT_CLIENTS = os.environ.get('LOGIN_THROTTLE_DIRECT_CLIENTS', '0') == '1'
+# First lockout (seconds), growth factor for each further lockout, and cap
+LOGIN_THROTTLE_LOCKOUT = float(os.environ.get('LOGIN_THROTTLE_LOCKOUT', 30))
+LOGIN_THROTTLE_BACKOFF = float(os.environ.get('LOGIN_THROTTLE_BACKOFF', 2))
+LOGIN_THROTTLE_MAX_LOCKOUT = float(os.environ.get('LOGIN_THROTTLE_MAX_LOCKOUT', 3600))
+# Most usernames/IPs tracked at once; the least recently failed are dropped first
+LOGIN_THROTTLE_MAX_KEYS = int(os.environ.get('LOGIN_THROTTLE_MAX_KEYS', 5000))
+# Seconds between sweeps of forgotten keys (per worker)
+LOGIN_THROTTLE_SWEEP_INTERVAL = float(os.environ.get('LOGIN_THROTTLE_SWEEP_INTERVAL', 60))
+# SQLite file shared by every worker on the host; kept in RAM (/dev/shm) where available.
+# Set it to an empty value to keep the state in this process only
+LOGIN_THROTTLE_STATE_FILE = os.environ.get('LOGIN_THROTTLE_STATE_FILE', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'budge-it-login-throttle.db'
+))
+
+throttle_metadata = sa.MetaData()
+# One row per throttled username ('user:<name>') or client IP ('ip:<address>')
+throttle_keys = sa.Table(
+    'login_throttle_keys', throttle_metadata,
+    sa.Column('key', sa.String(200), primary_key=True),
+    sa.Column('failures', sa.Text, nullable=False),  # JSON list of failure times inside the window
+    sa.Column('locked_until', sa.Float, nullable=False, default=0),
+    sa.Column('lockouts', sa.Integer, nullable=False, default=0),
+    sa.Column('last_failure', sa.Float, nullable=False, index=True)
+)
+# When each user's password last changed, so every worker can drop remembered failures from before it
+password_changes = sa.Table(
+    'login_password_changes', throttle_metadata,
+    sa.Column('key', sa.String(200), primary_key=True),
+    sa.Column('changed_at', sa.Float, nullable=False, index=True)
+)
+# Single row of host-wide totals for monitoring
+throttle_totals = sa.Table(
+    'login_throttle_totals', throttle_metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('failures', sa.Integer, nullable=False, default=0),
+    sa.Column('lockouts', sa.Integer, nullable=False, default=0)
+)
+
+class LoginThrottle:
+    """
+    Limits failed logins per username and per client IP.
+
+    Every failed login is timestamped under both keys. Once a key has
+    `limit` failures inside the sliding `window`, it is locked for
+    `lockout` seconds; each further lockout of the same key lasts
+    `backoff` times longer, up to `max_lockout`. A key is forgotten once
+    it has had no failures for longer than the window and the longest
+    lockout, so the backoff starts over after a quiet period.
+
+    Each key is one row in a small SQLite table shared by every worker on
+    the host. Checking an attempt is a primary-key lookup of its two keys,
+    so locked-out requests are turned away before any database query or
+    password hash; recording a failure rewrites only those rows, in a short
+    write transaction.
+
+    The IP limit only applies when client addresses can be trusted (see
+    TRUSTED_PROXY_COUNT); behind an untrusted proxy one attacker could
+    otherwise lock every user out.
+
+    Username/password pairs that just failed are also remembered (as
+    keyed hashes, in this process only), so the same wrong pair sent
+    again is rejected without hashing the password again. Password
+    changes are recorded in the shared table, and a remembered failure
+    from before the user's last change is ignored, so a worker never
+    rejects a password that was set after it failed.
+    """
+
+    def __init__(self, window=LOGIN_THROTTLE_WINDOW, user_limit=LOGIN_THROTTLE_USER_LIMIT,
+                 ip_limit=None, lockout=LOGIN_THROTTLE_LOCKOUT, backoff=LOGIN_THROTTLE_BACKOFF,
+                 max_lockout=LOGIN_THROTTLE_MAX_LOCKOUT, max_keys=LOGIN_THROTTLE_MAX_KEYS,
+                 sweep_interval=LOGIN_THROTTLE_SWEEP_INTERVAL, state_file=LOGIN_THROTTLE_STATE_FILE):
+        if ip_limit is None:
+            trusted = TRUSTED_PROXY_COUNT > 0 or LOGIN_THROTTLE_DIRECT_CLIENTS
+            ip_limit = LOGIN_THROTTLE_IP_LIMIT if trusted else 0
+        self.window = window
+        self.limits = {'user': user_limit, 'ip': ip_limit}
+        self.lockout = lockout
+        self.backoff = backoff
+        self.max_lockout = max_lockout
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self.state_file = state_file
+        self._engine = None
+        self._engine_pid = None
+        self._engine_lock = threading.Lock()
+        self._last_sweep = 0.0
+        # Requests checked and turned away, counted per process
+        self.checked = 0
+        self.rejected = 0
+        self.known_failures_rejected = 0
+        # Recently failed username/password pairs, as HMACs under a per-process key
+        self._failed_pairs = OrderedDict()
+        self._failed_pairs_key = os.urandom(32)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _user_key(username):
+        # Case and surrounding spaces don't give an attacker a fresh counter
+        return 'user:' + username.strip().lower()[:150]
+
+    def _keys(self, username, ip):
+        """State keys for a login attempt, skipping kinds that aren't limited."""
+        keys = []
+        if username and self.limits['user'] > 0:
+            keys.append(self._user_key(username))
+        if ip and self.limits['ip'] > 0:
+            keys.append('ip:' + ip)
+        return keys
+
+    def _limit(self, key):
+        return self.limits[key.split(':', 1)[0]]
+
+    @property
+    def engine(self):
+        """Engine for the shared state in this process, created (with its tables) on first use."""
+        if self._engine is None or self._engine_pid != os.getpid():
+            with self._engine_lock:
+                if self._engine is None or self._engine_pid != os.getpid():
+                    # Without a shared file, each process keeps its own in a private temp dir
+                    path = self.state_file or os.path.join(tempfile.mkdtemp(prefix='budge-it-throttle-'), 'throttle.db')
+                    engine = sa.create_engine(f"sqlite:///{path}")
+
+                    @sa.event.listens_for(engine, 'connect')
+                    def set_sqlite_pragmas(connection, record):
+                        # Let SQLAlchemy's begin event issue BEGIN IMMEDIATE (see below)
+                        connection.isolation_level = None
+                        cursor = connection.cursor()
+                        cursor.execute('PRAGMA journal_mode=WAL')
+                        cursor.execute('PRAGMA synchronous=NORMAL')
+                        cursor.close()
+
+                    @sa.event.listens_for(engine, 'begin')
+                    def begin_immediate(connection):
+                        # Take the write lock up front so concurrent failures can't lose each other's updates
+                        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+                    throttle_metadata.create_all(engine)
+                    self._engine = engine
+                    self._engine_pid = os.getpid()
+        return self._engine
+
+    def _sweep(self, connection, now):
+        """Drop keys that are past their lockout and quiet, then the oldest keys over max_keys."""
+        quiet = max(self.window, self.max_lockout)
+        connection.execute(throttle_keys.delete().where(
+            throttle_keys.c.locked_until <= now, throttle_keys.c.last_failure < now - quiet
+        ))
+        # Remembered failures expire after the window, so older password changes no longer matter
+        connection.execute(password_changes.delete().where(password_changes.c.changed_at < now - self.window))
+        excess = connection.execute(sa.select(sa.func.count()).select_from(throttle_keys)).scalar() - self.max_keys
+        if excess > 0:
+            oldest = sa.select(throttle_keys.c.key).order_by(throttle_keys.c.last_failure).limit(excess)
+            connection.execute(throttle_keys.delete().where(throttle_keys.c.key.in_(oldest)))
+
+    def retry_after(self, username, ip):
+        """
+        Check whether a login attempt may go ahead.
+
+        Only looks up the attempt's own keys, so it is cheap enough to run
+        before any other work for the request.
+
+        Args:
+            username: Username being logged in to
+            ip: Client IP address
+
+        Returns:
+            float: Seconds until the attempt is allowed (0 if allowed now)
+        """
+        self.checked += 1
+        keys = self._keys(username, ip)
+        if not keys:
+            return 0
+        try:
+            with self.engine.connect() as connection:
+                locked_until = connection.execute(
+                    sa.select(sa.func.max(throttle_keys.c.locked_until)).where(throttle_keys.c.key.in_(keys))
+                ).scalar()
+        except Exception as e:
+            logger.error(f"Error reading login throttle state: {e}")
+            return 0
+        wait = max((locked_until or 0) - time.time(), 0)
+        if wait > 0:
+            self.rejected += 1
+        return wait
+
+    def _pair_digest(self, username, password):
+        message = f"{self._user_key(username)}\0{password}".encode('utf-8', 'surrogatepass')
+        return hmac.new(self._failed_pairs_key, message, hashlib.sha256).digest()
+
+    def is_known_failure(self, username, password):
+        """
+        True if this exact username/password pair failed within the window.
+
+        The pair is looked up in this process's memory; only on a hit is
+        the shared table asked whether the password changed since, so
+        ordinary logins don't pay for the check.
+        """
+        digest = self._pair_digest(username, password)
+        with self._lock:
+            failed = self._failed_pairs.get(digest)
+            if failed is None:
+                return False
+            if time.time() - failed[1] > self.window:
+                del self._failed_pairs[digest]
+                return False
+        try:
+            with self.engine.connect() as connection:
+                changed_at = connection.execute(
+                    sa.select(password_changes.c.changed_at).where(password_changes.c.key == failed[0])
+                ).scalar()
+        except Exception as e:
+            logger.error(f"Error reading password changes for login throttle: {e}")
+            return False  # Can't tell; let the password be checked
+        if changed_at is not None and changed_at >= failed[1]:
+            with self._lock:
+                self._failed_pairs.pop(digest, None)
+            return False
+        self.known_failures_rejected += 1
+        return True
+
+    def forget_failed_passwords(self, username):
+        """
+        Forget remembered failures for a user in every worker (called when their password changes).
+
+        This process's entries are dropped straight away; other workers see
+        the change time in the shared table and ignore entries from before it.
+        """
+        user_key = self._user_key(username)
+        with self._lock:
+            for digest in [digest for digest, failed in self._failed_pairs.items() if failed[0] == user_key]:
+                del self._failed_pairs[digest]
+        now = time.time()
+        try:
+            with self.engine.begin() as connection:
+                updated = connection.execute(
+                    password_changes.update().where(password_changes.c.key == user_key).values(changed_at=now)
+                ).rowcount
+                if not updated:
+                    connection.execute(password_changes.insert().values(key=user_key, changed_at=now))
+        except Exception as e:
+            logger.error(f"Error recording password change for {username}: {e}")
+
+    def record_failure(self, username, ip, password=None):
+        """
+        Count a failed login against the username and the client IP.
+
+        Args:
+            username: Username that was tried
+            ip: Client IP address
+            password: Password that was tried, to reject the same pair cheaply next time
+        """
+        now = time.time()
+        if password is not None:
+            digest = self._pair_digest(username, password)
+            with self._lock:
+                self._failed_pairs[digest] = (self._user_key(username), now)
+                self._failed_pairs.move_to_end(digest)
+                while len(self._failed_pairs) > self.max_keys:
+                    self._failed_pairs.popitem(last=False)
+        keys = self._keys(username, ip)
+        try:
+            with self.engine.begin() as connection:
+                rows = {row.key: row for row in connection.execute(
+                    sa.select(throttle_keys).where(throttle_keys.c.key.in_(keys))
+                )}
+                lockouts = 0
+                for key in keys:
+                    row = rows.get(key)
+                    failures = [t for t in json.loads(row.failures) if now - t < self.window] if row else []
+                    failures.append(now)
+                    locked_until = row.locked_until if row else 0
+                    key_lockouts = row.lockouts if row else 0
+                    if len(failures) >= self._limit(key):
+                        duration = min(self.lockout * self.backoff ** key_lockouts, self.max_lockout)
+                        locked_until = now + duration
+                        key_lockouts += 1
+                        failures = []
+                        lockouts += 1
+                        logger.warning(f"Login throttle locked {key} for {duration:.0f}s "
+                                       f"(lockout #{key_lockouts})")
+                    values = {'failures': json.dumps(failures), 'locked_until': locked_until,
+                              'lockouts': key_lockouts, 'last_failure': now}
+                    if row:
+                        connection.execute(throttle_keys.update().where(throttle_keys.c.key == key).values(values))
+                    else:
+                        connection.execute(throttle_keys.insert().values(key=key, **values))
+                if not connection.execute(throttle_totals.update().where(throttle_totals.c.id == 1).values(
+                        failures=throttle_totals.c.failures + 1,
+                        lockouts=throttle_totals.c.lockouts + lockouts)).rowcount:
+                    connection.execute(throttle_totals.insert().values(id=1, failures=1, lockouts=lockouts))
+                if now - self._last_sweep >= self.sweep_interval:
+                    self._last_sweep = now
+                    self._sweep(connection, now)
+        except Exception as e:
+            logger.error(f"Error recording failed login: {e}")
+
+    def record_success(self, username, ip):
+        """Clear the username's failures after a successful login (the IP's are kept)."""
+        keys = self._keys(username, None)
+        if not keys:
+            return
+        try:
+            with self.engine.connect() as connection:
+                tracked = connection.execute(
+                    sa.select(throttle_keys.c.key).where(throttle_keys.c.key.in_(keys))
+                ).first()
+            if tracked is None:
+                return  # Nothing to clear; skip the write transaction
+            with self.engine.begin() as connection:
+                connection.execute(throttle_keys.delete().where(throttle_keys.c.key.in_(keys)))
+        except Exception as e:
+            logger.error(f"Error clearing login throttle for {username}: {e}")
+
+    def unlock(self, username=None, ip=None):
+        """
+        Remove the failures and lockout for a username and/or IP.
+
+        Returns:
+            int: Number of keys removed
+        """
+        keys = ([self._user_key(username)] if username else []) + (['ip:' + ip] if ip else [])
+        with self.engine.begin() as connection:
+            removed = connection.execute(throttle_keys.delete().where(throttle_keys.c.key.in_(keys))).rowcount
+        if username:
+            self.forget_failed_passwords(username)
+        return removed
+
+    def reset(self):
+        """Forget every failure and lockout."""
+        with self.engine.begin() as connection:
+            connection.execute(throttle_keys.delete())
+            connection.execute(throttle_totals.delete())
+            connection.execute(password_changes.delete())
+        with self._lock:
+            self._failed_pairs.clear()
+
+    def stats(self):
+        """
+        Get throttle counters for monitoring.
+
+        Returns:
+            dict: Shared failure/lockout totals, keys currently locked, per-process check counters and settings
+        """
+        now = time.time()
+        locked = throttle_keys.c.locked_until > now
+        with self.engine.connect() as connection:
+            totals = connection.execute(sa.select(throttle_totals.c.failures, throttle_totals.c.lockouts)).first()
+            tracked, locked_users, locked_ips = connection.execute(sa.select(
+                sa.func.count(),
+                sa.func.coalesce(sa.func.sum(sa.case((locked & throttle_keys.c.key.like('user:%'), 1), else_=0)), 0),
+                sa.func.coalesce(sa.func.sum(sa.case((locked & throttle_keys.c.key.like('ip:%'), 1), else_=0)), 0)
+            ).select_from(throttle_keys)).one()
+        return {
+            'failures': totals.failures if totals else 0,
+            'lockouts': totals.lockouts if totals else 0,
+            'tracked_keys': tracked,
+            'locked_users': locked_users,
+            'locked_ips': locked_ips,
+            'checked': self.checked,
+            'rejected': self.rejected,
+            'known_failures_rejected': self.known_failures_rejected,
+            'window': self.window,
+            'user_limit': self.limits['user'],
+            'ip_limit': self.limits['ip'],
+            'shared': bool(self.state_file)
+        }
+
+# Throttle applied to POST /login
+login_throttle = LoginThrottle()
@@ -0,0 +1,104 @@
+# Password hashing policy and offloaded verification for Budget Tracker
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+# Hash policy in werkzeug's method syntax, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# Hashes computed at once per worker process; further logins wait their turn
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords on a small, bounded pool of threads.
+
+    hashlib's scrypt and PBKDF2 release the GIL, so hashes run in parallel
+    with each other and with the Python code of other requests. The pool
+    caps how many run at once, so a burst of logins can't take every CPU
+    from the rest of the worker. Under gevent the work goes to gevent's
+    native thread pool, so the hub keeps serving other greenlets while a
+    hash is computed.
+    """
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS):
+        self.method = method
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._prefix = None
+
+    def _gevent_threadpool(self):
+        """gevent's native thread pool if threading is monkey patched, else None."""
+        try:
+            from gevent import monkey, get_hub
+        except ImportError:
+            return None
+        if not monkey.is_module_patched('threading'):
+            return None
+        threadpool = get_hub().threadpool
+        threadpool.maxsize = self.workers
+        return threadpool
+
+    def _submit(self, function, *args):
+        """Run function(*args) on the pool and wait for its result."""
+        threadpool = self._gevent_threadpool()
+        if threadpool is not None:
+            return threadpool.spawn(function, *args).get()
+        # Executors don't survive fork(), so each worker process builds its own
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                    self._pid = os.getpid()
+        return self._executor.submit(function, *args).result()
+
+    def hash(self, password):
+        """
+        Hash a password with the current policy.
+
+        Returns:
+            str: Hash in werkzeug's 'method$salt$hash' format
+        """
+        return self._submit(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash several passwords in parallel (up to the pool size at a time)."""
+        threadpool = self._gevent_threadpool()
+        if threadpool is not None:
+            return [result.get() for result in [threadpool.spawn(generate_password_hash, password, self.method)
+                                                for password in passwords]]
+        self._submit(lambda: None)  # Make sure the executor exists in this process
+        return list(self._executor.map(lambda password: generate_password_hash(password, self.method), passwords))
+
+    def verify(self, stored_hash, password):
+        """
+        Check a password against a stored hash.
+
+        Returns:
+            bool: True if the password matches
+        """
+        if not stored_hash:
+            return False
+        return self._submit(check_password_hash, stored_hash, password)
+
+    @property
+    def current_prefix(self):
+        """The 'method:params' prefix hashes made with the current policy start with."""
+        if self._prefix is None:
+            # Werkzeug fills in default parameters, so read them back from a real hash
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, stored_hash):
+        """True if a stored hash was made with a different method or parameters than the current policy."""
+        return not stored_hash or stored_hash.split('$', 1)[0] != self.current_prefix
+
+# Shared hasher used by the User model
+password_hasher = PasswordHasher()
@@ -0,0 +1,123 @@
+# Account registration as a single unit of work for Budget Tracker
+
+import logging
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.utils.categories import DEFAULT_CATEGORIES, seed_categories
+
+logger = logging.getLogger(__name__)
+
+class RegistrationError(Exception):
+    """Raised when a new account can't be created."""
+
+class RegistrationConflict(RegistrationError):
+    """Raised when the username or email of a new account is already taken."""
+
+    def __init__(self, field):
+        self.field = field
+        super().__init__(f"{field} is already taken")
+
+def _insert_user_statement(dialect_name, table, values):
+    """INSERT ... ON CONFLICT DO NOTHING RETURNING id, or None if the dialect has no such upsert."""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(table).values(values).on_conflict_do_nothing().returning(table.c.id)
+
+def _taken_field(username, email):
+    """Tell which unique field made the insert conflict (only runs after a conflict)."""
+    # Import models here to avoid circular imports
+    from app.models import User
+    from app import db
+
+    if db.session.query(User.id).filter(User.username == username).first():
+        return 'username'
+    return 'email'
+
+def register_user(username, email, password, categories=DEFAULT_CATEGORIES):
+    """
+    Create an account and its default categories in one transaction.
+
+    The password is hashed before the transaction starts, so no database
+    connection is held while the hash runs. There is no separate lookup
+    to check whether the username exists: the user row goes in with
+    INSERT ... ON CONFLICT DO NOTHING, which returns no id if the username
+    or email is taken, even by a signup running at the same moment. The
+    categories are then inserted and everything is committed together, so
+    a failure leaves neither the user nor any categories behind. The
+    returned User is built from the inserted values and its new id, so it
+    isn't read back either.
+
+    Args:
+        username (str): Username for the new account
+        email (str): Email address for the new account
+        password (str): Plain password, hashed with the current policy
+        categories: Preset (name, category_type, color) set to seed
+
+    Returns:
+        User: The new account, attached to the session
+
+    Raises:
+        RegistrationConflict: The username or email is already taken
+        RegistrationError: Accounts can't be created right now (SQLite fallback in use)
+        SQLAlchemyError: The database failed; nothing was saved
+    """
+    # Import models here to avoid circular imports
+    from app.models import User
+    from app import db
+    from app.utils.database import is_using_fallback
+    from app.utils.passwords import password_hasher
+    from app.utils.login_throttle import login_throttle
+
+    # Usernames must stay unique in Supabase, which the fallback can't check
+    if is_using_fallback():
+        raise RegistrationError('Registration is unavailable while the database is unreachable')
+
+    values = {
+        'username': username,
+        'email': email,
+        'password_hash': password_hasher.hash(password),
+        'created_at': datetime.utcnow()
+    }
+    table = User.__table__
+    try:
+        statement = _insert_user_statement(db.session.get_bind(mapper=User).dialect.name, table, values)
+        if statement is not None:
+            user_id = db.session.execute(statement).scalar()
+        else:
+            # No ON CONFLICT: insert inside a savepoint and treat a unique violation as the conflict
+            try:
+                with db.session.begin_nested():
+                    user_id = db.session.execute(table.insert().values(values)).inserted_primary_key[0]
+            except IntegrityError:
+                user_id = None
+
+        if user_id is None:
+            field = _taken_field(username, email)
+            db.session.rollback()
+            logger.warning(f"Registration failed - {field} already taken for {username}")
+            raise RegistrationConflict(field)
+
+        seed_categories(user_id, categories)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Database error registering {username}: {e}")
+        raise
+
+    # The row holds exactly what was inserted, so attach it as a persistent object without a SELECT
+    user = User(id=user_id, **values)
+    make_transient_to_detached(user)
+    db.session.add(user)
+
+    # This worker may remember failed logins for the name from before it existed
+    login_throttle.forget_failed_passwords(username)
+    logger.info(f"User {username} registered with {len(categories)} categories")
+    return user
@@ -0,0 +1,185 @@
+# Daily and monthly per-category transaction totals for Budget Tracker
+
+import logging
+from decimal import Decimal
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Bucket sizes kept for every transaction
+ROLLUP_GRANULARITIES = ('day', 'month')
+
+def bucket_start(day, granularity):
+    """Return the first date of the bucket holding `day`."""
+    return day.replace(day=1) if granularity == 'month' else day
+
+def month_start(dialect_name, column):
+    """SQL expression for the first day of a date column's month."""
+    if dialect_name == 'postgresql':
+        return sa.cast(sa.func.date_trunc('month', column), sa.Date)
+    return sa.func.date(column, 'start of month')
+
+def _upsert_statement(dialect_name, table):
+    """INSERT ... ON CONFLICT that adds to an existing bucket, or None if the dialect has no upsert."""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={
+            'total': table.c.total + statement.excluded.total,
+            'transaction_count': table.c.transaction_count + statement.excluded.transaction_count
+        }
+    )
+
+def apply_rollup_deltas(deltas):
+    """
+    Add amount and count changes to the daily and monthly buckets.
+
+    Each bucket is adjusted with an atomic upsert (one statement for all
+    buckets), so concurrent requests can't lose each other's changes.
+    Buckets left with no transactions are removed. The caller is
+    responsible for committing the session.
+
+    Args:
+        deltas: Iterable of (user_id, category_id, transaction_type, date, amount delta, count delta)
+    """
+    # Import models here to avoid circular imports
+    from app.models import TransactionRollup
+    from app import db
+
+    # Combine the changes per bucket so each key appears once in the upsert
+    buckets = {}
+    for user_id, category_id, transaction_type, day, amount, count in deltas:
+        for granularity in ROLLUP_GRANULARITIES:
+            key = (user_id, granularity, bucket_start(day, granularity), category_id, transaction_type)
+            total, transaction_count = buckets.get(key, (Decimal(0), 0))
+            buckets[key] = (total + Decimal(str(amount)), transaction_count + count)
+    if not buckets:
+        return
+
+    db.session.flush()
+    table = TransactionRollup.__table__
+    rows = [
+        {'user_id': key[0], 'granularity': key[1], 'bucket_date': key[2], 'category_id': key[3],
+         'transaction_type': key[4], 'total': total, 'transaction_count': count}
+        for key, (total, count) in buckets.items()
+    ]
+    dialect_name = db.session.get_bind(mapper=TransactionRollup).dialect.name
+    upsert = _upsert_statement(dialect_name, table)
+    if upsert is not None:
+        db.session.execute(upsert, rows)
+    else:
+        # No upsert available: update existing buckets, insert the rest
+        for row in rows:
+            key = sa.and_(*(table.c[name] == row[name] for name in
+                            ('user_id', 'granularity', 'bucket_date', 'category_id', 'transaction_type')))
+            updated = db.session.execute(table.update().where(key).values(
+                total=table.c.total + row['total'],
+                transaction_count=table.c.transaction_count + row['transaction_count']
+            )).rowcount
+            if not updated:
+                db.session.execute(table.insert(), row)
+
+    # Drop buckets whose last transaction was deleted or moved away
+    user_ids = {key[0] for key in buckets}
+    db.session.execute(table.delete().where(
+        table.c.user_id.in_(user_ids), table.c.transaction_count <= 0
+    ))
+
+def rollup_delta_for(transaction, sign=1):
+    """
+    Build the apply_rollup_deltas() entry for adding (sign=1) or removing (sign=-1) a transaction.
+
+    Args:
+        transaction: Transaction object, or a dict with the same fields
+
+    Returns:
+        tuple: (user_id, category_id, transaction_type, date, amount delta, count delta)
+    """
+    get = transaction.get if isinstance(transaction, dict) else lambda name: getattr(transaction, name)
+    return (get('user_id'), get('category_id'), get('transaction_type'), get('date'),
+            sign * Decimal(str(get('amount'))), sign)
+
+def rebuild_user_rollups(user_id):
+    """
+    Recompute every bucket for one user from their transactions.
+
+    Uses one INSERT ... SELECT per granularity. The caller is responsible
+    for committing the session.
+
+    Args:
+        user_id: ID of the user
+    """
+    # Import models here to avoid circular imports
+    from app.models import Transaction, TransactionRollup
+    from app import db
+
+    db.session.flush()
+    table = TransactionRollup.__table__
+    dialect_name = db.session.get_bind(mapper=TransactionRollup).dialect.name
+    db.session.execute(table.delete().where(table.c.user_id == user_id))
+    for granularity, bucket in (('day', Transaction.date), ('month', month_start(dialect_name, Transaction.date))):
+        db.session.execute(table.insert().from_select(
+            ['user_id', 'granularity', 'bucket_date', 'category_id', 'transaction_type', 'total', 'transaction_count'],
+            sa.select(
+                Transaction.user_id, sa.literal(granularity), bucket, Transaction.category_id,
+                Transaction.transaction_type, sa.func.sum(Transaction.amount), sa.func.count(Transaction.id)
+            ).where(Transaction.user_id == user_id).group_by(
+                Transaction.user_id, bucket, Transaction.category_id, Transaction.transaction_type
+            )
+        ))
+
+def rebuild_all_rollups():
+    """
+    Recompute the buckets for every user (committing after each user).
+
+    Returns:
+        int: Number of users rebuilt
+    """
+    # Import models here to avoid circular imports
+    from app.models import User
+    from app import db
+
+    try:
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).all()]
+        for user_id in user_ids:
+            rebuild_user_rollups(user_id)
+            db.session.commit()
+        logger.info(f"Rebuilt rollups for {len(user_ids)} users")
+        return len(user_ids)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error rebuilding rollups: {e}")
+        raise
+
+def verify_user_rollups(user_id):
+    """
+    Compare a user's daily buckets against totals computed from transactions.
+
+    Returns:
+        list: Bucket keys (date, category_id, type) whose stored values are missing or wrong
+    """
+    # Import models here to avoid circular imports
+    from app.models import Transaction, TransactionRollup
+    from app import db
+
+    expected = {
+        (day, category_id, transaction_type): (Decimal(str(total)), count)
+        for day, category_id, transaction_type, total, count in db.session.query(
+            Transaction.date, Transaction.category_id, Transaction.transaction_type,
+            sa.func.sum(Transaction.amount), sa.func.count(Transaction.id)
+        ).filter(Transaction.user_id == user_id).group_by(
+            Transaction.date, Transaction.category_id, Transaction.transaction_type
+        )
+    }
+    stored = {
+        (row.bucket_date, row.category_id, row.transaction_type): (Decimal(str(row.total)), row.transaction_count)
+        for row in TransactionRollup.query.filter_by(user_id=user_id, granularity='day')
+    }
+    return sorted(key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
@@ -0,0 +1,378 @@
+# Server-side session storage for Budget Tracker
+
+import os
+import time
+import hashlib
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+
+import sqlalchemy as sa
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+try:
+    import msgpack
+except ImportError:  # Sessions are stored as compact JSON instead
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Where sessions live: 'cookie' (Flask's signed cookie), 'sqlite' or 'memory' (single worker only)
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cookie')
+# Seconds a server-side session stays valid without being used
+SESSION_LIFETIME = float(os.environ.get('SESSION_LIFETIME', 7 * 24 * 3600))
+# Database for the 'sqlite' backend (relative SQLite paths go in the instance folder)
+SESSION_DATABASE_URL = os.environ.get('SESSION_DATABASE_URL', 'sqlite:///sessions.db')
+# Most sessions the 'memory' backend keeps; the least recently used are dropped first
+SESSION_MEMORY_SIZE = int(os.environ.get('SESSION_MEMORY_SIZE', 10000))
+# Seconds between sweeps of expired sessions (per worker)
+SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', 300))
+
+_tagged_json = TaggedJSONSerializer()
+
+def dumps(data):
+    """
+    Serialise session data to bytes.
+
+    Uses MessagePack when it is installed and the data fits it, and
+    Flask's tagged JSON (which also handles tuples, Markup and dates)
+    otherwise. The first byte records which one was used.
+    """
+    if msgpack is not None:
+        try:
+            return b'm' + msgpack.packb(data, use_bin_type=True)
+        except TypeError:
+            pass
+    return b'j' + _tagged_json.dumps(data).encode('utf-8')
+
+def loads(blob):
+    """Deserialise session data written by dumps()."""
+    if blob[:1] == b'm':
+        if msgpack is None:
+            raise ValueError('session was stored with msgpack, which is not installed')
+        return msgpack.unpackb(blob[1:], raw=False)
+    return _tagged_json.loads(blob[1:].decode('utf-8'))
+
+class MemorySessionStore:
+    """
+    Keeps sessions in an LRU dictionary in this process.
+
+    Only suitable for a single worker process (e.g. local development):
+    other workers can't see these sessions.
+    """
+
+    def __init__(self, maxsize=SESSION_MEMORY_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        data, expires_at, user_id = self._entries.pop(key)
+        if user_id is not None:
+            keys = self._users.get(user_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._users[user_id]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(self, key, data, expires_at, user_id=None):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (data, expires_at, user_id)
+            if user_id is not None:
+                self._users.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            keys = list(self._users.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def sweep(self, now):
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[1] <= now]
+            for key in expired:
+                self._remove(key)
+            return len(expired)
+
+    def count(self):
+        return len(self._entries)
+
+session_metadata = sa.MetaData()
+server_sessions = sa.Table(
+    'server_sessions', session_metadata,
+    sa.Column('key', sa.String(64), primary_key=True),  # SHA-256 of the session id in the cookie
+    sa.Column('user_id', sa.Integer, index=True),
+    sa.Column('data', sa.LargeBinary, nullable=False),
+    sa.Column('expires_at', sa.Float, nullable=False, index=True)
+)
+
+class SQLSessionStore:
+    """
+    Keeps sessions in a table shared by every worker using the same database.
+
+    The default is a SQLite file in the instance folder, opened in WAL mode
+    so workers can read sessions while another one writes.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self._engine = None
+        self._engine_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        """Engine for this process, created (with its table) on first use."""
+        if self._engine is None or self._engine_pid != os.getpid():
+            with self._lock:
+                if self._engine is None or self._engine_pid != os.getpid():
+                    engine = sa.create_engine(self.url)
+                    if engine.dialect.name == 'sqlite':
+                        @sa.event.listens_for(engine, 'connect')
+                        def set_sqlite_pragmas(connection, record):
+                            cursor = connection.cursor()
+                            cursor.execute('PRAGMA journal_mode=WAL')
+                            cursor.execute('PRAGMA synchronous=NORMAL')
+                            cursor.close()
+                    session_metadata.create_all(engine)
+                    self._engine = engine
+                    self._engine_pid = os.getpid()
+        return self._engine
+
+    def get(self, key):
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                sa.select(server_sessions.c.data, server_sessions.c.expires_at).where(server_sessions.c.key == key)
+            ).first()
+        return (row.data, row.expires_at) if row else None
+
+    def put(self, key, data, expires_at, user_id=None):
+        values = {'key': key, 'user_id': user_id, 'data': data, 'expires_at': expires_at}
+        dialect_name = self.engine.dialect.name
+        if dialect_name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect_name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+        with self.engine.begin() as connection:
+            if insert is not None:
+                statement = insert(server_sessions).values(values)
+                connection.execute(statement.on_conflict_do_update(
+                    index_elements=['key'],
+                    set_={name: statement.excluded[name] for name in ('user_id', 'data', 'expires_at')}
+                ))
+            elif not connection.execute(server_sessions.update().where(
+                    server_sessions.c.key == key).values(values)).rowcount:
+                connection.execute(server_sessions.insert().values(values))
+
+    def delete(self, key):
+        with self.engine.begin() as connection:
+            connection.execute(server_sessions.delete().where(server_sessions.c.key == key))
+
+    def delete_user(self, user_id):
+        with self.engine.begin() as connection:
+            return connection.execute(server_sessions.delete().where(server_sessions.c.user_id == user_id)).rowcount
+
+    def sweep(self, now):
+        with self.engine.begin() as connection:
+            return connection.execute(server_sessions.delete().where(server_sessions.c.expires_at <= now)).rowcount
+
+    def count(self):
+        with self.engine.connect() as connection:
+            return connection.execute(sa.select(sa.func.count()).select_from(server_sessions)).scalar()
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data is kept in a store; the cookie only carries its random id."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.previous_sid = None
+        self.modified = False
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface that stores session data server-side.
+
+    The cookie holds a random 256-bit session id; the store is keyed by
+    its SHA-256, so a leaked store can't be used to take over sessions.
+    Sessions expire `lifetime` seconds after they were last saved; an
+    unchanged session is saved again (extending it) once half of its
+    lifetime has passed, so most requests don't write at all. Expired
+    sessions are swept every `sweep_interval` seconds.
+    """
+
+    def __init__(self, store, lifetime=SESSION_LIFETIME, sweep_interval=SESSION_SWEEP_INTERVAL):
+        self.store = store
+        self.lifetime = lifetime
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+        self.swept = 0
+
+    @staticmethod
+    def _key(sid):
+        return hashlib.sha256(sid.encode('utf-8')).hexdigest()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            try:
+                found = self.store.get(self._key(sid))
+                if found and found[1] > time.time():
+                    return ServerSideSession(loads(found[0]), sid=sid, expires_at=found[1])
+            except Exception as e:
+                logger.error(f"Error loading session: {e}")
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        try:
+            if session.previous_sid:
+                self.store.delete(self._key(session.previous_sid))
+
+            # Emptied session (e.g. logout): drop it and its cookie
+            if not session:
+                if session.sid:
+                    self.store.delete(self._key(session.sid))
+                    response.delete_cookie(name, domain=domain, path=path,
+                                           secure=self.get_cookie_secure(app),
+                                           samesite=self.get_cookie_samesite(app),
+                                           httponly=self.get_cookie_httponly(app))
+                return
+
+            now = time.time()
+            if not (session.modified or session.sid is None or session.previous_sid
+                    or session.expires_at - now < self.lifetime / 2):
+                return
+            if session.sid is None:
+                session.sid = secrets.token_urlsafe(32)
+            user_id = session.get('user_id')
+            self.store.put(self._key(session.sid), dumps(dict(session)), now + self.lifetime,
+                           user_id if isinstance(user_id, int) else None)
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+            self._maybe_sweep(now)
+        except Exception as e:
+            logger.error(f"Error saving session: {e}")
+
+    def _maybe_sweep(self, now):
+        """Delete expired sessions if the sweep interval has passed."""
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        self.swept += self.sweep(now)
+
+    def sweep(self, now=None):
+        """
+        Delete expired sessions.
+
+        Returns:
+            int: Number of sessions deleted
+        """
+        try:
+            return self.store.sweep(now if now is not None else time.time())
+        except Exception as e:
+            logger.error(f"Error sweeping expired sessions: {e}")
+            return 0
+
+def init_app(app):
+    """Install the server-side session interface selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == 'cookie':
+        return
+    if SESSION_BACKEND == 'memory':
+        store = MemorySessionStore()
+    elif SESSION_BACKEND == 'sqlite':
+        url = sa.engine.make_url(SESSION_DATABASE_URL)
+        if url.drivername.startswith('sqlite') and url.database and not os.path.isabs(url.database):
+            os.makedirs(app.instance_path, exist_ok=True)
+            url = url.set(database=os.path.join(app.instance_path, url.database))
+        store = SQLSessionStore(url)
+    else:
+        logger.error(f"Unknown SESSION_BACKEND '{SESSION_BACKEND}' - using cookie sessions")
+        return
+    app.session_interface = ServerSideSessionInterface(store)
+
+def regenerate_session_id(session):
+    """
+    Give the session a new id (call on login, so an id set before login can't be reused).
+
+    Does nothing with cookie sessions, whose content is the whole session.
+    """
+    if isinstance(session, ServerSideSession) and session.sid:
+        session.previous_sid = session.previous_sid or session.sid
+        session.sid = None
+        session.modified = True
+
+def revoke_user_sessions(user_id):
+    """
+    Log a user out everywhere by deleting their server-side sessions.
+
+    Cookie sessions can't be revoked this way, so nothing is deleted
+    when SESSION_BACKEND is 'cookie'.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        int: Number of sessions deleted
+    """
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSideSessionInterface):
+        return 0
+    try:
+        count = interface.store.delete_user(user_id)
+        logger.info(f"Revoked {count} sessions of user {user_id}")
+        return count
+    except Exception as e:
+        logger.error(f"Error revoking sessions of user {user_id}: {e}")
+        return 0
+
+def session_stats():
+    """
+    Get session storage figures for monitoring.
+
+    Returns:
+        dict: backend, stored sessions and sessions swept by this worker
+    """
+    interface = current_app.session_interface
+    if not isinstance(interface, ServerSideSessionInterface):
+        return {'backend': 'cookie'}
+    return {
+        'backend': SESSION_BACKEND,
+        'sessions': interface.store.count(),
+        'swept': interface.swept,
+        'serializer': 'msgpack' if msgpack is not None else 'json'
+    }
@@ -0,0 +1,152 @@
+# System-wide statistics for the Budget Tracker admin dashboard
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# Seconds a computed result is reused by this process
+SYSTEM_STATS_TTL = float(os.environ.get('SYSTEM_STATS_TTL', 30))
+# Seconds between refreshes of the system_stats table (0 = compute live on every cache miss)
+SYSTEM_STATS_REFRESH_INTERVAL = float(os.environ.get('SYSTEM_STATS_REFRESH_INTERVAL', 0))
+
+# Values shown when the database can't be reached
+EMPTY_STATS = {
+    'total_users': 0,
+    'total_categories': 0,
+    'total_transactions': 0,
+    'total_income': Decimal(0),
+    'total_expense': Decimal(0),
+    'refreshed_at': None
+}
+
+_cache_lock = threading.Lock()
+_cached = {'stats': None, 'expires': 0.0}
+
+def compute_system_stats():
+    """
+    Compute the dashboard totals with one aggregate query.
+
+    Income, expense and transaction totals are summed from user_summaries
+    (one row per user, kept up to date by every transaction write), and
+    the user and category counts are scalar subqueries, so the dashboard
+    costs a single round-trip and never scans the transactions table.
+    Users created before user_summaries existed get their row built the
+    first time they are found missing.
+
+    Returns:
+        dict: total_users, total_categories, total_transactions, total_income,
+        total_expense and refreshed_at
+    """
+    # Import models here to avoid circular imports
+    from app.models import User, Category, UserSummary
+    from app import db
+
+    total_users = db.select(db.func.count(User.id)).scalar_subquery()
+    total_categories = db.select(db.func.count(Category.id)).scalar_subquery()
+    query = db.select(
+        total_users, total_categories, db.func.count(UserSummary.user_id),
+        db.func.coalesce(db.func.sum(UserSummary.transaction_count), 0),
+        db.func.coalesce(db.func.sum(UserSummary.total_income), 0),
+        db.func.coalesce(db.func.sum(UserSummary.total_expense), 0)
+    ).select_from(UserSummary)
+    row = db.session.execute(query).one()
+    if row[2] < row[0]:
+        _build_missing_summaries()
+        row = db.session.execute(query).one()
+    return {
+        'total_users': row[0],
+        'total_categories': row[1],
+        'total_transactions': row[3],
+        'total_income': Decimal(str(row[4])),
+        'total_expense': Decimal(str(row[5])),
+        'refreshed_at': datetime.utcnow()
+    }
+
+def _build_missing_summaries():
+    """Build user_summaries rows for users that don't have one yet."""
+    # Import models here to avoid circular imports
+    from app.models import User, UserSummary
+    from app import db
+    from app.utils.database import rebuild_user_summary
+
+    missing = db.session.execute(
+        db.select(User.id).outerjoin(UserSummary, UserSummary.user_id == User.id).where(UserSummary.user_id.is_(None))
+    ).scalars().all()
+    for user_id in missing:
+        rebuild_user_summary(user_id)
+    db.session.commit()
+    logger.info(f"Built missing running totals for {len(missing)} users")
+
+def refresh_system_stats():
+    """
+    Recompute the totals and store them in the system_stats table.
+
+    Returns:
+        dict: The stored totals
+    """
+    # Import models here to avoid circular imports
+    from app.models import SystemStats
+    from app import db
+
+    try:
+        stats = compute_system_stats()
+        row = db.session.get(SystemStats, 1)
+        if row is None:
+            row = SystemStats(id=1)
+            db.session.add(row)
+        for key, value in stats.items():
+            setattr(row, key, value)
+        db.session.commit()
+        logger.debug("Refreshed system_stats table")
+        return stats
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error refreshing system stats: {e}")
+        raise
+
+def _load_system_stats():
+    """Read the stored totals, or compute them live if the table isn't in use yet."""
+    # Import models here to avoid circular imports
+    from app.models import SystemStats
+    from app import db
+
+    if SYSTEM_STATS_REFRESH_INTERVAL > 0:
+        row = db.session.get(SystemStats, 1)
+        if row is not None:
+            return row.to_dict()
+    return compute_system_stats()
+
+def get_system_stats():
+    """
+    Get the dashboard totals, reusing a recent result.
+
+    Results are cached in this process for SYSTEM_STATS_TTL seconds. On a
+    miss they come from the system_stats table when it is refreshed in the
+    background (SYSTEM_STATS_REFRESH_INTERVAL > 0), otherwise from the live
+    aggregate query.
+
+    Returns:
+        dict: total_users, total_categories, total_transactions, total_income,
+        total_expense and refreshed_at (zeros if the database is unavailable)
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        if _cached['stats'] is not None and now < _cached['expires']:
+            return _cached['stats']
+    try:
+        stats = _load_system_stats()
+    except Exception as e:
+        # Import db here to avoid circular imports
+        from app import db
+        db.session.rollback()
+        logger.error(f"Error getting system stats: {e}")
+        return dict(EMPTY_STATS)
+    with _cache_lock:
+        _cached['stats'] = stats
+        _cached['expires'] = now + SYSTEM_STATS_TTL
+    return stats
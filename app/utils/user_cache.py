@@ -0,0 +1,183 @@
+# Cached lookups of the logged-in user for Budget Tracker
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+# Cache settings (seconds an entry stays valid, and how many users to keep per process)
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+
+class CachedUser:
+    """
+    Read-only snapshot of a User row.
+
+    The snapshot holds only plain values, so it can be shared across
+    requests and threads without being tied to a database session. It
+    exposes the same fields as the User model plus the attributes
+    Flask-Login expects from a user object.
+    """
+    __slots__ = ('id', 'username', 'email', 'created_at')
+
+    def __init__(self, id, username, email, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+
+    @classmethod
+    def from_user(cls, user):
+        """Build a snapshot from a User model instance."""
+        return cls(user.id, user.username, user.email, user.created_at)
+
+    @property
+    def is_admin(self):
+        """True if this is the admin account."""
+        return self.username == 'admin'
+
+    # Flask-Login user interface
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def get_id(self):
+        return str(self.id)
+
+    def to_dict(self):
+        """Convert snapshot to dictionary for JSON serialization."""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+class UserCache:
+    """
+    Thread-safe LRU cache of CachedUser snapshots with a time-to-live.
+
+    Entries expire after `ttl` seconds so changes made by other worker
+    processes are picked up within that window; changes made in this
+    process are applied immediately through invalidate().
+    """
+
+    def __init__(self, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """Return the cached snapshot for user_id, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return user
+
+    def set(self, user_id, user):
+        """Store a snapshot, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[user_id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Drop the snapshot for one user."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every snapshot."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current size for monitoring."""
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'maxsize': self.maxsize, 'ttl': self.ttl}
+
+# Process-wide cache shared by all requests in this worker
+user_cache = UserCache()
+
+def _request_memo():
+    """Return the per-request user memo stored on flask.g, or None outside a request."""
+    if not has_request_context():
+        return None
+    if '_cached_users' not in g:
+        g._cached_users = {}
+    return g._cached_users
+
+def get_cached_user(user_id):
+    """
+    Get a snapshot of a user, hitting the database only on a cache miss.
+
+    Lookups are memoised for the rest of the request on flask.g and kept
+    in the process-wide TTL/LRU cache for later requests.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        CachedUser or None: Snapshot of the user, or None if the user doesn't exist
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    memo = _request_memo()
+    if memo is not None and user_id in memo:
+        return memo[user_id]
+
+    user = user_cache.get(user_id)
+    if user is None:
+        # Import models here to avoid circular imports
+        from app.models import User
+        from app import db
+
+        row = db.session.get(User, user_id)
+        if row is not None:
+            user = CachedUser.from_user(row)
+            user_cache.set(user_id, user)
+
+    if memo is not None:
+        memo[user_id] = user
+    return user
+
+def invalidate_user(user_id):
+    """
+    Forget any cached snapshot of a user after it changes or is deleted.
+
+    Args:
+        user_id: ID of the user
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return
+    user_cache.invalidate(user_id)
+    memo = _request_memo()
+    if memo is not None:
+        memo.pop(user_id, None)
+    logger.debug(f"Invalidated cached user {user_id}")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Index Benchmark for Budge-IT App
+
+This script seeds a throwaway database, then runs the app's hot queries
+without and with the indexes declared on the models, printing each
+query plan and its median latency.
+
+Uses BENCH_DATABASE_URL if set (point it at an empty Postgres database),
+otherwise a temporary SQLite file.
+
+Usage:
+    python benchmark_indexes.py [users] [transactions_per_user]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import statistics
+from datetime import date, timedelta
+
+import sqlalchemy as sa
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app.models import User, Category, Transaction
+
+REPEATS = 50
+
+users = User.__table__
+categories = Category.__table__
+transactions = Transaction.__table__
+INDEXES = list(categories.indexes) + list(transactions.indexes)
+
+def seed(engine, user_count, per_user):
+    """Create the tables and fill them with random users, categories and transactions."""
+    users.metadata.create_all(engine, tables=[users, categories, transactions])
+    random.seed(42)
+    start = date.today() - timedelta(days=730)
+    with engine.begin() as connection:
+        connection.execute(users.insert(), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'}
+            for i in range(1, user_count + 1)
+        ])
+        category_rows = []
+        for user_id in range(1, user_count + 1):
+            for n, category_type in enumerate(['income', 'income', 'expense', 'expense', 'expense', 'expense']):
+                category_rows.append({'id': len(category_rows) + 1, 'user_id': user_id, 'name': f'Category {n}',
+                                      'category_type': category_type, 'color': '#000000'})
+        connection.execute(categories.insert(), category_rows)
+        batch = []
+        for user_id in range(1, user_count + 1):
+            user_categories = category_rows[(user_id - 1) * 6:user_id * 6]
+            for _ in range(per_user):
+                category = random.choice(user_categories)
+                batch.append({'user_id': user_id, 'category_id': category['id'],
+                              'amount': round(random.uniform(1, 500), 2),
+                              'transaction_type': category['category_type'],
+                              'date': start + timedelta(days=random.randrange(730)),
+                              'item_name': 'Item'})
+                if len(batch) == 5000:
+                    connection.execute(transactions.insert(), batch)
+                    batch = []
+        if batch:
+            connection.execute(transactions.insert(), batch)
+
+def hot_queries(user_id, category_id):
+    """The per-user queries behind history, charts, totals and category pages."""
+    month_start = date.today() - timedelta(days=30)
+    return {
+        'history page': sa.select(transactions).where(transactions.c.user_id == user_id)
+            .order_by(transactions.c.date.desc(), transactions.c.id.desc()).limit(51),
+        'date range totals': sa.select(sa.func.sum(transactions.c.amount)).where(
+            transactions.c.user_id == user_id, transactions.c.date >= month_start),
+        'expense chart': sa.select(transactions.c.category_id, sa.func.sum(transactions.c.amount)).where(
+            transactions.c.user_id == user_id, transactions.c.transaction_type == 'expense',
+            transactions.c.date >= month_start).group_by(transactions.c.category_id),
+        'categories by type': sa.select(categories).where(
+            categories.c.user_id == user_id, categories.c.category_type == 'expense'),
+        'category transactions': sa.select(sa.func.count()).where(transactions.c.category_id == category_id),
+    }
+
+def explain(connection, query):
+    """Return the database's plan for a query as text."""
+    sql = str(query.compile(connection, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = connection.exec_driver_sql(prefix + sql).all()
+    return '\n'.join(f"      {row[-1]}" for row in rows)
+
+def run(engine, label, user_count):
+    """Time every hot query and print its plan."""
+    print(f"\n{label}")
+    print("-" * 50)
+    with engine.connect() as connection:
+        # Fresh planner statistics for both runs
+        connection.exec_driver_sql('ANALYZE')
+        user_id = user_count // 2
+        for name, query in hot_queries(user_id, user_id * 6).items():
+            timings = []
+            for _ in range(REPEATS):
+                started = time.perf_counter()
+                connection.execute(query).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"   ⏱️ {name}: {statistics.median(timings):.3f} ms (median of {REPEATS})")
+            print(explain(connection, query))
+
+def main():
+    """Seed, benchmark without indexes, create them and benchmark again."""
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    url = os.environ.get('BENCH_DATABASE_URL') or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='budge-it-bench-'), 'bench.db')}"
+    engine = sa.create_engine(url)
+
+    print("🔍 Budge-IT Index Benchmark")
+    print("=" * 50)
+    print(f"🗄️ Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"🌱 Seeding {user_count} users x {per_user} transactions...")
+    seed(engine, user_count, per_user)
+    for index in INDEXES:
+        index.drop(engine, checkfirst=True)
+
+    run(engine, "1️⃣ Without indexes", user_count)
+    for index in INDEXES:
+        index.create(engine)
+    run(engine, f"2️⃣ With indexes ({', '.join(index.name for index in INDEXES)})", user_count)
+
+    if not os.environ.get('BENCH_DATABASE_URL'):
+        os.remove(engine.url.database)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Login Throughput Benchmark for Budge-IT App
+
+This script creates throwaway users in a temporary SQLite database and
+fires concurrent POST /login requests through the Flask test client,
+printing logins per second and latency percentiles for each hashing
+policy and pool size. It also reports how long one unrelated request
+takes while the login burst is running.
+
+Usage:
+    python benchmark_login.py [logins] [concurrency] [method ...]
+
+Example:
+    python benchmark_login.py 64 8 scrypt:32768:8:1 pbkdf2:sha256:600000
+"""
+
+import os
+import sys
+import time
+import tempfile
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Point the app at a throwaway database before it is imported
+BENCH_DATABASE = os.path.join(tempfile.mkdtemp(prefix='budge-it-login-'), 'bench.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{BENCH_DATABASE}"
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import User
+from app.migrations import upgrade
+from app.utils.passwords import password_hasher
+
+USERS = 16
+
+def seed(app):
+    """Create the benchmark users with the current policy."""
+    with app.app_context():
+        upgrade(db.engine)
+        User.query.delete()
+        hashes = password_hasher.hash_many([f'password{i}' for i in range(USERS)])
+        for i, password_hash in enumerate(hashes):
+            db.session.add(User(username=f'bench{i}', email=f'bench{i}@example.com', password_hash=password_hash))
+        db.session.commit()
+
+def login(app, n):
+    """POST one login and return its latency in ms."""
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.post('/login', data={'username': f'bench{n % USERS}', 'password': f'password{n % USERS}'})
+    elapsed = (time.perf_counter() - started) * 1000
+    if response.status_code != 302:
+        raise RuntimeError(f"Login failed with status {response.status_code}")
+    return elapsed
+
+def probe(app, stop, timings):
+    """Time a cheap page repeatedly while logins are running."""
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get('/about')
+        timings.append((time.perf_counter() - started) * 1000)
+
+def run(app, logins, concurrency):
+    """Run one burst of logins and print its numbers."""
+    stop = threading.Event()
+    probe_timings = []
+    prober = threading.Thread(target=probe, args=(app, stop, probe_timings), daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(lambda n: login(app, n), range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"   ⏱️ {logins / elapsed:.1f} logins/s | median {statistics.median(latencies):.0f} ms | p95 {p95:.0f} ms")
+    if probe_timings:
+        print(f"   📄 Other requests during the burst: median {statistics.median(probe_timings):.1f} ms "
+              f"({len(probe_timings)} served)")
+
+def main():
+    """Benchmark every requested policy at a few pool sizes."""
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    methods = sys.argv[3:] or [password_hasher.method]
+    app = create_app()
+
+    print("🔐 Budge-IT Login Throughput Benchmark")
+    print("=" * 50)
+    print(f"👥 {logins} logins, {concurrency} at a time, {os.cpu_count()} CPUs")
+    for method in methods:
+        password_hasher.method = method
+        password_hasher._prefix = None
+        seed(app)
+        for workers in sorted({1, max(1, (os.cpu_count() or 1) // 2), os.cpu_count() or 1}):
+            password_hasher.workers = workers
+            password_hasher._executor = None
+            print(f"\n🧂 {method} with {workers} hashing thread{'s' if workers != 1 else ''}")
+            print("-" * 50)
+            run(app, logins, concurrency)
+
+    if os.path.exists(BENCH_DATABASE):
+        os.remove(BENCH_DATABASE)
+
+if __name__ == "__main__":
+    main()
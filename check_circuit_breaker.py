@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker Outage Check for Budge-IT App
+
+This script simulates a database outage against a throwaway SQLite file
+standing in for Postgres and walks the database circuit breaker through
+it: the breaker must open after the configured number of failures, turn
+requests away without touching the database while open (in this process
+and in a forked "worker" sharing its state file), re-open with a longer
+timeout when a half-open probe fails, and close again once a probe
+succeeds. It also checks that a damaged state file reads as a closed
+breaker.
+
+Usage:
+    python check_circuit_breaker.py [failure threshold]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.utils.circuit_breaker import CircuitBreaker, FileStateStore, CLOSED, OPEN, HALF_OPEN
+
+RECOVERY_TIMEOUT = 0.5
+
+class StandInDatabase:
+    """SQLite file that can be taken down by moving its directory away."""
+
+    def __init__(self, root):
+        self.directory = os.path.join(root, 'db')
+        self.offline = os.path.join(root, 'db-offline')
+        os.mkdir(self.directory)
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directory, 'stand-in.db')}?mode=rw",
+                                    poolclass=NullPool)
+        with self.engine.begin() as connection:
+            connection.execute(text('CREATE TABLE IF NOT EXISTS probe (id INTEGER)'))
+        self.attempts = 0
+
+    def query(self):
+        self.attempts += 1
+        with self.engine.connect() as connection:
+            connection.execute(text('SELECT COUNT(*) FROM probe')).scalar()
+
+    def stop(self):
+        os.rename(self.directory, self.offline)
+
+    def start(self):
+        os.rename(self.offline, self.directory)
+
+def guarded_query(breaker, database):
+    """Run one query the way the app does. Returns 'ok', 'failed' or 'shed'."""
+    if not breaker.allow_request():
+        return 'shed'
+    try:
+        database.query()
+    except Exception as e:
+        breaker.record_failure(e)
+        return 'failed'
+    breaker.record_success()
+    return 'ok'
+
+def state_in_forked_worker(state_file, threshold):
+    """Return what a separate process sharing the state file sees."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        worker = CircuitBreaker(name='worker', failure_threshold=threshold,
+                                recovery_timeout=RECOVERY_TIMEOUT, state_file=state_file)
+        os.write(write_fd, f"{worker.state},{worker.allow_request()}".encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        state, allowed = pipe.read().split(',')
+    os.waitpid(pid, 0)
+    return state, allowed == 'True'
+
+def main():
+    """Take the stand-in database down and up again and check each breaker transition."""
+    threshold = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    root = tempfile.mkdtemp(prefix='budge-it-breaker-')
+    state_file = os.path.join(root, 'breaker.json')
+    database = StandInDatabase(root)
+    breaker = CircuitBreaker(name='check', failure_threshold=threshold, recovery_timeout=RECOVERY_TIMEOUT,
+                             max_recovery_timeout=RECOVERY_TIMEOUT * 4, backoff=2, state_file=state_file)
+    failures = []
+
+    def expect(condition, message):
+        if not condition:
+            failures.append(message)
+
+    print("🔍 Budge-IT Circuit Breaker Outage Check")
+    print("=" * 50)
+    expect(isinstance(breaker.store, FileStateStore), 'breaker state is not shared through a file')
+
+    # 1. Healthy database: queries go through and the breaker stays closed
+    results = [guarded_query(breaker, database) for _ in range(5)]
+    print(f"1️⃣ Database up: {results.count('ok')}/5 ok, breaker {breaker.state}")
+    expect(results == ['ok'] * 5 and breaker.state == CLOSED, 'healthy queries did not all pass')
+
+    # 2. Outage: the breaker opens after exactly `threshold` failures
+    database.stop()
+    results = [guarded_query(breaker, database) for _ in range(threshold)]
+    print(f"2️⃣ Database down: {results.count('failed')} failures, breaker {breaker.state}")
+    expect(results == ['failed'] * threshold, 'queries against the stopped database did not fail')
+    expect(breaker.state == OPEN, f'breaker did not open after {threshold} failures')
+
+    # 3. While open, requests are shed without reaching the database, here and in other workers
+    attempts = database.attempts
+    results = [guarded_query(breaker, database) for _ in range(20)]
+    worker_state, worker_allowed = state_in_forked_worker(state_file, threshold)
+    print(f"3️⃣ While open: {results.count('shed')}/20 shed, {database.attempts - attempts} reached the database; "
+          f"forked worker sees {worker_state}")
+    expect(results == ['shed'] * 20 and database.attempts == attempts, 'open breaker let requests through')
+    expect(breaker.stats()['rejected'] == 20, 'shed requests were not counted')
+    expect(worker_state == OPEN and not worker_allowed, 'another worker did not see the open breaker')
+
+    # 4. Half-open probe while still down: re-opens with a longer timeout
+    first_timeout = breaker.stats()['open_timeout']
+    time.sleep(RECOVERY_TIMEOUT + 0.1)
+    result = guarded_query(breaker, database)
+    second_timeout = breaker.stats()['open_timeout']
+    print(f"4️⃣ Probe while down: {result}, breaker {breaker.state}, timeout {first_timeout}s -> {second_timeout}s")
+    expect(result == 'failed' and breaker.state == OPEN, 'failed probe did not re-open the breaker')
+    expect(second_timeout == first_timeout * 2, 'open timeout did not back off')
+
+    # 5. Database back: the next probe after the timeout closes the breaker
+    database.start()
+    time.sleep(second_timeout + 0.1)
+    allowed = breaker.allow_request()
+    probing = breaker.state
+    result = 'ok' if allowed else 'shed'
+    if allowed:
+        database.query()
+        breaker.record_success()
+    stats = breaker.stats()
+    print(f"5️⃣ Database up again: probe {result} ({probing}), breaker {stats['state']}, "
+          f"trips {stats['trips']}, recoveries {stats['recoveries']}")
+    expect(allowed and probing == HALF_OPEN, 'breaker did not go half-open after its timeout')
+    expect(stats['state'] == CLOSED and stats['failures'] == 0, 'successful probe did not close the breaker')
+    expect(stats['open_timeout'] == RECOVERY_TIMEOUT, 'open timeout was not reset after recovery')
+    expect(stats['trips'] == 2 and stats['recoveries'] == 1, 'trip/recovery counters are wrong')
+    expect(guarded_query(breaker, database) == 'ok', 'query after recovery failed')
+
+    # 6. A damaged state file reads as a closed breaker instead of raising
+    with open(state_file, 'w') as handle:
+        handle.write('{not json')
+    damaged_state = breaker.state
+    print(f"6️⃣ Damaged state file: breaker {damaged_state}")
+    expect(damaged_state == CLOSED, 'damaged state file was not treated as closed')
+
+    shutil.rmtree(root)
+
+    print("=" * 50)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Breaker opened, shed load, backed off and recovered as expected")
+
+if __name__ == "__main__":
+    main()
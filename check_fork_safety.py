@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Fork Safety Check for Budge-IT App
+
+This script loads the app the way gunicorn does with preload_app=True,
+forks several workers and checks that no worker reuses a database
+connection opened before the fork.
+
+Runs against DATABASE_URL if it points at Postgres (each connection is
+identified by its server backend pid), otherwise against a throwaway
+SQLite database (each connection is identified by the pid of the process
+that opened it and its file descriptor).
+
+Usage:
+    python check_fork_safety.py [workers]
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+def track_sqlite_connections(engine, database_path):
+    """Record which process opened each SQLite connection and the file descriptor it got.
+
+    Forked children share the parent's address space layout, so object ids
+    can't tell an inherited connection from a fresh one; the opening pid and
+    the descriptor of the database file can.
+    """
+    from sqlalchemy import event
+
+    def on_connect(dbapi_connection, connection_record):
+        # The connection just opened the file, so it holds the newest descriptor on it
+        fds = [int(fd) for fd in os.listdir('/proc/self/fd') if _fd_target(fd) == database_path]
+        connection_record.info['identity'] = f"{os.getpid()}/fd{max(fds) if fds else '?'}"
+
+    event.listen(engine, 'connect', on_connect)
+
+def _fd_target(fd):
+    try:
+        return os.readlink(f'/proc/self/fd/{fd}')
+    except OSError:
+        return None
+
+def connection_identity(db):
+    """Return something that identifies the connection a query actually used."""
+    with db.engine.connect() as connection:
+        if db.engine.dialect.name == 'postgresql':
+            return connection.exec_driver_sql('SELECT pg_backend_pid()').scalar()
+        connection.exec_driver_sql('SELECT 1')
+        return connection.connection.info['identity']
+
+def run_worker(app, db, write_fd):
+    """Body of one forked worker: do what gunicorn's post_fork hook does, then query."""
+    from app.utils.database import dispose_engines_after_fork
+    dispose_engines_after_fork(app)
+    with app.app_context():
+        identity = connection_identity(db)
+    os.write(write_fd, json.dumps({'pid': os.getpid(), 'connection': identity}).encode())
+    os.close(write_fd)
+    os._exit(0)
+
+def main():
+    """Fork workers and compare their connections with the master's."""
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    database_url = os.environ.get('DATABASE_URL', '')
+    check_database = None
+    if not database_url.startswith('postgresql://'):
+        # Throwaway SQLite stand-in so the real instance/app.db is left alone
+        check_database = os.path.join(tempfile.mkdtemp(prefix='budge-it-fork-'), 'check.db')
+        os.environ['DATABASE_URL'] = f"sqlite:///{check_database}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    print("🔍 Budge-IT Fork Safety Check")
+    print("=" * 50)
+
+    from app import create_app, db
+    app = create_app()
+
+    # 1. Loading the app must not have connected (preload happens in the master)
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        if check_database:
+            track_sqlite_connections(db.engine, check_database)
+        pooled = db.engine.pool.checkedin() if hasattr(db.engine.pool, 'checkedin') else 0
+    print(f"1️⃣ Pooled connections after create_app(): {pooled}")
+    failures = []
+    if pooled:
+        failures.append('create_app() opened a database connection')
+
+    # 2. Simulate a master that has connected anyway and left it in the pool
+    with app.app_context():
+        master_connection = connection_identity(db)
+    print(f"2️⃣ Master connection: {master_connection}")
+
+    # 3. Fork the workers
+    results = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            run_worker(app, db, write_fd)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            results.append(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+
+    for result in results:
+        print(f"   👷 Worker {result['pid']}: connection {result['connection']}")
+        if result['connection'] == master_connection:
+            failures.append(f"worker {result['pid']} reused the master's connection")
+
+    # Each worker has to have opened its own connection, so no two may share one either
+    connections = [result['connection'] for result in results]
+    if len(set(connections)) != len(connections):
+        failures.append('two workers shared a connection')
+
+    if check_database:
+        os.remove(check_database)
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print(f"✅ {workers} workers each opened their own database connection")
+
+if __name__ == "__main__":
+    main()
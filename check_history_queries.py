@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+History Query Count Check for Budge-IT App
+
+This script logs a user in against a throwaway SQLite database, fills the
+account with transactions across several categories and counts the SQL
+statements GET /history sends. It fails if the page takes more statements
+than expected, or if the count grows with the number of transactions
+shown (an N+1 category lookup).
+
+Usage:
+    python check_history_queries.py [max statements]
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+
+# Point the app at a throwaway database before it is imported
+CHECK_DATABASE = os.path.join(tempfile.mkdtemp(prefix='budge-it-history-'), 'check.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{CHECK_DATABASE}"
+os.environ.setdefault('SECRET_KEY', 'check')
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import User, Category
+from app.migrations import upgrade
+from app.utils.database import create_transaction
+
+# Statements the history page may send: first page, period totals, categories
+MAX_STATEMENTS = 3
+
+def count_statements(client):
+    """Load /history over all periods and return (statements, response)."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get('/history?period=all')
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements, response
+
+def add_transactions(user_id, categories, count):
+    """Give the user `count` transactions spread over their categories."""
+    for i in range(count):
+        category = categories[i % len(categories)]
+        create_transaction(user_id, 10 + i, category.id, category.category_type,
+                           date.today(), f'Item {i}')
+
+def main():
+    """Load the history page with few and many rows and compare the statement counts."""
+    max_statements = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_STATEMENTS
+    app = create_app()
+
+    print("🔍 Budge-IT History Query Count Check")
+    print("=" * 50)
+
+    with app.app_context():
+        upgrade(db.engine)
+        client = app.test_client()
+        client.post('/register', data={
+            'username': 'history', 'email': 'history@example.com',
+            'password': 'secret123', 'confirm_password': 'secret123'
+        })
+        client.post('/login', data={'username': 'history', 'password': 'secret123'})
+        user = User.query.filter_by(username='history').first()
+        categories = Category.query.filter_by(user_id=user.id).all()
+        print(f"1️⃣ Test user with {len(categories)} categories")
+
+        # Serve one request first so per-process startup queries aren't counted
+        client.get('/history')
+
+        add_transactions(user.id, categories, 5)
+        few, response = count_statements(client)
+        print(f"2️⃣ 5 transactions: {len(few)} statements ({', '.join(few)}), status {response.status_code}")
+
+        add_transactions(user.id, categories, 45)
+        many, response = count_statements(client)
+        print(f"3️⃣ 50 transactions: {len(many)} statements ({', '.join(many)}), status {response.status_code}")
+
+    os.remove(CHECK_DATABASE)
+
+    ok = response.status_code == 200 and len(many) == len(few) and len(many) <= max_statements
+    print("=" * 50)
+    if ok:
+        print(f"✅ History page used {len(many)} statements regardless of row count")
+    else:
+        print(f"❌ Expected a 200 and at most {max_statements} statements, "
+              f"the same for 5 and 50 transactions")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Registration Round-Trip Check for Budge-IT App
+
+This script registers a new account through POST /register against a
+throwaway SQLite database and counts the SQL statements and commits the
+request sends. It fails if registration takes more statements than
+expected or if the account doesn't get its default categories, and
+checks that a taken username or email is refused without leaving rows
+behind.
+
+Usage:
+    python check_registration_queries.py [max statements]
+"""
+
+import os
+import sys
+import tempfile
+
+# Point the app at a throwaway database before it is imported
+CHECK_DATABASE = os.path.join(tempfile.mkdtemp(prefix='budge-it-register-'), 'check.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{CHECK_DATABASE}"
+os.environ.setdefault('SECRET_KEY', 'check')
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import User, Category
+from app.migrations import upgrade
+from app.utils.categories import DEFAULT_CATEGORIES
+
+# Statements registration may send: user insert (ON CONFLICT DO NOTHING), one category insert
+MAX_STATEMENTS = 2
+
+def count_statements(app, username, email=None):
+    """Register `username` and return (statements, commits, response)."""
+    statements = []
+    commits = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    def on_commit(conn):
+        commits.append(1)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'commit', on_commit)
+    try:
+        response = app.test_client().post('/register', data={
+            'username': username, 'email': email or f'{username}@example.com',
+            'password': 'secret123', 'confirm_password': 'secret123'
+        })
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        event.remove(engine, 'commit', on_commit)
+    return statements, len(commits), response
+
+def main():
+    """Register one account and compare its round-trips with the limit."""
+    max_statements = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_STATEMENTS
+    app = create_app()
+
+    print("🔍 Budge-IT Registration Round-Trip Check")
+    print("=" * 50)
+
+    with app.app_context():
+        upgrade(db.engine)
+        # Serve one request first so per-process startup queries aren't counted
+        app.test_client().get('/about')
+
+        statements, commits, response = count_statements(app, 'roundtrip')
+        print(f"1️⃣ Response: {response.status_code}")
+        print(f"2️⃣ Statements: {len(statements)} ({', '.join(statements)}), commits: {commits}")
+
+        user = User.query.filter_by(username='roundtrip').first()
+        categories = Category.query.filter_by(user_id=user.id).count() if user else 0
+        print(f"3️⃣ Categories created: {categories} of {len(DEFAULT_CATEGORIES)}")
+
+        # A taken username or email must be refused without leaving a user or categories behind
+        counts = (User.query.count(), Category.query.count())
+        refused = []
+        for username, email in (('roundtrip', 'other@example.com'), ('other', 'roundtrip@example.com')):
+            _, _, retry = count_statements(app, username, email)
+            refused.append(retry.status_code == 200)
+        conflicts_ok = all(refused) and (User.query.count(), Category.query.count()) == counts
+        print(f"4️⃣ Taken username/email refused cleanly: {'yes' if conflicts_ok else 'no'}")
+
+    os.remove(CHECK_DATABASE)
+
+    ok = response.status_code == 302 and len(statements) <= max_statements and commits == 1 \
+        and categories == len(DEFAULT_CATEGORIES) and conflicts_ok
+    print("=" * 50)
+    if ok:
+        print(f"✅ Registration used {len(statements)} statements in one commit")
+    else:
+        print(f"❌ Expected a redirect, at most {max_statements} statements in one commit "
+              f"and {len(DEFAULT_CATEGORIES)} categories, and taken names refused")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Transaction Edit Check for Budge-IT App
+
+This script adds a transaction, edits it through POST /edit_transaction
+(the form the history page submits) and deletes it, against a throwaway
+SQLite database. After each step it checks that the row holds the
+submitted values and that the user's running totals and chart rollups
+still match totals computed from the transactions table.
+
+Usage:
+    python check_transaction_edit.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+
+# Point the app at a throwaway database before it is imported
+CHECK_DATABASE = os.path.join(tempfile.mkdtemp(prefix='budge-it-edit-'), 'check.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{CHECK_DATABASE}"
+os.environ.setdefault('SECRET_KEY', 'check')
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import User, Category, Transaction
+from app.migrations import upgrade
+from app.utils.database import verify_user_summaries
+from app.utils.rollups import verify_user_rollups
+
+def totals_consistent(user_id):
+    """True if the user's running totals and daily rollups match their transactions."""
+    db.session.expire_all()
+    return not verify_user_summaries() and not verify_user_rollups(user_id)
+
+def main():
+    """Add, edit and delete one transaction through the routes and check the results."""
+    app = create_app()
+    failures = []
+
+    print("🔍 Budge-IT Transaction Edit Check")
+    print("=" * 50)
+
+    with app.app_context():
+        upgrade(db.engine)
+        client = app.test_client()
+        client.post('/register', data={
+            'username': 'editor', 'email': 'editor@example.com',
+            'password': 'secret123', 'confirm_password': 'secret123'
+        })
+        client.post('/login', data={'username': 'editor', 'password': 'secret123'})
+        user = User.query.filter_by(username='editor').first()
+        expense_categories = Category.query.filter_by(user_id=user.id, category_type='expense').all()
+        first, second = expense_categories[0], expense_categories[1]
+
+        # 1. Add through the dashboard form
+        client.post('/add_transaction', data={
+            'amount': '12.50', 'category_id': str(first.id), 'type': 'expense',
+            'date': '2026-10-01', 'Item Name': 'Lunch'
+        })
+        transaction = Transaction.query.filter_by(user_id=user.id).first()
+        added_ok = transaction is not None and totals_consistent(user.id)
+        print(f"1️⃣ Added: {'yes' if added_ok else 'no'}")
+        if not added_ok:
+            failures.append('adding a transaction failed or left the totals out of date')
+            transaction_id = None
+        else:
+            transaction_id = transaction.id
+
+        # 2. Edit amount, name, date and category through the history page's form (all strings)
+        if transaction_id:
+            response = client.post(f'/edit_transaction/{transaction_id}', data={
+                'amount': '40.25', 'item_name': 'Dinner', 'date': '2026-11-15',
+                'category_id': str(second.id), 'type': 'expense', 'transaction_type': 'expense'
+            })
+            db.session.expire_all()
+            edited = db.session.get(Transaction, transaction_id)
+            values = (float(edited.amount), edited.item_name, edited.date, edited.category_id)
+            expected = (40.25, 'Dinner', date(2026, 11, 15), second.id)
+            print(f"2️⃣ Edited: status {response.status_code}, row {values}")
+            if values != expected:
+                failures.append(f'edit was not saved: expected {expected}, got {values}')
+            if not totals_consistent(user.id):
+                failures.append('running totals or rollups are out of date after the edit')
+
+            # 3. A malformed date is refused without changing the row
+            client.post(f'/edit_transaction/{transaction_id}', data={
+                'amount': '1', 'item_name': 'Bad', 'date': 'not a date',
+                'category_id': str(first.id), 'type': 'expense'
+            })
+            db.session.expire_all()
+            unchanged = db.session.get(Transaction, transaction_id).item_name == 'Dinner'
+            print(f"3️⃣ Malformed date refused: {'yes' if unchanged else 'no'}")
+            if not unchanged:
+                failures.append('an edit with a malformed date changed the row')
+
+            # 4. Delete
+            client.post(f'/delete_transaction/{transaction_id}')
+            db.session.expire_all()
+            deleted = db.session.get(Transaction, transaction_id) is None
+            print(f"4️⃣ Deleted: {'yes' if deleted else 'no'}")
+            if not deleted or not totals_consistent(user.id):
+                failures.append('deleting the transaction failed or left the totals out of date')
+
+    os.remove(CHECK_DATABASE)
+
+    print("=" * 50)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Add, edit and delete kept the row, running totals and rollups in step")
+
+if __name__ == "__main__":
+    main()
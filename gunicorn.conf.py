@@ -1,18 +1,58 @@
 # Gunicorn configuration file
 import os
+import multiprocessing
 
 # Server socket
 bind = "0.0.0.0:" + os.environ.get("PORT", "10000")
 backlog = 2048
 
+# Worker profile: sync, gthread or gevent
+#   sync    - one request at a time per worker (simplest, most workers)
+#   gthread - several threads per worker sharing the worker's connection pool
+#   gevent  - many green threads per worker; psycopg2 is patched to yield while waiting on Postgres
+WORKER_PROFILES = {
+    "sync": {"worker_class": "sync", "threads": 1},
+    "gthread": {"worker_class": "gthread", "threads": int(os.environ.get("GUNICORN_THREADS", 4))},
+    "gevent": {"worker_class": "gevent", "threads": 1},
+}
+profile_name = os.environ.get("GUNICORN_PROFILE", "gthread").lower()
+if profile_name not in WORKER_PROFILES:
+    raise ValueError(f"Unknown GUNICORN_PROFILE '{profile_name}' (expected one of {', '.join(WORKER_PROFILES)})")
+profile = WORKER_PROFILES[profile_name]
+
+def available_cpus():
+    """Number of CPUs this process may run on (respects container CPU affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+def default_workers(threads):
+    """
+    Pick a worker count from the CPU count and the database connection budget.
+
+    Uses the usual (2 x CPUs) + 1, but never more workers than the budget of
+    DB_MAX_CONNECTIONS can give one connection per thread plus one for the
+    health monitor.
+    """
+    by_cpu = available_cpus() * 2 + 1
+    by_pool = int(os.environ.get("DB_MAX_CONNECTIONS", 10)) // (threads + 1)
+    return max(1, min(by_cpu, by_pool))
+
 # Worker processes
-workers = 1
-worker_class = "sync"
-worker_connections = 200
-# Increase timeout to 120 seconds to prevent worker timeouts on slow requests
-timeout = 120
+worker_class = profile["worker_class"]
+threads = profile["threads"]
+workers = int(os.environ.get("WEB_CONCURRENCY") or default_workers(threads))
+# Green threads per gevent worker (ignored by the other profiles)
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
 keepalive = 2
 
+# Share the final numbers with the app so it sizes its connection pool to match
+os.environ["WEB_CONCURRENCY"] = str(workers)
+os.environ["GUNICORN_THREADS"] = str(threads)
+
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
 max_requests_jitter = 50
@@ -32,6 +72,7 @@ umask = 0
 user = None
 group = None
 tmp_upload_dir = None
+worker_tmp_dir = None
 
 # SSL (not needed for Render)
 keyfile = None
@@ -40,28 +81,6 @@ certfile = None
 # Preload app for better performance
 preload_app = True
 
-# Worker timeout
-graceful_timeout = 30
-
-# Maximum requests per worker
-max_requests = 1000
-max_requests_jitter = 50
-
-# Worker restart after this many requests
-worker_tmp_dir = None
-
-# Worker class
-worker_class = "sync"
-
-# Worker connections
-worker_connections = 200
-
-# Timeout
-timeout = 30
-
-# Keep alive
-keepalive = 2
-
 # Limit request line size
 limit_request_line = 4094
 
@@ -69,4 +88,44 @@ limit_request_line = 4094
 limit_request_fields = 100
 
 # Limit request field size
-limit_request_field_size = 8190
\ No newline at end of file
+limit_request_field_size = 8190
+
+def patch_psycopg2_for_gevent():
+    """
+    Make psycopg2 yield to other green threads while it waits on the network.
+
+    psycopg2 is a C extension, so gevent's monkey patching can't reach its
+    sockets; registering a wait callback puts its connections in async mode
+    and hands every wait to gevent's hub instead of blocking the worker.
+    """
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    def gevent_wait_callback(conn, timeout=None):
+        while True:
+            state = conn.poll()
+            if state == extensions.POLL_OK:
+                break
+            elif state == extensions.POLL_READ:
+                wait_read(conn.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(conn.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+    extensions.set_wait_callback(gevent_wait_callback)
+
+if worker_class == "gevent":
+    # Patch before the preloaded app imports anything that uses sockets or threads
+    from gevent import monkey
+    monkey.patch_all()
+    patch_psycopg2_for_gevent()
+
+def when_ready(server):
+    server.log.info(f"Worker profile '{profile_name}': {workers} x {worker_class} worker(s), {threads} thread(s) each")
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master so each worker opens its own."""
+    from app.utils.database import dispose_engines_after_fork
+    dispose_engines_after_fork(worker.app.wsgi())